@@ -1,8 +1,17 @@
+import importlib
+
 import streamlit as st
-from intro_page import show as show_intro
-from preProcess_page import show as show_preprocess
-from EDA_page import show as show_eda
 from styles import overall_css
+from instrumentation import new_run, timed
+from sections import diagnostics_panel
+
+# Page modules are imported on first navigation, so a cold start only pays for the page being viewed
+PAGES = {
+    "intro": "intro_page",
+    "preprocess": "preProcess_page",
+    "EDA": "EDA_page",
+    "compare": "compare_page",
+}
 
 # Set up app configuration and title - should be the first Streamlit command in your script
 st.set_page_config(page_title="WeatherElectric Analytics", layout="wide")
@@ -13,8 +22,8 @@ st.markdown(overall_css, unsafe_allow_html=True)
 # Main title
 st.title('WeatherElectric Analytics')
 
-# Create a grid layout with three columns for the buttons
-col1, col2, col3 = st.columns(3)
+# Create a grid layout with four columns for the buttons
+col1, col2, col3, col4 = st.columns(4)
 
 # Display buttons to select page in a row at the top of each page
 with col1:
@@ -23,6 +32,8 @@ with col2:
     preprocess_button = st.button("PreProcessing")
 with col3:
     eda_button = st.button("EDA")
+with col4:
+    compare_button = st.button("Regions")
 
 # Get current page from session state
 current_page = st.session_state.get("page", "intro")
@@ -34,14 +45,16 @@ elif preprocess_button:
     current_page = "preprocess"
 elif eda_button:
     current_page = "EDA"
+elif compare_button:
+    current_page = "compare"
 
 # Save the current page to session state
 st.session_state.page = current_page
 
-# Page content based on current_page
-if current_page == "intro":
-    show_intro()
-elif current_page == "preprocess":
-    show_preprocess()
-elif current_page == "EDA":
-    show_eda()
+# Page content based on current_page (Python caches the module after the first import)
+new_run()
+with timed(f"page:{current_page}"):
+    importlib.import_module(PAGES[current_page]).show()
+
+# Optional per-stage timings of this rerun
+diagnostics_panel()
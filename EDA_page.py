@@ -1,34 +1,67 @@
+import os
+
 import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import plotly.express as px
+import plotly.graph_objects as go
 
 from styles import overall_css
+from data_loader import load_dataset, cache_stats, file_version
+from aggregates import aggregate_store, query_series
+from sections import cached_compute, filtered_view, lazy_section, render_plotly, section_toggle, time_filter_sidebar
+from correlation import correlation_matrices, windowed_correlation
+from instrumentation import instrument
+from chart_service import box_stats, build_figures, cached_figures, histogram_stats, kde_stats
+from time_index import TimeFilter, time_index
+from decomposition import DECOMPOSE_COLUMNS, cached_decomposition
 
-df = pd.read_csv('Updated_df_cleaned.csv')
+DATA_PATH = 'Updated_df_cleaned.csv'
+# Raw half-hourly file with real Hour values, needed for the time-of-day decomposition
+RAW_DATA_PATH = 'electric load.csv'
 
 def show():
     st.markdown(overall_css, unsafe_allow_html=True)
 
+    # Load data (cached per file version, DateTime built once at load)
+    df = load_dataset(DATA_PATH, with_datetime=True)
+    version = file_version(DATA_PATH)
+    stats = cache_stats()
+    st.sidebar.metric("Data cache hits", stats['hits'])
+    st.sidebar.metric("Data cache misses", stats['misses'])
+    st.sidebar.metric("Shared data memory (MB)", f"{stats['bytes'] / 2 ** 20:,.1f} / {stats['budget_bytes'] / 2 ** 20:,.0f}")
+
+    # Every chart and statistic below works on the filtered rows; caches are keyed on (version, filter).
+    # Hour is standardized in this file, so the filters index the calendar Date and offer no hour-of-day filter
+    time_filter = time_filter_sidebar(*time_index(version, df, 'Date').bounds, time_of_day=False, key='eda-filter')
+    df, version = filtered_view(df, version, time_filter, 'Date')
+    st.sidebar.metric("Rows after filters", f"{len(df):,}")
+
     st.markdown("<h1>Exploratory Data Analysis (EDA)</h1>", unsafe_allow_html=True)
     st.write("""
         In this section, you can explore the data through various visualizations and statistical analysis to uncover patterns and insights.
     """)
 
+    if df.empty:
+        st.warning("No rows match the sidebar filters.")
+        return
+
     # Preliminary Analysis
     st.markdown("<h2>1. Preliminary Analysis</h2>", unsafe_allow_html=True)
 
     # 1.1 Correlation
     st.markdown("<h3>1.1 Correlation</h3>", unsafe_allow_html=True)
     st.write("What are the strengths and directions of correlations between key variables (DryBulb, DewPnt, WetBulb, Humidity, ElecPrice, SYSLoad), and are there significant positive or negative correlations indicating potential relationships between these variables?")
-    plot_correlation_heatmaps(df)
+    lazy_section("correlation heatmaps", 'eda-correlation', version, lambda: build_correlation_heatmaps(df, version), st.pyplot)
+    st.write("How does each variable's correlation with SYSLoad change from season to season?")
+    lazy_section("seasonal correlation with SYSLoad", 'eda-seasonal-correlation', version,
+                 lambda: [build_seasonal_correlation(windowed_correlation(df, TIME_SERIES_COLUMNS, 'SYSLoad', window='season'))], render_plotly)
     st.write("Correlation heatmaps provide a clear view of how variables relate to each other. High positive or negative correlations suggest potential dependencies.")
 
     # 1.2 Outlier Detection
     st.markdown("<h3>1.2 Outlier Detection</h3>", unsafe_allow_html=True)
     st.write("Which variables (DryBulb, DewPnt, WetBulb, Humidity, ElecPrice, SYSLoad) exhibit outliers, and how do these outliers impact the overall distribution and interpretation of the data?")
-    plot_outlier_violin_plots(df)
+    lazy_section("violin plots", 'eda-violin', version, lambda: cached_figures('eda-violin', version, (), lambda: build_outlier_violin_plots(df)), render_plotly)
     st.write("Violin plots highlight outlier ranges and their impact on data distribution, aiding in outlier identification and understanding.")
 
     # 1.3 General Trends
@@ -37,19 +70,31 @@ def show():
     # 1.3.1 Distribution of Data
     st.markdown("<h3>1.3.1 Distribution of Data</h3>", unsafe_allow_html=True)
     st.write("How do the distributions of key variables (Hour, DryBulb, DewPnt, WetBulb, Humidity, ElecPrice, SYSLoad) look across the dataset, and are there noticeable patterns or clusters?")
-    plot_histograms(df)
+    lazy_section("histograms", 'eda-histograms', version, lambda: cached_figures('eda-histograms', version, (), lambda: build_histograms(df)), render_plotly)
     st.write("Histograms show variable distributions, revealing clusters or patterns that may indicate data characteristics or anomalies.")
 
     # 1.3.2 Time Series Analysis
     st.markdown("<h3>1.3.2 Time Series Analysis</h3>", unsafe_allow_html=True)
     st.markdown("<h3>How do variables (DryBulb, DewPnt, WetBulb, Humidity, ElecPrice, SYSLoad) fluctuate over time, and are there seasonal trends or cyclical patterns?</h3>", unsafe_allow_html=True)
-    plot_time_series_analysis(df)
+    if section_toggle("time series charts", 'eda-time-series'):
+        plot_time_series_analysis(df, version)
     st.markdown("<h3>Time series plots visualize variable changes over time, highlighting trends and seasonal patterns relevant for forecasting and decision-making.</h3>", unsafe_allow_html=True)
 
-def plot_correlation_heatmaps(df):
-    numeric_df = df.select_dtypes(include=[np.number])
-    pearson_corr = numeric_df.corr(method='pearson')
-    spearman_corr = numeric_df.corr(method='spearman')
+    # 1.3.3 Seasonal Decomposition
+    st.markdown("<h3>1.3.3 Seasonal Decomposition and Daily Profiles</h3>", unsafe_allow_html=True)
+    st.write("How much of SYSLoad and ElecPrice is trend, daily cycle and weekly cycle, and what does a typical day look like in each season? "
+             "Computed on the raw half-hourly file within the selected date range.")
+    if not os.path.exists(RAW_DATA_PATH):
+        st.info(f"The seasonal decomposition needs the raw half-hourly file '{RAW_DATA_PATH}', which was not found.")
+    else:
+        # Calendar filters would break the regular grid the decomposition needs, so only the date range applies
+        range_filter = TimeFilter(time_filter.start, time_filter.end)
+        lazy_section("seasonal decomposition", 'eda-decomposition', (file_version(RAW_DATA_PATH), range_filter),
+                     lambda: build_decomposition(raw_decomposition(range_filter)), render_decomposition)
+
+@instrument()
+def build_correlation_heatmaps(df, version=None):
+    pearson_corr, spearman_corr = correlation_matrices(df, version=version)
 
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
 
@@ -74,11 +119,42 @@ def plot_correlation_heatmaps(df):
     plt.colorbar(im2, ax=ax2, format='%.2f')
 
     plt.tight_layout()
-    st.pyplot(fig)
+    # The figure is memoized by the section cache, so release it from pyplot's registry
+    plt.close(fig)
+    return fig
 
-def create_violin_plot(df, column):
-    fig = px.violin(df, y=column, box=True, points='all')
+def plot_correlation_heatmaps(df, version=None):
+    st.pyplot(build_correlation_heatmaps(df, version))
+
+# Seasons are drawn as categories in chronological order (a line chart would sort the labels alphabetically)
+def build_seasonal_correlation(seasonal):
+    fig = go.Figure([
+        go.Scatter(x=list(seasonal.index), y=seasonal[column], mode='lines+markers', name=column, line=dict(color=bright_colors[i % len(bright_colors)]))
+        for i, column in enumerate(seasonal.columns)
+    ])
+    fig.update_layout(title=dict(text='Seasonal correlation with SYSLoad', font=dict(family="Times New Roman", size=16, color="black")),
+                      xaxis=dict(type='category'), yaxis_title='correlation')
+    return fig
+
+# Violin, box and outlier points come from server-side statistics, so the figure carries a few hundred points, not every row
+@instrument()
+def build_violin_plot(df, column):
+    values = df[column].to_numpy()
+    kde, box = kde_stats(values), box_stats(values)
+    fig = go.Figure()
+    if kde is not None:
+        half_width = 0.4 * kde['density'] / kde['density'].max()
+        fig.add_trace(go.Scatter(x=np.concatenate([half_width, -half_width[::-1]]), y=np.concatenate([kde['grid'], kde['grid'][::-1]]),
+                                 fill='toself', mode='lines', line=dict(color='#636EFA'), name=column, hoverinfo='skip'))
+    if box is not None:
+        fig.add_trace(go.Box(x=[0], q1=[box['q1']], median=[box['median']], q3=[box['q3']], mean=[box['mean']],
+                             lowerfence=[box['lowerfence']], upperfence=[box['upperfence']], width=0.1,
+                             marker_color='#636EFA', boxpoints=False, name='box'))
+        fig.add_trace(go.Scatter(x=np.zeros(len(box['outliers'])), y=box['outliers'], mode='markers',
+                                 marker=dict(color='#636EFA', size=4), name='outliers'))
     fig.update_layout(
+        showlegend=False,
+        xaxis_showticklabels=False,
         title={'text': f'Violin Plot for {column}', 'font': {'family': 'Times New Roman', 'size': 16, 'color': 'black', 'weight': 'bold'}, 'x': 0.5, 'xanchor': 'center'},
         xaxis_title={'text': 'Values', 'font': {'family': 'Times New Roman', 'size': 16, 'color': 'black', 'weight': 'bold'}},
         yaxis_title={'text': column, 'font': {'family': 'Times New Roman', 'size': 16, 'color': 'black', 'weight': 'bold'}},
@@ -86,61 +162,136 @@ def create_violin_plot(df, column):
         xaxis_tickfont={'family': 'Times New Roman', 'size': 16, 'color': 'black', 'weight': 'bold'},
         yaxis_zeroline=False
     )
-    st.plotly_chart(fig)
+    return fig
+
+def create_violin_plot(df, column):
+    st.plotly_chart(build_violin_plot(df, column))
+
+def build_outlier_violin_plots(df):
+    return build_figures([lambda col=col: build_violin_plot(df, col) for col in ['DryBulb', 'DewPnt', 'WetBulb', 'Humidity', 'ElecPrice', 'SYSLoad']])
 
 def plot_outlier_violin_plots(df):
-    for col in ['DryBulb', 'DewPnt', 'WetBulb', 'Humidity', 'ElecPrice', 'SYSLoad']:
-        create_violin_plot(df, col)
+    render_plotly(build_outlier_violin_plots(df))
+
+# Bins are counted server-side; the figure carries one bar per bin
+@instrument()
+def build_histogram(df, col):
+    hist = histogram_stats(df[col].to_numpy())
+    edges = hist['edges']
+    fig = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=hist['counts'], width=np.diff(edges), marker_color='#636EFA'))
+    fig.update_layout(
+        title_text=f'Histogram of {col}',
+        xaxis_title_text=col,
+        yaxis_title_text='count',
+        bargap=0,
+        title_font_family='Arial',
+        title_font_size=16,
+        xaxis_title_font_family='Arial',
+        xaxis_title_font_size=16,
+        yaxis_title_font_family='Arial',
+        yaxis_title_font_size=16,
+        xaxis_tickfont_family='Arial',
+        xaxis_tickfont_size=14,
+        yaxis_tickfont_family='Arial',
+        yaxis_tickfont_size=14,
+        showlegend=False
+    )
+    return fig
+
+@instrument()
+def build_histograms(df):
+    return build_figures([lambda col=col: build_histogram(df, col) for col in ['DryBulb', 'DewPnt', 'WetBulb', 'Humidity', 'ElecPrice', 'SYSLoad']])
 
 def plot_histograms(df):
-    for col in ['DryBulb', 'DewPnt', 'WetBulb', 'Humidity', 'ElecPrice', 'SYSLoad']:
-        fig = px.histogram(df, x=col, title=f'Histogram of {col}', labels={'x': col, 'y': 'Frequency'})
-        fig.update_layout(
-            title_font_family='Arial',
-            title_font_size=16,
-            xaxis_title_font_family='Arial',
-            xaxis_title_font_size=16,
-            yaxis_title_font_family='Arial',
-            yaxis_title_font_size=16,
-            xaxis_tickfont_family='Arial',
-            xaxis_tickfont_size=14,
-            yaxis_tickfont_family='Arial',
-            yaxis_tickfont_size=14,
-            showlegend=False
-        )
-        st.plotly_chart(fig)
+    render_plotly(build_histograms(df))
 
 bright_colors = ['#FF1493', '#00FFFF', '#FF4500', '#7FFF00', '#9932CC', '#00CED1', '#FFD700']
 
-# Ensure to create a DateTime column by combining Date and Hour
-df['DateTime'] = pd.to_datetime(df['Date']) + pd.to_timedelta(df['Hour'], unit='H')
+TIME_SERIES_COLUMNS = ['DryBulb', 'DewPnt', 'WetBulb', 'Humidity', 'ElecPrice', 'SYSLoad']
 
-def plot_time_series(df, column, color, title):
-    fig = px.line(df, x='DateTime', y=column, animation_frame='Hour', animation_group='DateTime', range_x=[df['DateTime'].min(), df['DateTime'].max()], range_y=[df[column].min(), df[column].max()], title=title)
-    
-    for frame in fig.frames:
-        frame.data[0].line.color = color
-    
-    fig.update_traces(marker=dict(size=10))
+@instrument()
+def build_time_series(store, column, color, title, start, end):
+    # The aggregate store returns at most MAX_POINTS points whatever the zoom range
+    resolution, frame = query_series(store, column, start, end)
+    fig = go.Figure()
+    if 'min' in frame.columns:
+        fig.add_trace(go.Scatter(x=frame.index, y=frame['max'], mode='lines', line=dict(width=0, color=color), showlegend=False, name='max'))
+        fig.add_trace(go.Scatter(x=frame.index, y=frame['min'], mode='lines', line=dict(width=0, color=color), fill='tonexty', opacity=0.3, showlegend=False, name='min'))
+    fig.add_trace(go.Scatter(x=frame.index, y=frame['mean'], mode='lines', line=dict(color=color), name=column))
     fig.update_layout(
-        title_font_family='Times New Roman',
-        title_font_size=16,
-        title=dict(font=dict(family="Times New Roman", size=16, color="black")),
-        xaxis_title=dict(font=dict(family="Times New Roman", size=16, color="black")),
-        yaxis_title=dict(font=dict(family="Times New Roman", size=16, color="black")),
+        title=dict(text=f'{title} ({resolution})', font=dict(family="Times New Roman", size=16, color="black")),
+        xaxis_title=dict(text='DateTime', font=dict(family="Times New Roman", size=16, color="black")),
+        yaxis_title=dict(text=column, font=dict(family="Times New Roman", size=16, color="black")),
         xaxis_tickfont=dict(family="Times New Roman", size=14, color="black"),
         yaxis_tickfont=dict(family="Times New Roman", size=14, color="black")
     )
-    st.plotly_chart(fig)
+    return fig
+
+def plot_time_series(store, column, color, title, start, end):
+    st.plotly_chart(build_time_series(store, column, color, title, start, end))
+
+def plot_time_series_analysis(df, version):
+    store = aggregate_store(version, df, TIME_SERIES_COLUMNS)
+    first, last = store['raw'].index.min().to_pydatetime(), store['raw'].index.max().to_pydatetime()
+    start, end = first, last
+    if first < last:
+        start, end = st.slider("Zoom range", min_value=first, max_value=last, value=(first, last), format="YYYY-MM-DD HH:mm")
+    figures = cached_compute('eda-time-series', version, (start, end), lambda: cached_figures('eda-time-series', version, (start, end), lambda: build_figures([
+        lambda i=i, column=column: build_time_series(store, column, bright_colors[i], f'Time Forecasting for {column}', start, end)
+        for i, column in enumerate(TIME_SERIES_COLUMNS)
+    ])))
+    render_plotly(figures)
+
+# The trend is drawn from daily means, the cycles over the last full week, so each figure stays a few thousand points
+@instrument()
+def build_decomposition_figures(column, result):
+    components = result['components']
+    daily_means = components[['observed', 'trend']].resample('D').mean()
+    fig_trend = go.Figure([
+        go.Scatter(x=daily_means.index, y=daily_means['observed'], mode='lines', line=dict(color='lightgray'), name='daily mean'),
+        go.Scatter(x=daily_means.index, y=daily_means['trend'], mode='lines', line=dict(color=bright_colors[0]), name='trend'),
+    ])
+    fig_trend.update_layout(title=dict(text=f'{column}: trend', font=dict(family="Times New Roman", size=16, color="black")))
+    week = components.iloc[-7 * 48:]
+    fig_cycles = go.Figure([
+        go.Scatter(x=week.index, y=week[name], mode='lines', line=dict(color=bright_colors[i + 1]), name=name)
+        for i, name in enumerate(['daily', 'weekly', 'residual'])
+    ])
+    fig_cycles.update_layout(title=dict(text=f'{column}: daily and weekly cycles, last week', font=dict(family="Times New Roman", size=16, color="black")))
+    profiles = result['profiles']
+    fig_profiles = go.Figure([
+        go.Scatter(x=profiles.index, y=profiles[label], mode='lines', name=' '.join(label),
+                   line=dict(color=bright_colors[i // 2], dash='solid' if label[1] == 'Workday' else 'dot'))
+        for i, label in enumerate(profiles.columns)
+    ])
+    fig_profiles.update_layout(title=dict(text=f'{column}: typical day by season and day type', font=dict(family="Times New Roman", size=16, color="black")),
+                               xaxis_title='time of day', yaxis_title=column)
+    return [fig_trend, fig_cycles, fig_profiles]
+
+# Function to load the raw file (ingesting its store on first use) and decompose the date range;
+# runs only when the decomposition section is open
+def raw_decomposition(range_filter):
+    raw = load_dataset(RAW_DATA_PATH, columns=['Date', 'Hour'] + DECOMPOSE_COLUMNS, with_datetime=True)
+    raw, raw_version = filtered_view(raw, file_version(RAW_DATA_PATH), range_filter)
+    return cached_decomposition(raw, raw_version)
 
-def plot_time_series_analysis(df):
-    plot_time_series(df, 'DryBulb', bright_colors[0], 'Time Forecasting for DryBulb')
-    plot_time_series(df, 'DewPnt', bright_colors[1], 'Time Forecasting for DewPnt')
-    plot_time_series(df, 'WetBulb', bright_colors[2], 'Time Forecasting for WetBulb')
-    plot_time_series(df, 'Humidity', bright_colors[3], 'Time Forecasting for Humidity')
-    plot_time_series(df, 'ElecPrice', bright_colors[4], 'Time Forecasting for ElecPrice')
-    plot_time_series(df, 'SYSLoad', bright_colors[5], 'Time Forecasting for SYSLoad')
+def build_decomposition(results):
+    strength = pd.DataFrame({column: result['strength'] for column, result in results.items()}).T
+    figures = build_figures([lambda column=column, result=result: build_decomposition_figures(column, result) for column, result in results.items()])
+    peaks = {column: result['peaks'] for column, result in results.items()}
+    return strength, dict(zip(results, figures)), peaks
 
+def render_decomposition(decomposition):
+    strength, figures, peaks = decomposition
+    if strength.empty:
+        st.write("Not enough data in the selected range (at least two weeks are needed).")
+        return
+    st.write("Strength of each component (0 = none, 1 = explains all but the noise):")
+    st.dataframe(strength)
+    for column, column_figures in figures.items():
+        render_plotly(column_figures)
+        st.write(f"Peak and trough of the typical {column} day:")
+        st.dataframe(peaks[column])
 
 
 if __name__ == '__main__':
@@ -0,0 +1,82 @@
+# aggregates.py
+import numpy as np
+import pandas as pd
+
+from data_loader import cached_derived
+
+# Resolutions from finest to coarsest, with their pandas resample rule and bucket width
+RESOLUTIONS = [
+    ('hourly', 'h', pd.Timedelta(hours=1)),
+    ('daily', 'D', pd.Timedelta(days=1)),
+    ('weekly', 'W', pd.Timedelta(weeks=1)),
+    ('monthly', 'MS', pd.Timedelta(days=31)),
+]
+# Upper bound on the number of points any time-series chart receives
+MAX_POINTS = 2000
+# Raw ranges up to this many times MAX_POINTS are thinned with LTTB instead of aggregated
+LTTB_FACTOR = 50
+# Function to pick the indices of a Largest-Triangle-Three-Buckets downsampling of (x, y)
+def lttb(x, y, threshold):
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    idx = np.empty(threshold, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        idx[i + 1] = a
+    return idx
+
+# Function to precompute min/mean/max of every column at every resolution
+def build_aggregates(df, columns, time_column='DateTime'):
+    indexed = df.set_index(time_column)[list(columns)].sort_index()
+    indexed = indexed[indexed.index.notna()]
+    store = {'raw': indexed}
+    for name, rule, _ in RESOLUTIONS:
+        store[name] = indexed.resample(rule).agg(['min', 'mean', 'max']).dropna(how='all')
+    return store
+
+# Function to fetch the aggregate store of a dataset version, building it on first use;
+# stores count against the shared dataset memory budget
+def aggregate_store(version, df, columns, time_column='DateTime'):
+    return cached_derived(('aggregates', version, tuple(columns), time_column), lambda: build_aggregates(df, columns, time_column))
+
+# Function to pick the finest resolution whose bucket count in [start, end] fits max_points
+def choose_resolution(store, start, end, max_points=MAX_POINTS):
+    rows = len(store['raw'].loc[start:end])
+    if rows <= max_points:
+        return 'raw'
+    if rows <= LTTB_FACTOR * max_points:
+        return 'lttb'
+    for name, _, width in RESOLUTIONS:
+        if (end - start) / width <= max_points:
+            return name
+    return RESOLUTIONS[-1][0]
+
+# Function to query one column over a zoom range with a bounded number of points
+def query_series(store, column, start=None, end=None, max_points=MAX_POINTS):
+    raw = store['raw']
+    start = raw.index.min() if start is None else pd.Timestamp(start)
+    end = raw.index.max() if end is None else pd.Timestamp(end)
+    resolution = choose_resolution(store, start, end, max_points)
+    if resolution in ('raw', 'lttb'):
+        series = raw[column].loc[start:end].dropna()
+        if resolution == 'lttb':
+            series = series.iloc[lttb(series.index.asi8, series.to_numpy(), max_points)]
+        return resolution, pd.DataFrame({'mean': series})
+    frame = store[resolution][column].loc[start:end].dropna()
+    if len(frame) > max_points:
+        # Monthly buckets over very long ranges can still exceed the budget
+        keep = lttb(frame.index.asi8, frame['mean'].to_numpy(), max_points)
+        frame = frame.iloc[keep]
+    return resolution, frame
@@ -0,0 +1,161 @@
+# batch.py
+# Headless batch runner: the preprocessing and EDA computations without Streamlit.
+#
+#   python batch.py "data/*.csv" --output-dir batch_output --jobs 4
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from correlation import correlation_matrices, windowed_correlation
+from feature_selection import cached_rank_features
+from preprocessing_pipeline import PreprocessingPipeline
+from streaming_pipeline import CHUNKSIZE, OUTLIER_PASSES, run_chunked_pipeline
+
+DEFAULT_OUTPUT_DIR = 'batch_output'
+REPORT_NAME = 'batch_report.json'
+TARGET = 'ElecPrice'
+
+# Function to expand file names and glob patterns into a sorted, de-duplicated list of inputs
+def expand_inputs(patterns):
+    paths = []
+    for pattern in patterns:
+        matches = glob.glob(pattern)
+        paths += matches if matches else [pattern]
+    return sorted(dict.fromkeys(os.path.abspath(path) for path in paths))
+
+# Function to get the output directory of one input file; a short hash of its directory keeps
+# same-named files from different directories apart
+def output_dir_for(src_path, output_dir):
+    src_path = os.path.abspath(src_path)
+    parent = hashlib.sha1(os.path.dirname(src_path).encode('utf-8')).hexdigest()[:8]
+    return os.path.join(output_dir, f'{os.path.splitext(os.path.basename(src_path))[0]}-{parent}')
+
+class _StageTimer:
+    def __init__(self):
+        self.stages = {}
+
+    def run(self, name, func, *args, **kwargs):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.stages[name] = time.perf_counter() - started
+        return result
+
+def _write_frame(df, path):
+    df.to_parquet(path, index=True)
+    return path
+
+# Function to run every stage for one input file and write its outputs; runs inside a worker process
+def process_file(src_path, output_dir, chunksize=CHUNKSIZE, outlier_passes=OUTLIER_PASSES, rank_features=False):
+    started = time.perf_counter()
+    out_dir = output_dir_for(src_path, output_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    timer = _StageTimer()
+    cleaned_path = os.path.join(out_dir, 'cleaned.parquet')
+
+    # Cleaning, outliers and standardization: the same chunked passes the preprocessing page uses
+    # The source's columnar store goes under the output directory too, so inputs may be read-only
+    report = timer.run('clean', run_chunked_pipeline, src_path, cleaned_path, chunksize, outlier_passes,
+                       store_dir=os.path.join(out_dir, 'source_store'))
+    cleaned = timer.run('load_cleaned', pd.read_parquet, cleaned_path)
+
+    # PCA and RFE on the standardized output
+    pipeline = timer.run('pca_rfe', lambda: PreprocessingPipeline(target=TARGET).fit_from_report(report, cleaned, report['source_version']))
+    pipeline.save(os.path.join(out_dir, 'pipeline.joblib'))
+
+    # EDA: full correlation matrices and seasonal correlation with the target
+    columns = report['scaler']['columns']
+    pearson, spearman = timer.run('correlation', correlation_matrices, cleaned, columns)
+    _write_frame(pearson, os.path.join(out_dir, 'pearson.parquet'))
+    _write_frame(spearman, os.path.join(out_dir, 'spearman.parquet'))
+    seasonal = timer.run('seasonal_correlation', windowed_correlation, cleaned, columns, TARGET, 'season')
+    _write_frame(seasonal, os.path.join(out_dir, 'seasonal_correlation.parquet'))
+
+    result = {
+        'source': report['source'],
+        'source_version': report['source_version'],
+        'output_dir': os.path.abspath(out_dir),
+        'rows_in': report['rows_in'],
+        'rows_out': report['rows_after_dedup'],
+        'duplicates': report['duplicates'],
+        'missing': report['missing'],
+        'outlier_convergence': report['outlier_convergence'],
+        'explained_variance_ratio': pipeline.explained_variance_ratio_.tolist(),
+        'selected_features': list(pipeline.selected_features_),
+        'clean_passes': report['passes'],
+    }
+    if rank_features:
+        # Each worker already owns a core, so the ranking itself runs single-process
+        ranking = timer.run('feature_ranking', cached_rank_features, cleaned, TARGET, report['source_version'], n_jobs=1)
+        _write_frame(ranking['ranking'], os.path.join(out_dir, 'feature_ranking.parquet'))
+        result['ranked_features'] = ranking['selected']
+    result['stages'] = timer.stages
+    result['seconds'] = time.perf_counter() - started
+    with open(os.path.join(out_dir, 'report.json'), 'w') as f:
+        json.dump(result, f, indent=2, default=float)
+    return result
+
+# Function to process many files in a pool of worker processes, one file per task
+def run_batch(inputs, output_dir=DEFAULT_OUTPUT_DIR, jobs=None, chunksize=CHUNKSIZE, outlier_passes=OUTLIER_PASSES, rank_features=False):
+    started = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = jobs or min(len(inputs), os.cpu_count() or 1) or 1
+    results, failures = [], []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(process_file, path, output_dir, chunksize, outlier_passes, rank_features): path for path in inputs}
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as exc:
+                failures.append({'source': futures[future], 'error': f'{type(exc).__name__}: {exc}'})
+    results.sort(key=lambda result: result['source'])
+    report = {
+        'inputs': inputs,
+        'jobs': jobs,
+        'files': results,
+        'failures': failures,
+        'seconds': time.perf_counter() - started,
+    }
+    with open(os.path.join(output_dir, REPORT_NAME), 'w') as f:
+        json.dump(report, f, indent=2, default=float)
+    return report
+
+# Function to format the per-file, per-stage timings as a table
+def timing_table(report):
+    rows = {os.path.basename(result['output_dir']): {**result['stages'], 'total': result['seconds']} for result in report['files']}
+    return pd.DataFrame(rows).T.round(3)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run the WeatherElectric preprocessing and EDA computations headlessly.')
+    parser.add_argument('inputs', nargs='+', help='CSV files or glob patterns')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR, help='directory for the per-file outputs and the batch report')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes (default: one per file, up to the CPU count)')
+    parser.add_argument('--chunksize', type=int, default=CHUNKSIZE, help='rows held in memory per pass')
+    parser.add_argument('--outlier-passes', type=int, default=OUTLIER_PASSES, help='maximum outlier rounds')
+    parser.add_argument('--rank-features', action='store_true', help='also run the multi-estimator feature ranking')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    inputs = expand_inputs(args.inputs)
+    missing = [path for path in inputs if not os.path.exists(path)]
+    if missing:
+        print(f"Input not found: {', '.join(missing)}", file=sys.stderr)
+        return 2
+    report = run_batch(inputs, args.output_dir, args.jobs, args.chunksize, args.outlier_passes, args.rank_features)
+    if report['files']:
+        with pd.option_context('display.width', 200, 'display.max_columns', None):
+            print(timing_table(report))
+    for failure in report['failures']:
+        print(f"FAILED {failure['source']}: {failure['error']}", file=sys.stderr)
+    print(f"{len(report['files'])} file(s) processed in {report['seconds']:.2f}s, report: {os.path.join(args.output_dir, REPORT_NAME)}")
+    return 1 if report['failures'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
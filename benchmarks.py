@@ -0,0 +1,177 @@
+# benchmarks.py
+# Wall time, peak memory and throughput of the data-processing functions on synthetic data.
+#
+#   python benchmarks.py --sizes 10k 1M 10M
+#   python benchmarks.py --sizes 10k 1M --compare <label of an earlier run>
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from synthetic_data import generate_dataset
+
+SIZES = {'10k': 10_000, '1M': 1_000_000, '10M': 10_000_000}
+RESULTS_PATH = 'benchmark_results.jsonl'
+# A function slower than this at one size is not run at the larger sizes
+DEFAULT_BUDGET_SECONDS = 120
+# Slowdown (current / baseline) reported as a regression
+REGRESSION_RATIO = 1.25
+# Timings below this are too noisy to flag as regressions
+NOISE_FLOOR_SECONDS = 0.05
+# Small inputs are timed several times and the fastest run is kept
+REPEATS = {'10k': 3}
+
+def _numeric(df):
+    return list(df.select_dtypes(include=[np.number]).columns)
+
+def _clean(df):
+    return df.dropna().drop_duplicates()
+
+# Each benchmark: (setup(df) -> args, run(*args)); setup runs before every repeat and is not measured,
+# so functions that modify their input (standardize_data, add_datetime) always start from fresh data.
+# The page modules are imported here, not at module level, so a --functions subset only pays for what it uses.
+def benchmarks():
+    import preProcess_page as pre
+    import EDA_page as eda
+    from correlation import correlation_matrices
+    from data_loader import add_datetime
+    from features import engineer_features
+    from outlier_engine import impute_outliers
+    return {
+        'check_missing_values': (lambda df: (df,), pre.check_missing_values),
+        'impute_outliers_with_median': (lambda df: (_clean(df),), pre.impute_outliers_with_median),
+        'impute_outliers_converged': (lambda df: (_clean(df),), lambda df: impute_outliers(df, max_iter=10)),
+        'standardize_data': (lambda df: (_clean(df).copy(), _numeric(df)), pre.standardize_data),
+        'perform_pca': (lambda df: (_clean(df), _numeric(df)), pre.perform_pca),
+        'select_features_rfe': (lambda df: (_clean(df), _numeric(df), _clean(df)['ElecPrice']), pre.select_features_rfe),
+        'correlation_matrices': (lambda df: (df[_numeric(df)],), correlation_matrices),
+        'plot_correlation_heatmaps': (lambda df: (df[_numeric(df)],), eda.build_correlation_heatmaps),
+        'add_datetime': (lambda df: (df.copy(deep=False),), add_datetime),
+        'engineer_features': (lambda df: (df,), engineer_features),
+    }
+
+# Function to time one call and record its peak traced memory (numpy and pandas buffers included)
+def measure(func, setup, df, repeats=1):
+    seconds, peak = [], 0
+    for _ in range(repeats):
+        args = setup(df)
+        gc.collect()
+        tracemalloc.start()
+        started = time.perf_counter()
+        func(*args)
+        seconds.append(time.perf_counter() - started)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return min(seconds), peak
+
+def _git_label():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+# Function to run the selected benchmarks at each size, skipping sizes past a function's time budget
+def run_benchmarks(sizes=tuple(SIZES), functions=None, budget=DEFAULT_BUDGET_SECONDS, label=None, seed=0):
+    suite = benchmarks()
+    functions = functions or list(suite)
+    run = {
+        'run_id': datetime.datetime.now().isoformat(timespec='seconds'),
+        'label': label or _git_label(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+    }
+    over_budget = set()
+    results = []
+    for size in sizes:
+        n_rows = SIZES[size]
+        df = generate_dataset(n_rows, seed=seed)
+        for name in functions:
+            record = {**run, 'function': name, 'size': size, 'rows': n_rows}
+            if name in over_budget:
+                results.append({**record, 'status': 'skipped'})
+                continue
+            setup, func = suite[name]
+            try:
+                seconds, peak = measure(func, setup, df, REPEATS.get(size, 1))
+            except MemoryError:
+                over_budget.add(name)
+                results.append({**record, 'status': 'out_of_memory'})
+                continue
+            if seconds > budget:
+                over_budget.add(name)
+            results.append({**record, 'status': 'ok', 'seconds': seconds, 'peak_mb': peak / 2 ** 20,
+                            'rows_per_sec': n_rows / seconds if seconds > 0 else float('inf')})
+            print(f"{size:>4} {name:<28} {seconds:9.3f}s {peak / 2 ** 20:9.1f} MB", flush=True)
+        del df
+    return results
+
+# Function to append a run's records to the results file
+def save_results(results, path=RESULTS_PATH):
+    with open(path, 'a') as f:
+        for record in results:
+            f.write(json.dumps(record) + '\n')
+    return path
+
+# Function to read every stored benchmark record
+def load_results(path=RESULTS_PATH):
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    return pd.read_json(path, lines=True)
+
+# Function to compare a run with the latest stored run of a baseline label
+def compare(results, baseline_label, path=RESULTS_PATH, threshold=REGRESSION_RATIO):
+    history = load_results(path)
+    current = pd.DataFrame(results)
+    if history.empty or 'label' not in history or baseline_label not in set(history['label']):
+        return pd.DataFrame()
+    current = current[current['status'] == 'ok']
+    baseline = history[(history['label'] == baseline_label) & (history['status'] == 'ok')]
+    baseline = baseline[baseline['run_id'] == baseline['run_id'].max()]
+    keys = ['function', 'size']
+    table = current[keys + ['seconds', 'peak_mb']].merge(baseline[keys + ['seconds', 'peak_mb']], on=keys,
+                                                         suffixes=('', '_baseline'))
+    table['time_ratio'] = table['seconds'] / table['seconds_baseline']
+    table['memory_ratio'] = table['peak_mb'] / table['peak_mb_baseline']
+    slower = (table['time_ratio'] > threshold) & (table['seconds'] > NOISE_FLOOR_SECONDS)
+    table['regression'] = slower | (table['memory_ratio'] > threshold)
+    return table
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the data-processing functions on synthetic data.')
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=list(SIZES))
+    parser.add_argument('--functions', nargs='+', help='subset of benchmarks to run (default: all)')
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET_SECONDS, help='seconds before larger sizes are skipped')
+    parser.add_argument('--label', help='name stored with the results (default: the git commit)')
+    parser.add_argument('--results', default=RESULTS_PATH, help='JSON-lines file the results are appended to')
+    parser.add_argument('--compare', metavar='LABEL', help='compare against the latest stored run with this label')
+    args = parser.parse_args(argv)
+    unknown = set(args.functions or []) - set(benchmarks())
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    results = run_benchmarks(args.sizes, args.functions, args.budget, args.label)
+    table = None
+    if args.compare:
+        # Compare before saving so a run labelled like its baseline is not compared with itself
+        table = compare(results, args.compare, args.results)
+    save_results(results, args.results)
+    if table is None:
+        return 0
+    if table.empty:
+        print(f"No stored run labelled '{args.compare}' to compare with", file=sys.stderr)
+        return 0
+    print(table.round(3).to_string(index=False))
+    return 1 if table['regression'].any() else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,289 @@
+# catalog.py
+# Catalog of regional datasets with per-region summaries computed in a process pool.
+#
+#   python catalog.py register NSW "region_data/nsw.csv"
+#   python catalog.py build --jobs 4
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from chart_service import box_stats, histogram_stats
+from columnar_store import file_version
+from correlation import correlation_matrices
+from data_loader import add_datetime, load_dataset
+from decomposition import DECOMPOSE_COLUMNS, daily_profiles, decompose
+from features import to_regular_grid
+from streaming_pipeline import ensure_cleaned
+
+CATALOG_PATH = 'regions.json'
+REGION_OUTPUT_DIR = 'region_output'
+# Directory the comparison page may register regional files from
+REGION_DATA_DIR = os.environ.get('WEATHERELECTRIC_REGION_DATA_DIR', 'region_data')
+# Variables compared across regions
+COMPARE_COLUMNS = ['DryBulb', 'DewPnt', 'WetBulb', 'Humidity', 'ElecPrice', 'SYSLoad']
+# Bumped whenever the summary layout changes, so stale summaries are recomputed
+SUMMARY_FORMAT = 1
+
+_pool = {'executor': None, 'pending': {}}
+_summaries = {}
+_lock = threading.Lock()
+
+# Function to read the catalog: region name -> CSV path
+def load_catalog(path=CATALOG_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def _save_catalog(catalog, path):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(catalog, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+# Function to list the CSV files that can be registered from a data directory
+def available_files(data_dir=REGION_DATA_DIR):
+    if not os.path.isdir(data_dir):
+        return []
+    return sorted(name for name in os.listdir(data_dir) if name.lower().endswith('.csv'))
+
+# Function to add or update a region in the catalog; with data_dir, csv_path is taken relative to that
+# directory and may not lead outside it
+def register_region(name, csv_path, path=CATALOG_PATH, data_dir=None):
+    name = name.strip()
+    if not name:
+        raise ValueError('Region name must not be empty')
+    if data_dir is not None:
+        root = os.path.realpath(data_dir)
+        csv_path = os.path.realpath(os.path.join(root, csv_path))
+        if os.path.commonpath([root, csv_path]) != root:
+            raise ValueError(f"Regional files must be inside '{data_dir}'")
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"No such file: '{csv_path}'")
+    catalog = load_catalog(path)
+    catalog[name] = os.path.abspath(csv_path)
+    _save_catalog(catalog, path)
+    return catalog
+
+# Function to remove a region from the catalog
+def unregister_region(name, path=CATALOG_PATH):
+    catalog = load_catalog(path)
+    catalog.pop(name, None)
+    _save_catalog(catalog, path)
+    return catalog
+
+# Function to get the output directory of one region
+def region_dir(name, output_dir=REGION_OUTPUT_DIR):
+    return os.path.join(output_dir, ''.join(c if c.isalnum() or c in '-_' else '_' for c in name))
+
+def summary_path(name, output_dir=REGION_OUTPUT_DIR):
+    return os.path.join(region_dir(name, output_dir), 'summary.joblib')
+
+# Function to load a region's summary, or None when it is missing or older than the region's file
+def load_summary(name, csv_path, output_dir=REGION_OUTPUT_DIR):
+    path = summary_path(name, output_dir)
+    if not os.path.exists(path) or not os.path.exists(csv_path):
+        return None
+    # Summaries are re-read only when their file changes, so polling the catalog stays cheap
+    stamp = os.stat(path).st_mtime_ns
+    with _lock:
+        entry = _summaries.get(path)
+    if entry is None or entry[0] != stamp:
+        payload = joblib.load(path)
+        entry = (stamp, payload if payload.get('format') == SUMMARY_FORMAT else None)
+        with _lock:
+            _summaries[path] = entry
+    payload = entry[1]
+    if payload is None or payload.get('data_version') != file_version(csv_path):
+        return None
+    return payload['summary']
+
+# Function to load a region's cleaned rows (deduplicated, outliers imputed) back in their original units
+def _load_cleaned(cleaned_path, report):
+    df = load_dataset(cleaned_path)
+    scaler = report.get('scaler')
+    if scaler and scaler['columns']:
+        columns = scaler['columns']
+        df[columns] = df[columns].to_numpy(dtype=np.float64) * np.array(scaler['scale']) + np.array(scaler['mean'])
+    # Hour is standardized in the cleaned file, so DateTime is built only once it is back in hours;
+    # rounding to the minute removes the float32 error of the round trip
+    df = add_datetime(df)
+    df['DateTime'] = df['DateTime'].dt.round('min')
+    return df
+
+# Function to clean one region and reduce it to the small summary the comparison page draws from;
+# runs inside a worker process, and writes nothing outside the region's output directory
+def summarize_region(name, csv_path, output_dir=REGION_OUTPUT_DIR):
+    started = time.perf_counter()
+    version = file_version(csv_path)
+    out_dir = region_dir(name, output_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    cleaned_path = os.path.join(out_dir, 'cleaned.csv')
+    report = ensure_cleaned(csv_path, cleaned_path, store_dir=os.path.join(out_dir, 'source_store'))
+    df = _load_cleaned(cleaned_path, report)
+    columns = [col for col in COMPARE_COLUMNS if col in df.columns]
+    pearson, spearman = correlation_matrices(df[columns].dropna())
+    distributions = {col: {'hist': histogram_stats(df[col].to_numpy()), 'box': box_stats(df[col].to_numpy(), max_outliers=0)}
+                     for col in columns}
+    grid = to_regular_grid(df)
+    profiles = {col: daily_profiles(grid[col]) for col in DECOMPOSE_COLUMNS if col in grid.columns}
+    strength = {col: result['strength'] for col, result in decompose(df).items()}
+    summary = {
+        'region': name,
+        'source': os.path.abspath(csv_path),
+        'version': version,
+        'rows': len(df),
+        'start': df['DateTime'].min(),
+        'end': df['DateTime'].max(),
+        'cleaning': {key: report[key] for key in ['rows_in', 'rows_after_dedup', 'duplicates', 'missing']},
+        'means': df[columns].mean(),
+        'pearson': pearson,
+        'spearman': spearman,
+        'distributions': distributions,
+        'profiles': profiles,
+        'strength': strength,
+        'seconds': time.perf_counter() - started,
+    }
+    path = summary_path(name, output_dir)
+    joblib.dump({'format': SUMMARY_FORMAT, 'data_version': version, 'summary': summary}, path + '.tmp')
+    os.replace(path + '.tmp', path)
+    return name
+
+# Function to list the regions whose summary is missing or out of date
+def stale_regions(catalog, output_dir=REGION_OUTPUT_DIR):
+    return [name for name, csv_path in catalog.items()
+            if os.path.exists(csv_path) and load_summary(name, csv_path, output_dir) is None]
+
+# Function to compute every stale summary in a pool of worker processes and wait for them
+def build_summaries(catalog, jobs=None, output_dir=REGION_OUTPUT_DIR):
+    names = stale_regions(catalog, output_dir)
+    failures = {}
+    if names:
+        jobs = jobs or min(len(names), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {pool.submit(summarize_region, name, catalog[name], output_dir): name for name in names}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as exc:
+                    failures[futures[future]] = f'{type(exc).__name__}: {exc}'
+    return names, failures
+
+def _executor(jobs):
+    if _pool['executor'] is None:
+        _pool['executor'] = ProcessPoolExecutor(max_workers=jobs or max(1, (os.cpu_count() or 2) // 2),
+                                                mp_context=multiprocessing.get_context('spawn'))
+    return _pool['executor']
+
+# Function to start computing stale summaries in background worker processes; returns immediately.
+# The pool uses 'spawn' so workers do not inherit the web server's threads.
+def refresh_in_background(catalog, jobs=None, output_dir=REGION_OUTPUT_DIR):
+    stale = stale_regions(catalog, output_dir)
+    with _lock:
+        pending = _pool['pending']
+        for name in stale:
+            if name in pending and not pending[name].done():
+                continue
+            try:
+                pending[name] = _executor(jobs).submit(summarize_region, name, catalog[name], output_dir)
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory); start a fresh pool for this and later submissions
+                _pool['executor'] = None
+                pending[name] = _executor(jobs).submit(summarize_region, name, catalog[name], output_dir)
+        return {name: future for name, future in pending.items()}
+
+# Function to report each region's state: ready, running, failed (with the error) or missing
+def region_status(catalog, output_dir=REGION_OUTPUT_DIR):
+    with _lock:
+        pending = dict(_pool['pending'])
+    status = {}
+    for name, csv_path in catalog.items():
+        future = pending.get(name)
+        if not os.path.exists(csv_path):
+            status[name] = 'missing file'
+        elif load_summary(name, csv_path, output_dir) is not None:
+            status[name] = 'ready'
+        elif future is not None and not future.done():
+            status[name] = 'running'
+        elif future is not None and future.exception() is not None:
+            status[name] = f'failed: {future.exception()}'
+        else:
+            status[name] = 'stale'
+    return status
+
+# Function to load the summaries that are ready
+def ready_summaries(catalog, output_dir=REGION_OUTPUT_DIR):
+    summaries = {}
+    for name, csv_path in catalog.items():
+        summary = load_summary(name, csv_path, output_dir)
+        if summary is not None:
+            summaries[name] = summary
+    return summaries
+
+# Function to line up one variable's correlation with a target across regions
+def correlation_table(summaries, target='SYSLoad', method='pearson'):
+    return pd.DataFrame({name: summary[method][target].drop(target, errors='ignore') for name, summary in summaries.items()})
+
+# Function to line up a typical daily profile across regions, optionally divided by each region's mean level
+def profile_table(summaries, column, season, day_type, normalize=False):
+    curves = {}
+    for name, summary in summaries.items():
+        profiles = summary['profiles'].get(column)
+        if profiles is not None and (season, day_type) in profiles.columns:
+            curve = profiles[(season, day_type)]
+            curves[name] = curve / curve.mean() if normalize else curve
+    return pd.DataFrame(curves)
+
+# Function to line up box statistics of one variable across regions
+def distribution_table(summaries, column):
+    rows = {}
+    for name, summary in summaries.items():
+        box = summary['distributions'].get(column, {}).get('box')
+        if box is not None:
+            rows[name] = {key: box[key] for key in ['n', 'mean', 'lowerfence', 'q1', 'median', 'q3', 'upperfence']}
+    return pd.DataFrame(rows).T
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Manage the regional dataset catalog and its precomputed summaries.')
+    parser.add_argument('--catalog', default=CATALOG_PATH, help='catalog file')
+    parser.add_argument('--output-dir', default=REGION_OUTPUT_DIR, help='directory for the per-region outputs')
+    commands = parser.add_subparsers(dest='command', required=True)
+    register = commands.add_parser('register', help='add or update a region')
+    register.add_argument('name')
+    register.add_argument('csv_path')
+    remove = commands.add_parser('remove', help='remove a region')
+    remove.add_argument('name')
+    commands.add_parser('list', help='show the regions and the state of their summaries')
+    build = commands.add_parser('build', help='compute every missing or stale summary')
+    build.add_argument('--jobs', type=int, default=None, help='worker processes (default: one per region, up to the CPU count)')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == 'register':
+        register_region(args.name, args.csv_path, args.catalog)
+    elif args.command == 'remove':
+        unregister_region(args.name, args.catalog)
+    catalog = load_catalog(args.catalog)
+    if args.command == 'build':
+        started = time.perf_counter()
+        names, failures = build_summaries(catalog, args.jobs, args.output_dir)
+        for name, error in failures.items():
+            print(f"FAILED {name}: {error}", file=sys.stderr)
+        print(f"{len(names) - len(failures)} of {len(names)} stale region(s) summarized in {time.perf_counter() - started:.2f}s")
+    for name, state in region_status(catalog, args.output_dir).items():
+        print(f"{name}: {state} ({catalog[name]})")
+    return 1 if args.command == 'build' and failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
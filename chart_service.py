@@ -0,0 +1,110 @@
+# chart_service.py
+# Server-side chart statistics, concurrent figure building and an on-disk figure cache.
+import contextvars
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import plotly.graph_objects as go
+
+FIGURE_CACHE_DIR = '.figure_cache'
+# Bumped whenever the figures change shape, so stale cached JSON is rebuilt
+CHART_FORMAT = 1
+# Files kept in the figure cache (oldest removed first)
+MAX_CACHE_FILES = 256
+MAX_HIST_BINS = 200
+KDE_POINTS = 256
+# Points drawn individually beyond the box whiskers
+MAX_OUTLIER_POINTS = 500
+FIGURE_WORKERS = min(8, (os.cpu_count() or 1) + 4)
+
+_lock = threading.Lock()
+
+def _finite(values):
+    values = np.asarray(values, dtype=np.float64)
+    return values[np.isfinite(values)]
+
+# Function to compute histogram bin counts (numpy 'auto' bin width, capped) for a column
+def histogram_stats(values, max_bins=MAX_HIST_BINS):
+    values = _finite(values)
+    if len(values) == 0:
+        return {'counts': np.zeros(0), 'edges': np.zeros(1)}
+    edges = np.histogram_bin_edges(values, bins='auto')
+    if len(edges) - 1 > max_bins:
+        edges = np.linspace(values.min(), values.max(), max_bins + 1)
+    counts, edges = np.histogram(values, bins=edges)
+    return {'counts': counts, 'edges': edges}
+
+# Function to compute box-plot statistics: quartiles, 1.5 IQR whiskers, mean and a capped outlier sample
+def box_stats(values, max_outliers=MAX_OUTLIER_POINTS):
+    values = _finite(values)
+    if len(values) == 0:
+        return None
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    outliers = values[(values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)]
+    if len(outliers) > max_outliers:
+        outliers = np.random.default_rng(0).choice(outliers, max_outliers, replace=False)
+    return {'q1': q1, 'median': median, 'q3': q3, 'mean': float(values.mean()),
+            'lowerfence': float(inside.min()), 'upperfence': float(inside.max()), 'outliers': outliers, 'n': len(values)}
+
+# Function to estimate a Gaussian KDE on a fixed grid by smoothing a fine histogram (Silverman bandwidth)
+def kde_stats(values, points=KDE_POINTS):
+    values = _finite(values)
+    if len(values) < 2 or values.min() == values.max():
+        return None
+    q1, q3 = np.percentile(values, [25, 75])
+    spread = min(values.std(), (q3 - q1) / 1.34) or values.std()
+    bandwidth = 0.9 * spread * len(values) ** -0.2
+    grid = np.linspace(values.min(), values.max(), points)
+    step = grid[1] - grid[0]
+    counts, _ = np.histogram(values, bins=points, range=(grid[0] - step / 2, grid[-1] + step / 2))
+    half_width = max(1, int(np.ceil(4 * bandwidth / step)))
+    offsets = np.arange(-half_width, half_width + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+    density = np.convolve(counts, kernel)[half_width:half_width + points]
+    density = density / (density.sum() * step)
+    return {'grid': grid, 'density': density, 'bandwidth': bandwidth}
+
+# Function to build several independent figures concurrently (NumPy and JSON encoding release the GIL)
+def build_figures(builders, max_workers=FIGURE_WORKERS):
+    if len(builders) <= 1:
+        return [builder() for builder in builders]
+    # Each builder runs in a copy of the caller's context, so stages it times count towards the caller's rerun
+    context = contextvars.copy_context()
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(builders))) as pool:
+        return list(pool.map(lambda builder: context.copy().run(builder), builders))
+
+def _cache_path(name, version, params, cache_dir):
+    key = repr((CHART_FORMAT, name, version, params))
+    return os.path.join(cache_dir, f'{name}-{hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]}.json')
+
+def _prune(cache_dir, max_files):
+    files = [os.path.join(cache_dir, f) for f in os.listdir(cache_dir) if f.endswith('.json')]
+    if len(files) > max_files:
+        for path in sorted(files, key=os.path.getmtime)[:len(files) - max_files]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+# Function to load a list of figures from the on-disk cache, building and storing them on a miss
+def cached_figures(name, version, params, build, cache_dir=FIGURE_CACHE_DIR):
+    path = _cache_path(name, version, params, cache_dir) if version is not None else None
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return [go.Figure(spec) for spec in json.load(f)]
+    figures = build()
+    if path:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write('[' + ','.join(fig.to_json() for fig in figures) + ']')
+        os.replace(tmp_path, path)
+        with _lock:
+            _prune(cache_dir, MAX_CACHE_FILES)
+    return figures
@@ -0,0 +1,221 @@
+# columnar_store.py
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+from instrumentation import timed
+
+# Columns holding calendar keys rather than measurements
+DATE_COLUMNS = ['Date']
+# Object columns with fewer unique values than this ratio are stored as categoricals
+CATEGORY_RATIO = 0.5
+# Rows parsed per CSV chunk during ingest
+INGEST_CHUNKSIZE = 500_000
+MANIFEST_NAME = '_manifest.json'
+# Partition used for rows whose Date could not be parsed
+UNKNOWN_PARTITION = ('0000', '00')
+
+PARTITIONING = ds.partitioning(pa.schema([('year', pa.string()), ('month', pa.string())]), flavor='hive')
+
+# Per-path locks that serialize rebuilds and appends of one output within this process
+_path_locks = {}
+_lock = threading.Lock()
+
+# Function to get the lock that guards one output path (re-entrant, so a holder may call other guarded functions)
+def path_lock(path):
+    path = os.path.abspath(path)
+    with _lock:
+        return _path_locks.setdefault(path, threading.RLock())
+
+# Function to create a uniquely named scratch directory next to an output path
+def scratch_dir(path, suffix):
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    return tempfile.mkdtemp(prefix=os.path.basename(path) + suffix, dir=parent)
+
+# Function to move a finished directory into place; the previous one is first renamed aside under a unique name,
+# so no caller ever sees a half-written or half-deleted directory at the final path
+def replace_dir(src_dir, dst_dir):
+    old_dir = scratch_dir(dst_dir, '.old-')
+    try:
+        if os.path.exists(dst_dir):
+            os.replace(dst_dir, os.path.join(old_dir, 'previous'))
+        os.replace(src_dir, dst_dir)
+    except OSError:
+        # Another process put its own build in place first; both were built from the same source, so keep that one
+        if not os.path.exists(dst_dir):
+            raise
+        shutil.rmtree(src_dir, ignore_errors=True)
+    finally:
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+# Function to compute a version hash for a file from its path, mtime and size
+def file_version(path):
+    stat = os.stat(path)
+    key = f"{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+# Function to downcast a freshly parsed frame to compact dtypes
+def compact_dtypes(df):
+    for col in df.columns:
+        if col in DATE_COLUMNS:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+        elif pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].astype(np.float32)
+        elif df[col].dtype == object and len(df) > 0 and df[col].nunique() / len(df) < CATEGORY_RATIO:
+            df[col] = df[col].astype('category')
+    return df
+
+# Function to get the store directory that belongs to a CSV file
+def default_store_path(csv_path):
+    return os.path.splitext(csv_path)[0] + '_store'
+
+# Function to read a store's manifest (None when the store has not been built)
+def read_manifest(store_dir):
+    path = os.path.join(store_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def _partition_keys(dates):
+    years = dates.dt.strftime('%Y').fillna(UNKNOWN_PARTITION[0])
+    months = dates.dt.strftime('%m').fillna(UNKNOWN_PARTITION[1])
+    return years, months
+
+# Function to append one frame to a year/month partitioned store directory, one file per partition
+def write_partitioned(df, store_dir, part_name):
+    years, months = _partition_keys(df['Date'])
+    for (year, month), part in df.groupby([years, months], sort=True):
+        part_dir = os.path.join(store_dir, f'year={year}', f'month={month}')
+        os.makedirs(part_dir, exist_ok=True)
+        table = pa.Table.from_pandas(part, preserve_index=False)
+        pq.write_table(table, os.path.join(part_dir, f'{part_name}.parquet'))
+
+# Function to write a store's manifest
+def write_manifest(store_dir, manifest):
+    with open(os.path.join(store_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+# Function to convert a raw CSV once into a year/month partitioned Parquet store
+def ingest_csv(csv_path, store_dir=None, chunksize=INGEST_CHUNKSIZE):
+    store_dir = store_dir or default_store_path(csv_path)
+    # Each ingest writes into its own scratch directory, so concurrent ingests never share or delete each other's files
+    tmp_dir = scratch_dir(store_dir, '.tmp-')
+    try:
+        rows = parts = 0
+        columns = None
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            chunk = compact_dtypes(chunk)
+            columns = list(chunk.columns)
+            rows += len(chunk)
+            write_partitioned(chunk, tmp_dir, f'part-{parts:06d}')
+            parts += 1
+        manifest = {'source': os.path.abspath(csv_path), 'source_version': file_version(csv_path), 'rows': rows,
+                    'columns': columns, 'parts': parts}
+        write_manifest(tmp_dir, manifest)
+        replace_dir(tmp_dir, store_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return manifest
+
+def _next_part(store_dir, manifest):
+    if 'parts' in manifest:
+        return manifest['parts']
+    # Stores written before the manifest counted parts: continue after the highest part file
+    numbers = [int(name[5:11]) for _, _, files in os.walk(store_dir) for name in files
+               if name.startswith('part-') and name[5:11].isdigit()]
+    return max(numbers, default=-1) + 1
+
+# Function to append rows that were added to the end of the source CSV, without re-ingesting the rest;
+# appended files continue the part sequence, so each month partition reads back in arrival order
+def append_to_store(store_dir, df, csv_path):
+    with path_lock(store_dir):
+        manifest = read_manifest(store_dir)
+        appends = manifest.get('appends', 0) + 1
+        parts = _next_part(store_dir, manifest)
+        if len(df):
+            write_partitioned(df, store_dir, f'part-{parts:06d}')
+            parts += 1
+        manifest.update({'source_version': file_version(csv_path), 'rows': manifest['rows'] + len(df), 'appends': appends,
+                         'parts': parts})
+        write_manifest(store_dir, manifest)
+    return manifest
+
+# Function to (re)build the store only when the source CSV has changed
+def ensure_store(csv_path, store_dir=None):
+    store_dir = store_dir or default_store_path(csv_path)
+    if _store_current(store_dir, csv_path):
+        return store_dir
+    with path_lock(store_dir):
+        # Another caller may have rebuilt the store while this one waited for the lock
+        if not _store_current(store_dir, csv_path):
+            with timed('ingest_csv') as span:
+                span['rows'] = ingest_csv(csv_path, store_dir)['rows']
+    return store_dir
+
+def _store_current(store_dir, csv_path):
+    manifest = read_manifest(store_dir)
+    return manifest is not None and manifest['source_version'] == file_version(csv_path)
+
+def _open_dataset(store_dir):
+    return ds.dataset(store_dir, format='parquet', partitioning=PARTITIONING,
+                      filesystem=pafs.LocalFileSystem(use_mmap=True))
+
+def _data_columns(dataset):
+    return [name for name in dataset.schema.names if name not in ('year', 'month')]
+
+def _month_filter(start, end):
+    expr = None
+    if start is not None:
+        y, m = f'{start.year:04d}', f'{start.month:02d}'
+        expr = (ds.field('year') > y) | ((ds.field('year') == y) & (ds.field('month') >= m))
+    if end is not None:
+        y, m = f'{end.year:04d}', f'{end.month:02d}'
+        upper = (ds.field('year') < y) | ((ds.field('year') == y) & (ds.field('month') <= m))
+        expr = upper if expr is None else expr & upper
+    return expr
+
+# Function to build the partition-pruning filter for an inclusive Date range (None when unbounded)
+def date_filter(start=None, end=None):
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    expr = _month_filter(start, end)
+    if start is not None:
+        expr = expr & (ds.field('Date') >= pa.scalar(start.as_unit('ns').to_datetime64(), type=pa.timestamp('ns')))
+    if end is not None:
+        expr = expr & (ds.field('Date') <= pa.scalar(end.as_unit('ns').to_datetime64(), type=pa.timestamp('ns')))
+    return expr
+
+# Function to read a column projection and Date range from the store (memory-mapped)
+def read_store(store_dir, columns=None, start=None, end=None):
+    dataset = _open_dataset(store_dir)
+    if columns is None:
+        columns = _data_columns(dataset)
+    table = dataset.to_table(columns=list(columns), filter=date_filter(start, end))
+    # Column-by-column conversion that releases each Arrow buffer once copied keeps the peak near one copy
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+# Function to stream a column projection and Date range from the store as Arrow record batches
+def iter_store_batches(store_dir, columns=None, start=None, end=None, chunksize=INGEST_CHUNKSIZE):
+    dataset = _open_dataset(store_dir)
+    if columns is None:
+        columns = _data_columns(dataset)
+    for batch in dataset.to_batches(columns=list(columns), filter=date_filter(start, end), batch_size=chunksize):
+        if batch.num_rows:
+            yield batch
+
+# Function to stream the store in bounded-size pandas chunks
+def iter_store_chunks(store_dir, columns=None, chunksize=INGEST_CHUNKSIZE, start=None, end=None):
+    for batch in iter_store_batches(store_dir, columns, start, end, chunksize):
+        yield batch.to_pandas()
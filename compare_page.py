@@ -0,0 +1,161 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import plotly.graph_objects as go
+
+from styles import overall_css
+from catalog import (COMPARE_COLUMNS, REGION_DATA_DIR, available_files, correlation_table, distribution_table, load_catalog,
+                     profile_table, ready_summaries, refresh_in_background, register_region, region_status)
+from decomposition import DAY_TYPES, SEASON_ORDER
+from sections import lazy_section, render_plotly
+
+region_colors = ['#636EFA', '#EF553B', '#00CC96', '#AB63FA', '#FFA15A', '#19D3F3', '#FF6692', '#B6E880', '#FF97FF', '#FECB52']
+
+def show():
+    st.markdown(overall_css, unsafe_allow_html=True)
+
+    st.markdown("<h1>Regional Comparison</h1>", unsafe_allow_html=True)
+    st.write("""
+        Compare regions side by side. Each regional file is cleaned and summarized once, in background worker processes;
+        this page only draws the stored summaries, so adding a region adds background work, not page time.
+    """)
+
+    # Summaries missing or older than their file are (re)computed in the background; this returns at once
+    catalog = load_catalog()
+    refresh_in_background(catalog)
+    render_catalog(catalog)
+
+    summaries = ready_summaries(catalog)
+    if not summaries:
+        st.info("No regional summaries are ready yet. Register a regional file below the status table, then check progress.")
+        return
+    regions = st.multiselect("Regions", list(summaries), default=list(summaries))
+    summaries = {name: summaries[name] for name in regions}
+    if not summaries:
+        st.warning("Select at least one region.")
+        return
+    # Section results are keyed on the file versions behind the selected summaries
+    version = tuple((name, summary['version']) for name, summary in summaries.items())
+    st.dataframe(overview_table(summaries))
+
+    # 1. Correlation
+    st.markdown("<h2>1. Correlation</h2>", unsafe_allow_html=True)
+    st.write("How strongly does each variable move with SYSLoad in each region, and do the regions share the same correlation structure?")
+    method = st.radio("Correlation", ['pearson', 'spearman'], horizontal=True, key='compare-correlation-method')
+    lazy_section("correlation with SYSLoad", 'compare-correlation', version,
+                 lambda: correlation_table(summaries, 'SYSLoad', method), st.dataframe, params=(method,))
+    lazy_section("correlation heatmaps", 'compare-heatmaps', version,
+                 lambda: build_heatmaps(summaries, method), render_side_by_side, params=(method,))
+
+    # 2. Distributions
+    st.markdown("<h2>2. Distributions</h2>", unsafe_allow_html=True)
+    st.write("How do the distributions of a variable differ between regions?")
+    column = st.selectbox("Variable", COMPARE_COLUMNS, index=len(COMPARE_COLUMNS) - 1, key='compare-distribution-column')
+    lazy_section("distributions", 'compare-distributions', version,
+                 lambda: (build_distribution(summaries, column), distribution_table(summaries, column)), render_distribution,
+                 params=(column,))
+
+    # 3. Daily profiles
+    st.markdown("<h2>3. Daily Profiles</h2>", unsafe_allow_html=True)
+    st.write("What does a typical day look like in each region for a given season and day type?")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        profile_column = st.selectbox("Variable", ['SYSLoad', 'ElecPrice'], key='compare-profile-column')
+    with col2:
+        season = st.selectbox("Season", SEASON_ORDER, key='compare-profile-season')
+    with col3:
+        day_type = st.selectbox("Day type", DAY_TYPES, key='compare-profile-day-type')
+    normalize = st.checkbox("Divide by each region's mean level", key='compare-profile-normalize')
+    lazy_section("daily profiles", 'compare-profiles', version,
+                 lambda: [build_profiles(summaries, profile_column, season, day_type, normalize)], render_plotly,
+                 params=(profile_column, season, day_type, normalize))
+
+# Function to show the catalog with each region's state and a form to register another region
+def render_catalog(catalog):
+    st.markdown("<h2>Regions</h2>", unsafe_allow_html=True)
+    if catalog:
+        status = region_status(catalog)
+        st.dataframe(pd.DataFrame({'file': pd.Series(catalog), 'status': pd.Series(status)}))
+        if any(state == 'running' for state in status.values()):
+            st.button("Check progress", key='compare-check-progress')
+    # Only files in the configured data directory can be registered from the browser
+    files = available_files()
+    if not files:
+        st.write(f"Put regional CSV files in '{REGION_DATA_DIR}' to register them here.")
+        return
+    with st.form('compare-register'):
+        name = st.text_input("Region name")
+        path = st.selectbox(f"CSV file in '{REGION_DATA_DIR}'", files)
+        if st.form_submit_button("Register region"):
+            try:
+                register_region(name, path, data_dir=REGION_DATA_DIR)
+            except (ValueError, FileNotFoundError) as exc:
+                st.error(str(exc))
+            else:
+                st.rerun()
+
+def overview_table(summaries):
+    rows = {}
+    for name, summary in summaries.items():
+        cleaning = summary['cleaning']
+        rows[name] = {
+            'rows': summary['rows'],
+            'start': summary['start'],
+            'end': summary['end'],
+            'duplicates': cleaning['duplicates'],
+            'rows after cleaning': cleaning['rows_after_dedup'],
+            **{f'mean {col}': value for col, value in summary['means'].items()},
+            **{f'{col} daily strength': strength['daily'] for col, strength in summary['strength'].items()},
+        }
+    return pd.DataFrame(rows).T
+
+def build_heatmap(name, matrix):
+    fig = go.Figure(go.Heatmap(z=matrix.to_numpy(), x=list(matrix.columns), y=list(matrix.index), zmin=-1, zmax=1,
+                               colorscale='RdBu', text=np.round(matrix.to_numpy(), 2), texttemplate='%{text}'))
+    fig.update_layout(title=dict(text=name, font=dict(family="Times New Roman", size=16, color="black")), yaxis_autorange='reversed')
+    return fig
+
+def build_heatmaps(summaries, method):
+    return [build_heatmap(name, summary[method]) for name, summary in summaries.items()]
+
+# Function to lay figures out in rows of up to three side-by-side columns
+def render_side_by_side(figures, per_row=3):
+    for start in range(0, len(figures), per_row):
+        row = figures[start:start + per_row]
+        for col, fig in zip(st.columns(len(row)), row):
+            with col:
+                st.plotly_chart(fig, use_container_width=True)
+
+# Histograms are stored as bin counts, so each region is drawn as a density curve over its own bins
+def build_distribution(summaries, column):
+    fig = go.Figure()
+    for i, (name, summary) in enumerate(summaries.items()):
+        hist = summary['distributions'].get(column, {}).get('hist')
+        if hist is None or len(hist['counts']) == 0:
+            continue
+        edges, counts = hist['edges'], hist['counts']
+        density = counts / (counts.sum() * np.diff(edges))
+        fig.add_trace(go.Scatter(x=np.repeat(edges, 2)[1:-1], y=np.repeat(density, 2), mode='lines', name=name,
+                                 line=dict(color=region_colors[i % len(region_colors)])))
+    fig.update_layout(title=dict(text=f'Distribution of {column}', font=dict(family="Times New Roman", size=16, color="black")),
+                      xaxis_title=column, yaxis_title='density')
+    return fig
+
+def render_distribution(result):
+    fig, table = result
+    st.plotly_chart(fig)
+    st.dataframe(table)
+
+def build_profiles(summaries, column, season, day_type, normalize):
+    profiles = profile_table(summaries, column, season, day_type, normalize)
+    fig = go.Figure([
+        go.Scatter(x=profiles.index, y=profiles[name], mode='lines', name=name, line=dict(color=region_colors[i % len(region_colors)]))
+        for i, name in enumerate(profiles.columns)
+    ])
+    fig.update_layout(title=dict(text=f'{column}: typical {day_type.lower()} in {season.lower()}', font=dict(family="Times New Roman", size=16, color="black")),
+                      xaxis_title='time of day', yaxis_title=f'{column} / mean' if normalize else column)
+    return fig
+
+
+if __name__ == '__main__':
+    show()
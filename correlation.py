@@ -0,0 +1,222 @@
+# correlation.py
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from columnar_store import iter_store_chunks, read_manifest
+from data_loader import cached_derived
+
+# Above this many rows Spearman comes from the rank sketch instead of a full sort
+EXACT_SPEARMAN_ROWS = 200_000
+# Number of quantile bins per column in the Spearman rank sketch
+SKETCH_BINS = 128
+# Southern-hemisphere seasons, matching the NSW load data
+SEASONS = {12: 'Summer', 1: 'Summer', 2: 'Summer', 3: 'Autumn', 4: 'Autumn', 5: 'Autumn',
+           6: 'Winter', 7: 'Winter', 8: 'Winter', 9: 'Spring', 10: 'Spring', 11: 'Spring'}
+# Position of each season within its season year (which starts with December)
+SEASON_POSITIONS = {'Summer': 0, 'Autumn': 1, 'Winter': 2, 'Spring': 3}
+# File inside a columnar store holding its persisted CorrelationTracker
+TRACKER_NAME = '_correlation.joblib'
+# Bumped whenever the persisted tracker layout changes
+TRACKER_FORMAT = 1
+
+# Sufficient statistics (count, means, co-moment matrix) for Pearson correlation, mergeable across batches
+class CoMoments:
+    def __init__(self, columns):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.n = 0
+        self.mean = np.zeros(k)
+        self.comoment = np.zeros((k, k))
+
+    def update(self, df):
+        # Rows with any missing value are skipped so all pairs share the same sample
+        X = df[self.columns].to_numpy(dtype=np.float64)
+        X = X[~np.isnan(X).any(axis=1)]
+        if len(X) == 0:
+            return self
+        batch = CoMoments(self.columns)
+        batch.n = len(X)
+        batch.mean = X.mean(axis=0)
+        centered = X - batch.mean
+        batch.comoment = centered.T @ centered
+        return self.merge(batch)
+
+    def merge(self, other):
+        # Chan et al. pairwise update: O(k^2) regardless of how many rows each side holds
+        if other.n == 0:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.comoment = self.comoment + other.comoment + np.outer(delta, delta) * self.n * other.n / n
+        self.mean = self.mean + delta * other.n / n
+        self.n = n
+        return self
+
+    def corr(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(np.diag(self.comoment))
+            matrix = self.comoment / np.outer(std, std)
+        return pd.DataFrame(matrix, index=self.columns, columns=self.columns)
+
+# Approximate Spearman correlation from per-pair joint counts over fixed quantile bins
+class SpearmanSketch:
+    def __init__(self, columns, bins=SKETCH_BINS):
+        self.columns = list(columns)
+        self.bins = bins
+        self.edges = None
+        self.joint = None
+
+    def _codes(self, X):
+        codes = np.empty(X.shape, dtype=np.int64)
+        for j in range(X.shape[1]):
+            codes[:, j] = np.searchsorted(self.edges[j], X[:, j], side='right')
+        return codes
+
+    def update(self, df):
+        X = df[self.columns].to_numpy(dtype=np.float64)
+        X = X[~np.isnan(X).any(axis=1)]
+        if len(X) == 0:
+            return self
+        k = len(self.columns)
+        if self.edges is None:
+            # Inner edges come from the first batch; the outer bins stay open-ended
+            qs = np.linspace(0, 1, self.bins + 1)[1:-1]
+            self.edges = [np.unique(np.quantile(X[:, j], qs)) for j in range(k)]
+            self.joint = {(a, b): np.zeros((self.bins, self.bins), dtype=np.int64) for a in range(k) for b in range(a + 1, k)}
+        codes = self._codes(X)
+        for (a, b), counts in self.joint.items():
+            flat = codes[:, a] * self.bins + codes[:, b]
+            counts += np.bincount(flat, minlength=self.bins * self.bins).reshape(self.bins, self.bins)
+        return self
+
+    def corr(self):
+        k = len(self.columns)
+        matrix = np.eye(k)
+        if self.joint is None:
+            return pd.DataFrame(np.full((k, k), np.nan), index=self.columns, columns=self.columns)
+        for (a, b), counts in self.joint.items():
+            counts = counts.astype(np.float64)
+            n = counts.sum()
+            # Mid-rank of each bin from the marginal counts (ties share the average rank)
+            row, col = counts.sum(axis=1), counts.sum(axis=0)
+            rank_a = np.cumsum(row) - (row - 1) / 2
+            rank_b = np.cumsum(col) - (col - 1) / 2
+            mean = (n + 1) / 2
+            da, db = rank_a - mean, rank_b - mean
+            cov = da @ counts @ db
+            var_a, var_b = row @ da ** 2, col @ db ** 2
+            matrix[a, b] = matrix[b, a] = cov / np.sqrt(var_a * var_b) if var_a > 0 and var_b > 0 else np.nan
+        return pd.DataFrame(matrix, index=self.columns, columns=self.columns)
+
+# Incrementally maintained Pearson and Spearman matrices for a growing dataset
+class CorrelationTracker:
+    def __init__(self, columns, bins=SKETCH_BINS):
+        self.moments = CoMoments(columns)
+        self.sketch = SpearmanSketch(columns, bins)
+
+    def append(self, df):
+        # O(new rows): only the appended rows are touched
+        self.moments.update(df)
+        self.sketch.update(df)
+        return self
+
+    def pearson(self):
+        return self.moments.corr()
+
+    def spearman(self):
+        return self.sketch.corr()
+
+# Function to label each row with its month or season window; the labels are categories in chronological order
+def window_labels(dates, window='month'):
+    dates = pd.to_datetime(dates)
+    if window == 'month':
+        order = dates.dt.year * 12 + dates.dt.month
+        labels = dates.dt.to_period('M').astype(str)
+    elif window == 'season':
+        # December opens the summer of the following year, so each summer is one unbroken window
+        seasons = dates.dt.month.map(SEASONS)
+        years = dates.dt.year + (dates.dt.month == 12)
+        order = years * 4 + seasons.map(SEASON_POSITIONS)
+        labels = years.astype('Int64').astype(str) + ' ' + seasons
+    else:
+        raise ValueError(f"Unknown window '{window}', expected 'month' or 'season'")
+    categories = labels[order.notna()].iloc[np.argsort(order.dropna().to_numpy(), kind='stable')].unique()
+    return pd.Series(pd.Categorical(labels.where(order.notna()), categories=categories, ordered=True), index=dates.index)
+
+# Function to build mergeable co-moments per month or season, in chronological order
+def windowed_comoments(df, columns, window='month', date_column='Date'):
+    labels = window_labels(df[date_column], window)
+    return {label: CoMoments(columns).update(group) for label, group in df.groupby(labels, sort=True, observed=True)}
+
+# Function to compute each window's correlation of every column with a target column
+def windowed_correlation(df, columns, target, window='month', date_column='Date', rolling=1):
+    moments = windowed_comoments(df, columns, window, date_column)
+    labels = list(moments)
+    rows = {}
+    for i, label in enumerate(labels):
+        # Rolling windows merge the co-moments of the previous windows instead of rescanning rows
+        merged = CoMoments(columns)
+        for previous in labels[max(0, i - rolling + 1):i + 1]:
+            merged.merge(moments[previous])
+        rows[label] = merged.corr()[target]
+    return pd.DataFrame(rows).T.drop(columns=[target])
+
+def _load_tracker(store_dir, columns):
+    path = os.path.join(store_dir, TRACKER_NAME)
+    if not os.path.exists(path):
+        return None, None
+    payload = joblib.load(path)
+    if payload.get('format') != TRACKER_FORMAT or payload['tracker'].moments.columns != list(columns):
+        return None, None
+    return payload['tracker'], payload['data_version']
+
+def _save_tracker(store_dir, tracker, data_version):
+    path = os.path.join(store_dir, TRACKER_NAME)
+    joblib.dump({'format': TRACKER_FORMAT, 'data_version': data_version, 'tracker': tracker}, path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+# Function to fold rows appended to a store into its persisted tracker, in O(appended rows);
+# a tracker that was not at the store's previous version is left to be rebuilt on the next read
+def update_tracker(store_dir, df, previous_version, data_version):
+    path = os.path.join(store_dir, TRACKER_NAME)
+    if not os.path.exists(path):
+        return None
+    payload = joblib.load(path)
+    if payload.get('format') != TRACKER_FORMAT or payload['data_version'] != previous_version:
+        return None
+    tracker = payload['tracker'].append(df)
+    _save_tracker(store_dir, tracker, data_version)
+    return tracker
+
+# Function to get a whole store's Pearson and Spearman matrices from its tracker, scanning the store only
+# when no tracker matches the store's version (first use, or after the source was rewritten)
+def tracked_correlation(store_dir, columns):
+    columns = list(columns)
+    data_version = read_manifest(store_dir)['source_version']
+    tracker, tracker_version = _load_tracker(store_dir, columns)
+    if tracker is None or tracker_version != data_version:
+        tracker = CorrelationTracker(columns)
+        for chunk in iter_store_chunks(store_dir, columns):
+            tracker.append(chunk)
+        _save_tracker(store_dir, tracker, data_version)
+    return tracker.pearson(), tracker.spearman()
+
+def _matrices(df, columns):
+    numeric_df = df[columns]
+    pearson = CoMoments(columns).update(numeric_df).corr() if len(numeric_df) else numeric_df.corr()
+    if len(numeric_df) > EXACT_SPEARMAN_ROWS:
+        spearman = SpearmanSketch(columns).update(numeric_df).corr()
+    else:
+        spearman = numeric_df.corr(method='spearman')
+    return pearson, spearman
+
+# Function to compute Pearson and Spearman matrices, cached per dataset version in the shared memory-budgeted cache
+def correlation_matrices(df, columns=None, version=None):
+    if columns is None:
+        columns = list(df.select_dtypes(include=[np.number]).columns)
+    if version is None:
+        return _matrices(df, columns)
+    return cached_derived(('correlation', version, tuple(columns)), lambda: _matrices(df, columns))
@@ -0,0 +1,127 @@
+# data_loader.py
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from columnar_store import ensure_store, file_version, read_store
+from instrumentation import instrument
+
+# Memory the shared frames (and the views and aggregates derived from them) may hold together before the
+# least recently used ones are dropped; every Streamlit session runs in this process, so each is held once for all of them
+MEMORY_BUDGET_BYTES = int(os.environ.get('WEATHERELECTRIC_DATASET_BUDGET_MB', 1024)) * 2 ** 20
+
+_cache = OrderedDict()
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+_budget = {'bytes': MEMORY_BUDGET_BYTES}
+_lock = threading.Lock()
+
+# Function to add the DateTime column built from Date and Hour
+def add_datetime(df):
+    # Hours become integer nanoseconds in one vectorized step; NaN hours map to NaT
+    nanos = df['Hour'].to_numpy(dtype=np.float64) * 3.6e12
+    offsets = np.where(np.isnan(nanos), np.iinfo(np.int64).min, np.round(nanos)).astype(np.int64).view('timedelta64[ns]')
+    df['DateTime'] = pd.to_datetime(df['Date']) + offsets
+    return df
+
+@instrument('parse_dataset')
+def _parse(path, columns, start, end, with_datetime):
+    # Read through the columnar store; Date/Hour are needed to build DateTime
+    read_columns = columns
+    if columns is not None and with_datetime:
+        read_columns = list(dict.fromkeys(['Date', 'Hour'] + list(columns)))
+    df = read_store(ensure_store(path), columns=read_columns, start=start, end=end)
+    if with_datetime:
+        df = add_datetime(df)
+    return df
+
+def _cached_bytes():
+    return sum(entry[2] for entry in _cache.values())
+
+def _evict(keep):
+    # Frames of superseded file versions go first, then the least recently used, never the entry just added
+    for key in [key for key, entry in _cache.items() if key[0] == keep[0] and entry[0] != _cache[keep][0]]:
+        del _cache[key]
+        _stats['evictions'] += 1
+    while _cached_bytes() > _budget['bytes'] and len(_cache) > 1:
+        key = next(key for key in _cache if key != keep)
+        del _cache[key]
+        _stats['evictions'] += 1
+
+# Function to load a dataset once per file version and hand out shallow copies of the shared frame;
+# callers replace whole columns (df[col] = ...) rather than writing into them, so the shared frame is never modified
+def load_dataset(path, columns=None, start=None, end=None, with_datetime=False):
+    version = file_version(path)
+    key = (os.path.abspath(path), tuple(columns) if columns else None, start, end, with_datetime)
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] == version:
+            _cache.move_to_end(key)
+            _stats['hits'] += 1
+            return entry[1].copy(deep=False)
+        _stats['misses'] += 1
+    df = _parse(path, columns, start, end, with_datetime)
+    with _lock:
+        _cache[key] = (version, df, int(df.memory_usage(index=True, deep=True).sum()))
+        _cache.move_to_end(key)
+        _evict(key)
+    return df.copy(deep=False)
+
+# Function to get the memory held by a frame, or by a dict, list or tuple of frames (arrays count their buffer,
+# other scalars nothing)
+def frame_bytes(value):
+    if isinstance(value, dict):
+        return sum(frame_bytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(frame_bytes(item) for item in value)
+    if hasattr(value, 'memory_usage'):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    return int(getattr(value, 'nbytes', 0))
+
+# Function to memoize a value derived from a dataset version (a filtered view, an aggregate store) in the same
+# LRU and memory budget as the shared frames; derived entries are only ever dropped as least recently used
+def cached_derived(key, build, nbytes=frame_bytes):
+    key = ('derived',) + tuple(key)
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            _cache.move_to_end(key)
+            return entry[1]
+    value = build()
+    with _lock:
+        _cache[key] = (None, value, nbytes(value))
+        _cache.move_to_end(key)
+        _evict(key)
+    return value
+
+# Function to get a memoized derived value without building it (None when it is not cached)
+def peek_derived(key):
+    with _lock:
+        entry = _cache.get(('derived',) + tuple(key))
+        if entry is None:
+            return None
+        _cache.move_to_end(('derived',) + tuple(key))
+        return entry[1]
+
+# Function to change the memory budget of the shared frames, evicting at once if it shrank
+def set_memory_budget(budget_bytes):
+    with _lock:
+        _budget['bytes'] = int(budget_bytes)
+        if _cache:
+            _evict(next(reversed(_cache)))
+
+# Function to report cache hits, misses, evictions, the number of cached frames and their memory
+def cache_stats():
+    with _lock:
+        return {'hits': _stats['hits'], 'misses': _stats['misses'], 'evictions': _stats['evictions'],
+                'entries': len(_cache), 'bytes': _cached_bytes(), 'budget_bytes': _budget['bytes']}
+
+# Function to drop every cached frame
+def clear_cache():
+    with _lock:
+        _cache.clear()
+        _stats['hits'] = 0
+        _stats['misses'] = 0
+        _stats['evictions'] = 0
@@ -0,0 +1,145 @@
+# decomposition.py
+# MSTL-style decomposition (trend, daily and weekly seasonal components, residual) and typical daily profiles,
+# computed with cycle-by-cycle NumPy reshapes over the regular half-hourly grid.
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from correlation import SEASONS
+from data_loader import cached_derived
+from features import SLOTS_PER_DAY, NSWHolidayCalendar, to_regular_grid
+
+DECOMPOSE_COLUMNS = ['SYSLoad', 'ElecPrice']
+SLOTS_PER_WEEK = 7 * SLOTS_PER_DAY
+# Cycles each seasonal estimate is averaged over: the daily shape follows roughly a month, the weekly one a quarter
+DAILY_WINDOW = 29
+WEEKLY_WINDOW = 13
+# Passes of the trend / seasonal back-fitting loop; passes after the first leave outlying residuals out
+ITERATIONS = 3
+# Residuals further than this many scaled MADs from zero count as outliers (price spikes)
+OUTLIER_MADS = 6.0
+SEASON_ORDER = ['Summer', 'Autumn', 'Winter', 'Spring']
+DAY_TYPES = ['Workday', 'Weekend/holiday']
+
+# Function to take a centered, NaN-aware moving mean along the first axis (windows shrink at the edges)
+def moving_mean(values, window):
+    values = np.asarray(values, dtype=np.float64)
+    present = ~np.isnan(values)
+    pad = [(1, 0)] + [(0, 0)] * (values.ndim - 1)
+    sums = np.pad(np.cumsum(np.where(present, values, 0.0), axis=0), pad)
+    counts = np.pad(np.cumsum(present, axis=0), pad)
+    n = len(values)
+    lo = np.clip(np.arange(n) - window // 2, 0, n)
+    hi = np.clip(lo + window, 0, n)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (sums[hi] - sums[lo]) / (counts[hi] - counts[lo])
+
+# Function to estimate a seasonal component: each value becomes the mean of the same phase over nearby cycles
+def cycle_smooth(values, offset, period, window):
+    # Pad the front so row 0 of the (cycles, period) matrix starts at phase 0
+    n_cycles = -(-(offset + len(values)) // period)
+    padded = np.full(n_cycles * period, np.nan)
+    padded[offset:offset + len(values)] = values
+    smoothed = moving_mean(padded.reshape(n_cycles, period), window).reshape(-1)
+    return smoothed[offset:offset + len(values)]
+
+def _fill(values):
+    # Linear fill across gaps so the moving averages see an unbroken series
+    missing = np.isnan(values)
+    if missing.all() or not missing.any():
+        return values
+    positions = np.arange(len(values))
+    filled = values.copy()
+    filled[missing] = np.interp(positions[missing], positions[~missing], values[~missing])
+    return filled
+
+# Function to decompose one series on the regular grid into trend + daily + weekly + residual
+def decompose_series(series, daily_window=DAILY_WINDOW, weekly_window=WEEKLY_WINDOW, iterations=ITERATIONS):
+    index = series.index
+    observed = series.to_numpy(dtype=np.float64)
+    x = _fill(observed)
+    slot = int(index[0].hour * 2 + index[0].minute // 30)
+    day_offset, week_offset = slot, int(index[0].dayofweek) * SLOTS_PER_DAY + slot
+    daily = np.zeros(len(x))
+    weekly = np.zeros(len(x))
+    fit = x
+    for _ in range(iterations):
+        # A one-week moving average removes both seasonal cycles from the trend
+        trend = _fill(moving_mean(fit - daily - weekly, SLOTS_PER_WEEK))
+        detrended = fit - trend
+        # A phase with no usable value in its window gets no seasonal effect
+        daily = np.nan_to_num(cycle_smooth(detrended - weekly, day_offset, SLOTS_PER_DAY, daily_window))
+        daily = daily - moving_mean(daily, SLOTS_PER_DAY)
+        weekly = np.nan_to_num(cycle_smooth(detrended - daily, week_offset, SLOTS_PER_WEEK, weekly_window))
+        weekly = weekly - moving_mean(weekly, SLOTS_PER_WEEK)
+        # Robustness: outlying residuals (price spikes) are NaN in the next pass, which the averages skip
+        residual = x - trend - daily - weekly
+        limit = OUTLIER_MADS * 1.4826 * np.median(np.abs(residual - np.median(residual)))
+        fit = np.where(np.abs(residual) > limit, np.nan, x) if limit > 0 else x
+    residual = x - trend - daily - weekly
+    residual[np.isnan(observed)] = np.nan
+    return pd.DataFrame({'observed': observed, 'trend': trend, 'daily': daily, 'weekly': weekly, 'residual': residual},
+                        index=index)
+
+# Function to measure trend and seasonal strength (0 = none, 1 = the component explains everything but noise);
+# outlying residuals are left out so a handful of spikes do not hide the regular structure
+def component_strength(components):
+    residual = components['residual']
+    limit = OUTLIER_MADS * 1.4826 * (residual - residual.median()).abs().median()
+    present = residual.notna() & (residual.abs() <= limit if limit > 0 else True)
+    residual_var = components.loc[present, 'residual'].var()
+    strength = {}
+    for name in ['trend', 'daily', 'weekly']:
+        total_var = (components.loc[present, name] + components.loc[present, 'residual']).var()
+        strength[name] = float(max(0.0, 1 - residual_var / total_var)) if total_var > 0 else 0.0
+    return strength
+
+# Function to average the daily curve per season and day type with one bincount over (group, slot) codes
+def daily_profiles(series):
+    index = series.index
+    values = series.to_numpy(dtype=np.float64)
+    present = ~np.isnan(values)
+    seasons = index.month.map(SEASONS)
+    season_ids = pd.Categorical(seasons, categories=SEASON_ORDER).codes
+    holidays = NSWHolidayCalendar().holidays(index.min().normalize(), index.max().normalize())
+    day_type = ((index.dayofweek >= 5) | index.normalize().isin(holidays)).astype(np.int64)
+    slots = index.hour * 2 + index.minute // 30
+    codes = ((season_ids * len(DAY_TYPES) + day_type) * SLOTS_PER_DAY + slots)[present]
+    size = len(SEASON_ORDER) * len(DAY_TYPES) * SLOTS_PER_DAY
+    counts = np.bincount(codes, minlength=size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.bincount(codes, weights=values[present], minlength=size) / counts
+    labels = pd.MultiIndex.from_product([SEASON_ORDER, DAY_TYPES], names=['season', 'day_type'])
+    times = pd.Index([f'{slot // 2:02d}:{slot % 2 * 30:02d}' for slot in range(SLOTS_PER_DAY)], name='time')
+    return pd.DataFrame(means.reshape(len(labels), SLOTS_PER_DAY).T, index=times, columns=labels).dropna(axis=1, how='all')
+
+# Function to summarize each profile by its peak time, peak, trough and daily swing
+def profile_peaks(profiles):
+    return pd.DataFrame({
+        'peak_time': profiles.idxmax(),
+        'peak': profiles.max(),
+        'trough_time': profiles.idxmin(),
+        'trough': profiles.min(),
+        'swing': profiles.max() - profiles.min(),
+    })
+
+def _analyze(grid, column):
+    components = decompose_series(grid[column])
+    profiles = daily_profiles(grid[column])
+    return {'components': components, 'strength': component_strength(components),
+            'profiles': profiles, 'peaks': profile_peaks(profiles)}
+
+# Function to decompose several variables concurrently (the NumPy work releases the GIL)
+def decompose(df, columns=DECOMPOSE_COLUMNS):
+    grid = to_regular_grid(df)
+    columns = [col for col in columns if col in grid.columns]
+    if grid.empty or len(grid) < 2 * SLOTS_PER_WEEK or not columns:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(columns)) as pool:
+        results = list(pool.map(lambda col: _analyze(grid, col), columns))
+    return dict(zip(columns, results))
+
+# Function to fetch the decomposition of a dataset version from the shared memory-budgeted cache, computing it on first use
+def cached_decomposition(df, version, columns=DECOMPOSE_COLUMNS):
+    return cached_derived(('decomposition', version, tuple(columns)), lambda: decompose(df, columns))
@@ -0,0 +1,210 @@
+# dimensionality.py
+import os
+import shutil
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.decomposition import PCA, IncrementalPCA
+
+from columnar_store import iter_store_chunks, read_manifest, write_manifest, write_partitioned
+from streaming_pipeline import CHUNKSIZE
+
+SOLVERS = ('auto', 'full', 'randomized', 'incremental')
+# Above this many rows the in-memory fit switches from full to randomized SVD
+RANDOMIZED_ROWS = 200_000
+# Components kept for the reconstruction error: enough to explain this share of the variance
+VARIANCE_TARGET = 0.9
+# Columns copied next to the scores so each row can be matched back to its source row
+KEY_COLUMNS = ['Date', 'Hour']
+# Bumped whenever the persisted layout changes
+PCA_FORMAT = 1
+
+# Fitted projection: optional standardization, principal components and reconstruction error
+class PCAModel:
+    def __init__(self, columns, components, mean, explained_variance, explained_variance_ratio, solver, n_rows,
+                 scale_mean=None, scale=None):
+        self.columns = list(columns)
+        self.components_ = components
+        self.mean_ = mean
+        self.explained_variance_ = explained_variance
+        self.explained_variance_ratio_ = explained_variance_ratio
+        self.solver = solver
+        self.n_rows = n_rows
+        # Standardization applied before projecting; None when the input is already standardized
+        self.scale_mean_ = scale_mean
+        self.scale_ = scale
+        self.data_version_ = None
+
+    @classmethod
+    def from_estimator(cls, estimator, columns, solver, n_rows, scale_mean=None, scale=None):
+        return cls(columns, estimator.components_, estimator.mean_, estimator.explained_variance_,
+                   estimator.explained_variance_ratio_, solver, n_rows, scale_mean, scale)
+
+    @property
+    def component_names(self):
+        return [f'PC{i + 1}' for i in range(len(self.components_))]
+
+    # Number of leading components needed to explain `target` of the variance
+    def n_components_for(self, target=VARIANCE_TARGET):
+        cumulative = np.cumsum(self.explained_variance_ratio_)
+        return int(min(np.searchsorted(cumulative, target) + 1, len(cumulative)))
+
+    # Function to get the loadings as a columns x components frame
+    def loadings(self):
+        return pd.DataFrame(self.components_.T, index=self.columns, columns=self.component_names)
+
+    def _prepare(self, df):
+        X = df[self.columns].to_numpy(dtype=np.float64)
+        if self.scale_ is not None:
+            X = (X - self.scale_mean_) / self.scale_
+        return X - self.mean_
+
+    # Function to project rows onto the leading components
+    def transform(self, df, n_components=None):
+        components = self.components_[:n_components] if n_components else self.components_
+        return self._prepare(df) @ components.T
+
+    # Function to score each row by the mean squared error of its reconstruction from the leading components
+    def reconstruction_error(self, df, n_components=None):
+        n_components = n_components or self.n_components_for()
+        X = self._prepare(df)
+        components = self.components_[:n_components]
+        residual = X - (X @ components.T) @ components
+        return np.mean(residual ** 2, axis=1)
+
+    def save(self, path):
+        tmp_path = path + '.tmp'
+        joblib.dump({'format': PCA_FORMAT, 'data_version': self.data_version_, 'model': self}, tmp_path)
+        os.replace(tmp_path, path)
+        return path
+
+    @staticmethod
+    def load(path, data_version=None):
+        if not os.path.exists(path):
+            return None
+        payload = joblib.load(path)
+        if payload.get('format') != PCA_FORMAT:
+            return None
+        if data_version is not None and payload.get('data_version') != data_version:
+            return None
+        return payload['model']
+
+# Function to pick a solver from the row count
+def choose_solver(n_rows, solver='auto'):
+    if solver not in SOLVERS:
+        raise ValueError(f"Unknown solver '{solver}', expected one of {SOLVERS}")
+    if solver != 'auto':
+        return solver
+    return 'randomized' if n_rows > RANDOMIZED_ROWS else 'full'
+
+# Function to fit PCA in memory with full or randomized SVD; standardize=True scales the columns first
+def fit_pca(df, columns=None, n_components=None, solver='auto', standardize=False):
+    columns = list(columns) if columns is not None else list(df.select_dtypes(include=[np.number]).columns)
+    X = df[columns].dropna().to_numpy(dtype=np.float64)
+    solver = choose_solver(len(X), solver)
+    if solver == 'incremental':
+        return fit_pca_chunks(lambda: (X[i:i + CHUNKSIZE] for i in range(0, len(X), CHUNKSIZE)), columns, n_components, standardize)
+    scale_mean = scale = None
+    if standardize:
+        scale_mean, scale = X.mean(axis=0), X.std(axis=0)
+        scale[scale == 0] = 1.0
+        X = (X - scale_mean) / scale
+    n_components = n_components or min(X.shape)
+    estimator = PCA(n_components=n_components, svd_solver=solver, random_state=0 if solver == 'randomized' else None)
+    estimator.fit(X)
+    return PCAModel.from_estimator(estimator, columns, solver, len(X), scale_mean, scale)
+
+# Function to fit IncrementalPCA over chunks in fixed memory; chunks() must return a fresh iterator of arrays
+def fit_pca_chunks(chunks, columns, n_components=None, standardize=False):
+    scale_mean = scale = None
+    if standardize:
+        # One extra pass for the column means and variances (Chan's parallel update)
+        n, mean, m2 = 0, np.zeros(len(columns)), np.zeros(len(columns))
+        for X in chunks():
+            X = X[~np.isnan(X).any(axis=1)]
+            if len(X):
+                batch_mean = X.mean(axis=0)
+                delta = batch_mean - mean
+                total = n + len(X)
+                m2 += ((X - batch_mean) ** 2).sum(axis=0) + delta ** 2 * n * len(X) / total
+                mean += delta * len(X) / total
+                n = total
+        scale_mean, scale = mean, np.sqrt(m2 / max(n, 1))
+        scale[scale == 0] = 1.0
+    n_components = n_components or len(columns)
+    estimator = IncrementalPCA(n_components=n_components)
+    pending, rows = None, 0
+    for X in chunks():
+        X = X[~np.isnan(X).any(axis=1)]
+        if scale is not None:
+            X = (X - scale_mean) / scale
+        # partial_fit needs at least n_components rows per batch, so short chunks are carried over
+        pending = X if pending is None else np.vstack([pending, X])
+        if len(pending) >= n_components:
+            estimator.partial_fit(pending)
+            rows += len(pending)
+            pending = None
+    # A final remainder shorter than n_components is left out
+    if rows == 0:
+        raise ValueError('Not enough complete rows to fit PCA')
+    return PCAModel.from_estimator(estimator, columns, 'incremental', rows, scale_mean, scale)
+
+# Function to fit PCA over a columnar store chunk by chunk
+def fit_pca_store(store_dir, columns, n_components=None, standardize=False, chunksize=CHUNKSIZE):
+    return fit_pca_chunks(lambda: (chunk.to_numpy(dtype=np.float64) for chunk in iter_store_chunks(store_dir, columns, chunksize)),
+                          columns, n_components, standardize)
+
+# Function to get the store directory that holds a source store's component scores
+def scores_store_path(store_dir):
+    return store_dir.rstrip(os.sep) + '_pca'
+
+# Function to stream component scores and reconstruction errors for every row into a partitioned store
+def stream_scores(model, store_dir, dst_dir=None, n_components=None, chunksize=CHUNKSIZE):
+    dst_dir = dst_dir or scores_store_path(store_dir)
+    tmp_dir = dst_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    n_components = n_components or model.n_components_for()
+    names = model.component_names[:n_components]
+    rows = 0
+    for i, chunk in enumerate(iter_store_chunks(store_dir, list(dict.fromkeys(KEY_COLUMNS + model.columns)), chunksize)):
+        chunk = chunk.dropna(subset=model.columns)
+        if chunk.empty:
+            continue
+        scores = pd.DataFrame(model.transform(chunk, n_components).astype(np.float32), columns=names, index=chunk.index)
+        for position, key in enumerate(KEY_COLUMNS):
+            scores.insert(position, key, chunk[key])
+        scores['reconstruction_error'] = model.reconstruction_error(chunk, n_components).astype(np.float32)
+        write_partitioned(scores, tmp_dir, f'part-{i:06d}')
+        rows += len(scores)
+    source = read_manifest(store_dir) or {}
+    write_manifest(tmp_dir, {'source': os.path.abspath(store_dir), 'source_version': source.get('source_version'),
+                             'model_version': model.data_version_, 'rows': rows, 'columns': KEY_COLUMNS + names + ['reconstruction_error'],
+                             'n_components': n_components})
+    shutil.rmtree(dst_dir, ignore_errors=True)
+    os.replace(tmp_dir, dst_dir)
+    return dst_dir
+
+# Function to (re)write the scores store only when the source store or the model has changed
+def ensure_scores(model, store_dir, dst_dir=None, chunksize=CHUNKSIZE):
+    dst_dir = dst_dir or scores_store_path(store_dir)
+    manifest = read_manifest(dst_dir)
+    source = read_manifest(store_dir) or {}
+    if (manifest is None or manifest.get('source_version') != source.get('source_version')
+            or manifest.get('model_version') != model.data_version_):
+        stream_scores(model, store_dir, dst_dir, chunksize=chunksize)
+    return dst_dir
+
+# Function to list the rows whose reconstruction error is highest
+def top_anomalies(scores, n=20):
+    return scores.nlargest(n, 'reconstruction_error')[KEY_COLUMNS + ['reconstruction_error']].reset_index(drop=True)
+
+# Function to warm-start a PCA model from disk, fitting and persisting it only when the data changed
+def load_or_fit_pca(path, data_version, fit):
+    model = PCAModel.load(path, data_version)
+    if model is None:
+        model = fit()
+        model.data_version_ = data_version
+        model.save(path)
+    return model
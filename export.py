@@ -0,0 +1,110 @@
+# export.py
+# On-demand, chunked export of a columnar store to compressed CSV, Parquet or Feather, cached per dataset version.
+import gzip
+import hashlib
+import os
+import threading
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from columnar_store import iter_store_batches, read_manifest
+from instrumentation import timed
+
+EXPORT_DIR = '.export_cache'
+# Bumped whenever the exported layout changes, so stale artifacts are rewritten
+EXPORT_FORMAT = 1
+# Files kept in the export cache (oldest removed first)
+MAX_EXPORT_FILES = 16
+# Rows read from the store and written per chunk
+EXPORT_CHUNKSIZE = 100_000
+# gzip level for CSV exports: close to the best ratio at a fraction of level 9's time
+CSV_COMPRESSLEVEL = 6
+# File extension and MIME type of each export format
+FORMATS = {
+    'csv.gz': 'application/gzip',
+    'parquet': 'application/vnd.apache.parquet',
+    'feather': 'application/vnd.apache.arrow.file',
+}
+
+_lock = threading.Lock()
+
+# Function to get the cache path of an export from the store version and the requested subset
+def export_path(store_dir, fmt, columns=None, start=None, end=None, export_dir=EXPORT_DIR):
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}', expected one of {list(FORMATS)}")
+    manifest = read_manifest(store_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No columnar store at '{store_dir}'")
+    key = repr((EXPORT_FORMAT, os.path.abspath(store_dir), manifest['source_version'], fmt,
+                tuple(columns) if columns is not None else None, str(start), str(end)))
+    name = os.path.basename(store_dir.rstrip(os.sep))
+    return os.path.join(export_dir, f'{name}-{hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]}.{fmt}')
+
+def _write_csv(batches, path):
+    # One gzip stream; the header is written with the first chunk only
+    rows = 0
+    with gzip.open(path, 'wt', compresslevel=CSV_COMPRESSLEVEL, encoding='utf-8', newline='') as f:
+        for batch in batches:
+            batch.to_pandas().to_csv(f, header=rows == 0, index=False)
+            rows += batch.num_rows
+    return rows
+
+def _write_parquet(batches, path):
+    rows, writer = 0, None
+    try:
+        for batch in batches:
+            if writer is None:
+                writer = pq.ParquetWriter(path, batch.schema, compression='zstd')
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+def _write_feather(batches, path):
+    # Feather v2 is the Arrow IPC file format
+    rows, writer, sink = 0, None, pa.OSFile(path, 'wb')
+    try:
+        for batch in batches:
+            if writer is None:
+                writer = ipc.new_file(sink, batch.schema, options=ipc.IpcWriteOptions(compression='lz4'))
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+        sink.close()
+    return rows
+
+WRITERS = {'csv.gz': _write_csv, 'parquet': _write_parquet, 'feather': _write_feather}
+
+def _prune(export_dir, max_files):
+    files = [os.path.join(export_dir, f) for f in os.listdir(export_dir) if not f.endswith('.tmp')]
+    if len(files) > max_files:
+        for path in sorted(files, key=os.path.getmtime)[:len(files) - max_files]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+# Function to stream a store subset to an export file, reusing the cached file while the store is unchanged
+def ensure_export(store_dir, fmt, columns=None, start=None, end=None, export_dir=EXPORT_DIR, chunksize=EXPORT_CHUNKSIZE):
+    path = export_path(store_dir, fmt, columns, start, end, export_dir)
+    if os.path.exists(path):
+        return path
+    os.makedirs(export_dir, exist_ok=True)
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    with timed(f'export:{fmt}') as span:
+        span['rows'] = WRITERS[fmt](iter_store_batches(store_dir, columns, start, end, chunksize), tmp_path)
+    if span['rows'] == 0:
+        # The Parquet writer opens its file on the first batch, so an empty export may have left nothing behind
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise ValueError('No rows match the requested export')
+    os.replace(tmp_path, path)
+    with _lock:
+        _prune(export_dir, MAX_EXPORT_FILES)
+    return path
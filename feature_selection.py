@@ -0,0 +1,137 @@
+# feature_selection.py
+import hashlib
+import os
+import threading
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import ExtraTreesRegressor
+from sklearn.feature_selection import RFECV, mutual_info_regression
+from sklearn.inspection import permutation_importance
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.model_selection import TimeSeriesSplit
+
+METHODS = ('rfecv', 'permutation', 'mutual_info')
+N_SPLITS = 5
+# Stop adding folds once the top features have not changed for this many folds
+PATIENCE = 2
+# Rows drawn (in time order) for permutation and mutual information on large frames
+MAX_ROWS = 50_000
+
+_cache = {}
+_lock = threading.Lock()
+
+# Function to create the estimators compared by the search
+def default_estimators():
+    return {
+        'linear': LinearRegression(),
+        'ridge': Ridge(alpha=1.0),
+        'extra_trees': ExtraTreesRegressor(n_estimators=30, max_depth=8, n_jobs=1, random_state=0),
+    }
+
+# Function to list the candidate features, never including the target itself
+def candidate_features(df, target, features=None):
+    if features is None:
+        features = df.select_dtypes(include=[np.number]).columns
+    return [col for col in features if col != target]
+
+def _thin(X, y, max_rows):
+    if len(X) <= max_rows:
+        return X, y
+    step = int(np.ceil(len(X) / max_rows))
+    return X[::step], y[::step]
+
+def _rfecv_task(name, estimator, X, y, n_splits):
+    selector = RFECV(estimator, step=1, cv=TimeSeriesSplit(n_splits=n_splits), n_jobs=1)
+    selector.fit(X, y)
+    return ('rfecv', name, None, -selector.ranking_.astype(np.float64))
+
+def _permutation_task(name, estimator, X, y, train, test, fold):
+    model = clone(estimator).fit(X[train], y[train])
+    result = permutation_importance(model, X[test], y[test], n_repeats=3, random_state=0, n_jobs=1)
+    return ('permutation', name, fold, result.importances_mean)
+
+def _mutual_info_task(X, y, train, fold):
+    return ('mutual_info', 'mutual_info', fold, mutual_info_regression(X[train], y[train], random_state=0))
+
+def _to_ranks(scores):
+    # Rank 1 is the most important feature
+    return pd.Series(scores).rank(ascending=False, method='average').to_numpy()
+
+def _summarize(results, features):
+    grouped = {}
+    for method, name, _, scores in results:
+        grouped.setdefault(f'{method}:{name}', []).append(scores)
+    table = pd.DataFrame({key: np.mean(scores, axis=0) for key, scores in grouped.items()}, index=features)
+    ranks = pd.DataFrame({key: _to_ranks(table[key].to_numpy()) for key in table.columns}, index=features)
+    table['mean_rank'] = ranks.mean(axis=1)
+    return table.sort_values('mean_rank')
+
+# Function to rank features with several methods and estimators over time-series folds, in parallel
+def rank_features(df, target, features=None, methods=METHODS, estimators=None, n_splits=N_SPLITS,
+                  n_features_to_select=5, patience=PATIENCE, n_jobs=-1, max_rows=MAX_ROWS):
+    features = candidate_features(df, target, features)
+    estimators = estimators or default_estimators()
+    data = df[features + [target]].dropna()
+    X = data[features].to_numpy(dtype=np.float64)
+    y = data[target].to_numpy(dtype=np.float64)
+    X_thin, y_thin = _thin(X, y, max_rows)
+    folds = list(TimeSeriesSplit(n_splits=n_splits).split(X_thin))
+    results = []
+    stable, previous_top, folds_used = 0, None, 0
+    with Parallel(n_jobs=n_jobs) as parallel:
+        if 'rfecv' in methods:
+            # RFECV already cross-validates internally, so it runs once per estimator
+            results += parallel(delayed(_rfecv_task)(name, est, X_thin, y_thin, n_splits) for name, est in estimators.items())
+        for fold, (train, test) in enumerate(folds):
+            tasks = []
+            if 'permutation' in methods:
+                tasks += [delayed(_permutation_task)(name, est, X_thin, y_thin, train, test, fold) for name, est in estimators.items()]
+            if 'mutual_info' in methods:
+                tasks.append(delayed(_mutual_info_task)(X_thin, y_thin, train, fold))
+            if not tasks:
+                break
+            results += parallel(tasks)
+            folds_used = fold + 1
+            # Early stopping: the top features have settled across consecutive folds
+            top = tuple(_summarize(results, features).index[:n_features_to_select])
+            stable = stable + 1 if top == previous_top else 0
+            previous_top = top
+            if stable >= patience:
+                break
+    table = _summarize(results, features)
+    return {
+        'ranking': table,
+        'selected': list(table.index[:n_features_to_select]),
+        'folds_used': folds_used,
+        'n_splits': n_splits,
+        'rows': len(X_thin),
+    }
+
+def _cache_key(version, target, features, methods, estimators, n_splits, n_features_to_select):
+    key = repr((version, target, tuple(features), tuple(methods), tuple(sorted(estimators)), n_splits, n_features_to_select))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+# Function to rank features once per (data version, feature set, settings), in memory and optionally on disk
+def cached_rank_features(df, target, version, features=None, methods=METHODS, estimators=None, n_splits=N_SPLITS,
+                         n_features_to_select=5, cache_dir=None, n_jobs=-1):
+    features = candidate_features(df, target, features)
+    estimators = estimators or default_estimators()
+    key = _cache_key(version, target, features, methods, estimators, n_splits, n_features_to_select)
+    with _lock:
+        if key in _cache:
+            return _cache[key]
+    path = os.path.join(cache_dir, f'features-{key}.joblib') if cache_dir else None
+    if path and os.path.exists(path):
+        result = joblib.load(path)
+    else:
+        result = rank_features(df, target, features, methods, estimators, n_splits, n_features_to_select, n_jobs=n_jobs)
+        if path:
+            os.makedirs(cache_dir, exist_ok=True)
+            joblib.dump(result, path)
+    with _lock:
+        _cache[key] = result
+    return result
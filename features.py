@@ -0,0 +1,131 @@
+# features.py
+import numpy as np
+import pandas as pd
+from pandas.tseries.holiday import MO, AbstractHolidayCalendar, Holiday
+from pandas.tseries.offsets import DateOffset, Day, Easter
+
+from data_loader import add_datetime, cached_derived, peek_derived
+
+# The load data is recorded every half hour
+FREQ = '30min'
+SLOTS_PER_DAY = 48
+# Lags in half-hour steps, named like the existing sysload(D-1) / sysload(W-1) columns
+LAGS = {'D-1': SLOTS_PER_DAY, 'W-1': 7 * SLOTS_PER_DAY}
+# Rolling windows in half-hour steps
+WINDOWS = {'6h': 12, '1d': SLOTS_PER_DAY, '7d': 7 * SLOTS_PER_DAY}
+LAG_COLUMNS = ['SYSLoad', 'ElecPrice']
+ROLLING_COLUMNS = ['SYSLoad', 'ElecPrice', 'DryBulb']
+# Base temperature (degrees Celsius) for heating/cooling degree features
+BASE_TEMPERATURE = 18.0
+CALENDAR_COLUMNS = ['slot', 'hour_sin', 'hour_cos', 'day_of_week', 'is_weekend', 'is_holiday', 'is_workday',
+                    'month', 'doy_sin', 'doy_cos']
+TEMPERATURE_FEATURE_COLUMNS = ['dewpoint_depression', 'wetbulb_depression', 'cooling_degree', 'heating_degree']
+
+# New South Wales public holidays (fixed-date, Easter-based and Monday rules)
+class NSWHolidayCalendar(AbstractHolidayCalendar):
+    rules = [
+        Holiday("New Year's Day", month=1, day=1),
+        Holiday('Australia Day', month=1, day=26),
+        Holiday('Good Friday', month=1, day=1, offset=[Easter(), Day(-2)]),
+        Holiday('Easter Monday', month=1, day=1, offset=[Easter(), Day(1)]),
+        Holiday('Anzac Day', month=4, day=25),
+        Holiday("King's Birthday", month=6, day=1, offset=DateOffset(weekday=MO(2))),
+        Holiday('Labour Day', month=10, day=1, offset=DateOffset(weekday=MO(1))),
+        Holiday('Christmas Day', month=12, day=25),
+        Holiday('Boxing Day', month=12, day=26),
+    ]
+
+# Function to put the rows on a regular half-hourly DateTime index, leaving gaps as NaN rows
+def to_regular_grid(df, freq=FREQ):
+    if 'DateTime' not in df.columns:
+        df = add_datetime(df.copy(deep=False))
+    df = df.dropna(subset=['DateTime']).drop_duplicates(subset=['DateTime'], keep='first').set_index('DateTime').sort_index()
+    if df.empty:
+        return df
+    grid = pd.date_range(df.index[0], df.index[-1], freq=freq)
+    return df.reindex(grid).rename_axis('DateTime')
+
+# Function to add day/week lag columns with positional shifts on the regular grid
+def lag_features(grid, columns=LAG_COLUMNS, lags=LAGS):
+    return {f'{col.lower()}({name})': grid[col].shift(steps) for col in columns for name, steps in lags.items()}
+
+# Function to add trailing rolling mean/std columns that only look at past values
+def rolling_features(grid, columns=ROLLING_COLUMNS, windows=WINDOWS):
+    out = {}
+    for col in columns:
+        past = grid[col].shift(1)
+        for name, steps in windows.items():
+            rolling = past.rolling(steps, min_periods=max(1, steps // 2))
+            out[f'{col.lower()}_mean_{name}'] = rolling.mean()
+            out[f'{col.lower()}_std_{name}'] = rolling.std()
+    return out
+
+# Function to add hour-of-day, day-of-week, month and holiday encodings
+def calendar_features(index):
+    hours = index.hour + index.minute / 60.0
+    day_of_year = index.dayofyear
+    holidays = NSWHolidayCalendar().holidays(index.min().normalize(), index.max().normalize())
+    is_holiday = index.normalize().isin(holidays)
+    return {
+        'slot': (hours * 2).astype(np.int16),
+        'hour_sin': np.sin(2 * np.pi * hours / 24),
+        'hour_cos': np.cos(2 * np.pi * hours / 24),
+        'day_of_week': index.dayofweek.astype(np.int8),
+        'is_weekend': (index.dayofweek >= 5).astype(np.int8),
+        'is_holiday': is_holiday.astype(np.int8),
+        'is_workday': ((index.dayofweek < 5) & ~is_holiday).astype(np.int8),
+        'month': index.month.astype(np.int8),
+        'doy_sin': np.sin(2 * np.pi * day_of_year / 365.25),
+        'doy_cos': np.cos(2 * np.pi * day_of_year / 365.25),
+    }
+
+# Function to add temperature-derived features
+def temperature_features(grid):
+    return {
+        'dewpoint_depression': grid['DryBulb'] - grid['DewPnt'],
+        'wetbulb_depression': grid['DryBulb'] - grid['WetBulb'],
+        'cooling_degree': (grid['DryBulb'] - BASE_TEMPERATURE).clip(lower=0),
+        'heating_degree': (BASE_TEMPERATURE - grid['DryBulb']).clip(lower=0),
+    }
+
+# Function to build every engineered feature on the regular grid in one vectorized pass
+def engineer_features(df, lag_columns=LAG_COLUMNS, lags=LAGS, rolling_columns=ROLLING_COLUMNS, windows=WINDOWS):
+    grid = to_regular_grid(df)
+    if grid.empty:
+        return grid
+    new_columns = {}
+    new_columns.update(lag_features(grid, lag_columns, lags))
+    new_columns.update(rolling_features(grid, rolling_columns, windows))
+    new_columns.update(calendar_features(grid.index))
+    new_columns.update(temperature_features(grid))
+    features = pd.DataFrame(new_columns, index=grid.index)
+    base = grid.drop(columns=[col for col in features.columns if col in grid.columns])
+    return pd.concat([base, features], axis=1)
+
+# Function to count how many past rows a new row's features depend on
+def lookback_rows(lags=LAGS, windows=WINDOWS):
+    return max(list(lags.values()) + [steps + 1 for steps in windows.values()])
+
+# Function to extend an engineered frame with newly appended raw rows, recomputing only the new tail
+def append_features(features, new_rows, **kwargs):
+    if features is None or features.empty:
+        return engineer_features(new_rows, **kwargs)
+    new_grid = to_regular_grid(new_rows)
+    new_grid = new_grid[new_grid.index > features.index[-1]]
+    if new_grid.empty:
+        return features
+    context = features[new_grid.columns.intersection(features.columns)].iloc[-lookback_rows(kwargs.get('lags', LAGS), kwargs.get('windows', WINDOWS)):]
+    combined = pd.concat([context, new_grid[context.columns]]).reset_index()
+    tail = engineer_features(combined, **kwargs)
+    tail = tail[tail.index > features.index[-1]]
+    return pd.concat([features, tail[features.columns]])
+
+# Function to fetch the engineered features of a dataset version from the shared memory-budgeted cache, building them
+# on first use; when the version only appended rows to `previous_version` and that frame is cached, only the tail is built
+def cached_features(df, version, previous_version=None):
+    def build():
+        previous = peek_derived(('features', previous_version)) if previous_version is not None else None
+        if previous is None:
+            return engineer_features(df)
+        return append_features(previous, df)
+    return cached_derived(('features', version), build)
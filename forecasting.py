@@ -0,0 +1,146 @@
+# forecasting.py
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.linear_model import Ridge
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from features import BASE_TEMPERATURE, CALENDAR_COLUMNS, SLOTS_PER_DAY, TEMPERATURE_FEATURE_COLUMNS
+
+# Day-ahead: 48 half-hour slots
+HORIZON = SLOTS_PER_DAY
+MODELS = ('seasonal_naive_day', 'seasonal_naive_week', 'linear', 'gbm')
+TARGETS = ('ElecPrice', 'SYSLoad')
+WEATHER_COLUMNS = ['DryBulb', 'DewPnt', 'WetBulb', 'Humidity']
+TEMPERATURE_COLUMNS = ['DryBulb', 'DewPnt', 'WetBulb']
+N_FOLDS = 5
+TEST_DAYS = 7
+# Bumped whenever the persisted layout or what a saved model was trained on changes
+FORECASTER_FORMAT = 2
+
+# Function to build the day-ahead design matrix: only values known at least `horizon` steps earlier
+def design_matrix(features, target, horizon=HORIZON):
+    # Weather at the forecast time is treated as known (it comes from the weather forecast)
+    columns = {col: features[col] for col in WEATHER_COLUMNS + TEMPERATURE_FEATURE_COLUMNS + CALENDAR_COLUMNS if col in features}
+    for col in features.columns:
+        if col.endswith('(D-1)') or col.endswith('(W-1)'):
+            columns[col] = features[col]
+        elif '_mean_' in col or '_std_' in col:
+            # Rolling stats end one step back; push them back to the forecast origin
+            columns[f'{col}_origin'] = features[col].shift(horizon - 1)
+    X = pd.DataFrame(columns, index=features.index)
+    y = features[target]
+    keep = X.notna().all(axis=1) & y.notna()
+    return X[keep], y[keep]
+
+# A day-ahead model for one target: seasonal-naive baselines or a regression on the design matrix
+class Forecaster:
+    def __init__(self, target, model='gbm', horizon=HORIZON):
+        if model not in MODELS:
+            raise ValueError(f"Unknown model '{model}', expected one of {MODELS}")
+        self.target = target
+        self.model = model
+        self.horizon = horizon
+        self.columns_ = None
+        self.estimator_ = None
+        self.data_version_ = None
+
+    def _naive_column(self):
+        lag = 'D-1' if self.model == 'seasonal_naive_day' else 'W-1'
+        return f'{self.target.lower()}({lag})'
+
+    def fit(self, X, y, data_version=None):
+        self.columns_ = list(X.columns)
+        if self.model == 'linear':
+            self.estimator_ = make_pipeline(StandardScaler(), Ridge(alpha=1.0))
+        elif self.model == 'gbm':
+            self.estimator_ = HistGradientBoostingRegressor(max_iter=200, learning_rate=0.1, random_state=0)
+        if self.estimator_ is not None:
+            self.estimator_.fit(X.to_numpy(dtype=np.float64), y.to_numpy(dtype=np.float64))
+        self.data_version_ = data_version
+        return self
+
+    # Function to predict many rows at once from a 2-D array (or frame) in design-matrix column order
+    def predict(self, X):
+        X = X.to_numpy(dtype=np.float64) if isinstance(X, pd.DataFrame) else np.asarray(X, dtype=np.float64)
+        if self.estimator_ is None:
+            return X[:, self.columns_.index(self._naive_column())]
+        return self.estimator_.predict(X)
+
+    def save(self, path):
+        tmp_path = path + '.tmp'
+        joblib.dump({'format': FORECASTER_FORMAT, 'data_version': self.data_version_, 'forecaster': self}, tmp_path)
+        os.replace(tmp_path, path)
+        return path
+
+    @staticmethod
+    def load(path, data_version=None):
+        if not os.path.exists(path):
+            return None
+        payload = joblib.load(path)
+        if payload.get('format') != FORECASTER_FORMAT:
+            return None
+        if data_version is not None and payload.get('data_version') != data_version:
+            return None
+        return payload['forecaster']
+
+# Function to warm-start a forecaster from disk, fitting and persisting it only when the data changed
+def load_or_fit_forecaster(path, features, target, model='gbm', data_version=None):
+    forecaster = Forecaster.load(path, data_version)
+    if forecaster is None:
+        X, y = design_matrix(features, target)
+        forecaster = Forecaster(target, model).fit(X, y, data_version)
+        forecaster.save(path)
+    return forecaster
+
+def _rmse_mae(actual, predicted):
+    error = actual - predicted
+    return float(np.sqrt(np.mean(error ** 2))), float(np.mean(np.abs(error)))
+
+def _backtest_task(X, y, target, model, fold, train_end, test_end):
+    forecaster = Forecaster(target, model).fit(X.iloc[:train_end], y.iloc[:train_end])
+    predicted = forecaster.predict(X.iloc[train_end:test_end])
+    rmse, mae = _rmse_mae(y.iloc[train_end:test_end].to_numpy(dtype=np.float64), predicted)
+    return {'model': model, 'fold': fold, 'train_rows': train_end, 'test_rows': test_end - train_end, 'RMSE': rmse, 'MAE': mae}
+
+# Function to run an expanding-window walk-forward backtest with folds evaluated in parallel
+def walk_forward_backtest(features, target, models=MODELS, n_folds=N_FOLDS, test_days=TEST_DAYS, n_jobs=-1):
+    X, y = design_matrix(features, target)
+    test_rows = test_days * SLOTS_PER_DAY
+    tasks = []
+    for fold in range(n_folds):
+        test_end = len(X) - (n_folds - 1 - fold) * test_rows
+        train_end = test_end - test_rows
+        if train_end <= 0:
+            continue
+        tasks += [delayed(_backtest_task)(X, y, target, model, fold, train_end, test_end) for model in models]
+    folds = pd.DataFrame(Parallel(n_jobs=n_jobs)(tasks))
+    if folds.empty:
+        return folds, folds
+    summary = folds.groupby('model')[['RMSE', 'MAE']].mean().sort_values('RMSE')
+    return folds, summary
+
+# Function to forecast the 48 slots of one day under many temperature scenarios in one batched predict call
+def forecast_scenarios(forecaster, X_day, temperature_offsets):
+    offsets = np.asarray(temperature_offsets, dtype=np.float64)
+    columns = list(X_day.columns)
+    base = X_day.to_numpy(dtype=np.float64)
+    # scenarios x slots x features, filled by broadcasting rather than a Python loop
+    stack = np.repeat(base[None, :, :], len(offsets), axis=0)
+    for col in TEMPERATURE_COLUMNS:
+        if col in columns:
+            stack[:, :, columns.index(col)] += offsets[:, None]
+    if 'DryBulb' in columns:
+        dry = stack[:, :, columns.index('DryBulb')]
+        if 'cooling_degree' in columns:
+            stack[:, :, columns.index('cooling_degree')] = np.clip(dry - BASE_TEMPERATURE, 0, None)
+        if 'heating_degree' in columns:
+            stack[:, :, columns.index('heating_degree')] = np.clip(BASE_TEMPERATURE - dry, 0, None)
+    predicted = forecaster.predict(stack.reshape(-1, len(columns)))
+    return pd.DataFrame(predicted.reshape(len(offsets), len(base)).T, index=X_day.index,
+                        columns=[f'{offset:+g}°C' for offset in offsets])
@@ -0,0 +1,99 @@
+# import_profile.py
+# Import-time profile of the app start and of each page, using `python -X importtime`.
+#
+#   python import_profile.py            # print the report, exit 1 if the start-up budget is broken
+#   python import_profile.py --json import_profile.json
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+import pandas as pd
+
+# What each profile runs in a fresh interpreter
+TARGETS = {
+    'streamlit': 'import streamlit',
+    'app_start': "import runpy; runpy.run_path('App.py')",
+    'intro_page': 'import intro_page',
+    'preProcess_page': 'import preProcess_page',
+    'EDA_page': 'import EDA_page',
+    'compare_page': 'import compare_page',
+}
+# Libraries the landing page must not load; they belong to the pages that use them
+STARTUP_FORBIDDEN = ('sklearn', 'matplotlib', 'seaborn', 'scipy', 'pyarrow', 'joblib')
+# Extra import time (ms) the app start may add on top of Streamlit itself
+STARTUP_BUDGET_MS = 250
+TOP_N = 15
+
+_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+# Function to run a snippet in a fresh interpreter and parse its import-time log
+def profile(code, cwd=None):
+    env = dict(os.environ, PYTHONWARNINGS='ignore')
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=cwd, env=env,
+                            capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append({'module': module, 'self_ms': int(self_us) / 1000, 'cumulative_ms': int(cumulative_us) / 1000,
+                         'depth': len(indent) // 2})
+    return pd.DataFrame(rows, columns=['module', 'self_ms', 'cumulative_ms', 'depth'])
+
+def _total_ms(frame):
+    # Top-level imports are at depth 0; their cumulative times add up to the whole import cost
+    return float(frame.loc[frame['depth'] == 0, 'cumulative_ms'].sum())
+
+def _top_packages(frame, n=TOP_N):
+    packages = frame['module'].str.split('.').str[0]
+    return frame.groupby(packages)['self_ms'].sum().sort_values(ascending=False).head(n)
+
+# Function to profile every target and check the start-up budget
+def build_report(cwd=None, targets=TARGETS):
+    frames = {name: profile(code, cwd) for name, code in targets.items()}
+    baseline = set(frames['streamlit']['module']) if 'streamlit' in frames else set()
+    report = {'targets': {}, 'violations': []}
+    for name, frame in frames.items():
+        added = frame[~frame['module'].isin(baseline)] if name != 'streamlit' else frame
+        report['targets'][name] = {
+            'modules': int(len(frame)),
+            'total_ms': _total_ms(frame),
+            'added_modules': int(len(added)),
+            'added_ms': float(added['self_ms'].sum()),
+            'top_packages_ms': _top_packages(added).round(1).to_dict(),
+        }
+    if 'app_start' in frames:
+        start = frames['app_start']
+        loaded = set(start['module'].str.split('.').str[0])
+        for package in STARTUP_FORBIDDEN:
+            if package in loaded:
+                report['violations'].append(f"app start imports '{package}'")
+        added_ms = report['targets']['app_start']['added_ms']
+        if added_ms > STARTUP_BUDGET_MS:
+            report['violations'].append(f'app start adds {added_ms:.0f} ms over Streamlit (budget {STARTUP_BUDGET_MS} ms)')
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Profile import time of the app start and each page.')
+    parser.add_argument('--json', help='also write the report to this file')
+    parser.add_argument('--cwd', default=os.path.dirname(os.path.abspath(__file__)), help='directory holding App.py')
+    args = parser.parse_args(argv)
+    report = build_report(args.cwd)
+    summary = pd.DataFrame(report['targets']).T[['modules', 'total_ms', 'added_modules', 'added_ms']]
+    print(summary.round(1).to_string())
+    for name, target in report['targets'].items():
+        if name != 'streamlit':
+            packages = ', '.join(f'{package} {ms:.0f}ms' for package, ms in list(target['top_packages_ms'].items())[:5])
+            print(f'{name}: {packages}')
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    for violation in report['violations']:
+        print(f'BUDGET: {violation}', file=sys.stderr)
+    return 1 if report['violations'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,149 @@
+# imputation.py
+import numpy as np
+import pandas as pd
+
+from features import FREQ, SLOTS_PER_DAY, to_regular_grid
+
+# Gaps up to this many half-hour steps (3 hours) are interpolated linearly in time
+SHORT_GAP_ROWS = 6
+# Long gaps copy the same slot from up to this many weeks before or after
+PROFILE_LAG = 7 * SLOTS_PER_DAY
+PROFILE_WEEKS = 4
+STRATEGIES = ('interpolate', 'regression', 'profile')
+# Weather variables are filled from the other weather readings at the same time stamp
+WEATHER_COLUMNS = ['DryBulb', 'DewPnt', 'WetBulb', 'Humidity']
+# Rows per time chunk when imputing a large grid
+CHUNK_ROWS = 52 * PROFILE_LAG
+
+# Function to give every missing value the length of the gap it belongs to (0 where present);
+# gaps touching either end of the array are unbounded and get -1
+def gap_lengths(mask):
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    lengths = np.zeros(len(mask), dtype=np.int64)
+    if len(starts):
+        run_length = ends - starts
+        run_length[(starts == 0) | (ends == len(mask))] = -1
+        run_id = np.cumsum(edges[:-1] == 1) - 1
+        lengths[mask] = run_length[run_id[mask]]
+    return lengths
+
+# Function to linearly interpolate (by time on the regular grid) gaps no longer than max_gap
+def interpolate_short(values, max_gap=SHORT_GAP_ROWS):
+    mask = np.isnan(values)
+    lengths = gap_lengths(mask)
+    fill = mask & (lengths > 0) & (lengths <= max_gap)
+    if fill.any():
+        positions = np.arange(len(values))
+        values = values.copy()
+        values[fill] = np.interp(positions[fill], positions[~mask], values[~mask])
+    return values, fill
+
+# Function to fill missing values from the same half-hour slot in neighbouring weeks, nearest week first
+def profile_fill(values, lag=PROFILE_LAG, weeks=PROFILE_WEEKS):
+    values = values.copy()
+    filled = np.zeros(len(values), dtype=bool)
+    for week in range(1, weeks + 1):
+        for shift in (week * lag, -week * lag):
+            mask = np.isnan(values)
+            if not mask.any():
+                return values, filled
+            donor = np.full(len(values), np.nan)
+            if shift > 0:
+                donor[shift:] = values[:-shift]
+            else:
+                donor[:shift] = values[-shift:]
+            fill = mask & ~np.isnan(donor)
+            values[fill] = donor[fill]
+            filled |= fill
+    return values, filled
+
+# Function to fit a least-squares model of one weather column on the others (rows where all are present)
+def fit_cross_regression(grid, column, predictors):
+    X = grid[predictors].to_numpy(dtype=np.float64)
+    y = grid[column].to_numpy(dtype=np.float64)
+    rows = ~np.isnan(X).any(axis=1) & ~np.isnan(y)
+    if rows.sum() <= len(predictors):
+        return None
+    design = np.column_stack([X[rows], np.ones(rows.sum())])
+    coefficients, *_ = np.linalg.lstsq(design, y[rows], rcond=None)
+    return coefficients
+
+# Function to predict a weather column where it is missing but its predictors are present
+def regression_fill(values, X, coefficients):
+    fill = np.isnan(values) & ~np.isnan(X).any(axis=1)
+    if coefficients is None or not fill.any():
+        return values, np.zeros(len(values), dtype=bool)
+    values = values.copy()
+    values[fill] = X[fill] @ coefficients[:-1] + coefficients[-1]
+    return values, fill
+
+# Function to rebuild Date and Hour for grid rows that were added by the reindex
+def restore_calendar(grid, freq=FREQ):
+    step = pd.Timedelta(freq)
+    # Hours run from one step after midnight up to 24, so midnight belongs to the previous day
+    day = (grid.index - step).normalize()
+    hours = (grid.index - day) / pd.Timedelta(hours=1)
+    if 'Date' in grid.columns:
+        grid['Date'] = grid['Date'].where(grid['Date'].notna(), pd.Series(day, index=grid.index))
+    if 'Hour' in grid.columns:
+        grid['Hour'] = grid['Hour'].where(grid['Hour'].notna(), pd.Series(hours, index=grid.index)).astype(grid['Hour'].dtype)
+    return grid
+
+# Function to impute one block; returns which strategy (1-based position, 0 = none) filled each value
+def _impute_block(grid, columns, strategies, max_gap, models):
+    sources = {}
+    for col in columns:
+        values = grid[col].to_numpy(dtype=np.float64)
+        source = np.zeros(len(values), dtype=np.int8)
+        for code, strategy in enumerate(strategies, start=1):
+            if strategy == 'interpolate':
+                values, fill = interpolate_short(values, max_gap)
+            elif strategy == 'regression':
+                if col not in models:
+                    continue
+                predictors, coefficients = models[col]
+                values, fill = regression_fill(values, grid[predictors].to_numpy(dtype=np.float64), coefficients)
+            else:
+                values, fill = profile_fill(values)
+            source[fill] = code
+        grid[col] = values.astype(grid[col].dtype)
+        sources[col] = source
+    return grid, sources
+
+# Function to reindex onto the regular half-hourly grid and fill gaps column by column
+def impute_gaps(df, columns=None, strategies=STRATEGIES, max_gap=SHORT_GAP_ROWS, chunk_rows=CHUNK_ROWS):
+    unknown = [strategy for strategy in strategies if strategy not in STRATEGIES]
+    if unknown:
+        raise ValueError(f"Unknown strategies {unknown}, expected some of {STRATEGIES}")
+    grid = restore_calendar(to_regular_grid(df))
+    if columns is None:
+        columns = [col for col in grid.select_dtypes(include=[np.number]).columns if col != 'Hour']
+    missing_before = {col: int(grid[col].isna().sum()) for col in columns}
+    # Cross-regressions are fitted once on the whole grid, then applied chunk by chunk
+    models = {}
+    for col in columns:
+        predictors = [other for other in WEATHER_COLUMNS if other != col and other in grid.columns]
+        if col in WEATHER_COLUMNS and predictors:
+            models[col] = (predictors, fit_cross_regression(grid, col, predictors))
+
+    # Each chunk carries enough context on both sides for interpolation and the weekly profile
+    context = max(max_gap + 1, PROFILE_WEEKS * PROFILE_LAG)
+    chunk_rows = max(chunk_rows or len(grid), 1)
+    counts = {col: dict.fromkeys(strategies, 0) for col in columns}
+    pieces = []
+    for start in range(0, len(grid), chunk_rows):
+        stop = min(start + chunk_rows, len(grid))
+        lo, hi = max(0, start - context), min(len(grid), stop + context)
+        block, sources = _impute_block(grid.iloc[lo:hi].copy(), columns, strategies, max_gap, models)
+        pieces.append(block.iloc[start - lo:stop - lo])
+        for col in columns:
+            # Only values filled inside the chunk's own rows are counted
+            per_strategy = np.bincount(sources[col][start - lo:stop - lo], minlength=len(strategies) + 1)
+            for code, strategy in enumerate(strategies, start=1):
+                counts[col][strategy] += int(per_strategy[code])
+    result = pd.concat(pieces) if pieces else grid
+    report = pd.DataFrame(counts).T
+    report.insert(0, 'missing_before', pd.Series(missing_before))
+    report['missing_after'] = pd.Series({col: int(result[col].isna().sum()) for col in columns})
+    return result, report
@@ -0,0 +1,145 @@
+# instrumentation.py
+# Per-stage wall time, CPU time, rows processed and memory delta, with Prometheus-style export.
+import contextvars
+import functools
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Number of individual stage records kept in memory (oldest dropped first)
+MAX_RECORDS = 2000
+METRIC_PREFIX = 'weatherelectric_stage'
+
+logger = logging.getLogger('weatherelectric.stages')
+
+_records = deque(maxlen=MAX_RECORDS)
+_totals = {}
+# Run ids are unique across sessions; each script run sees only its own id, as Streamlit runs every session's
+# script in its own thread
+_run_ids = itertools.count(1)
+_run = contextvars.ContextVar('weatherelectric_run', default=0)
+_lock = threading.Lock()
+_page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+def _rss_bytes():
+    # Resident set size from /proc on Linux; other platforms report no memory delta
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _page_size
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _rows_of(value):
+    shape = getattr(value, 'shape', None)
+    if shape:
+        return int(shape[0])
+    return None
+
+# Function to start a new rerun in the calling context; the diagnostics panel shows the stages of the current one
+def new_run():
+    with _lock:
+        run = next(_run_ids)
+    _run.set(run)
+    return run
+
+def _record(entry):
+    entry['run'] = _run.get()
+    with _lock:
+        _records.append(entry)
+        total = _totals.setdefault(entry['stage'], {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'rows': 0,
+                                                     'max_wall_seconds': 0.0, 'memory_delta_bytes': 0})
+        total['calls'] += 1
+        total['wall_seconds'] += entry['wall_seconds']
+        total['cpu_seconds'] += entry['cpu_seconds']
+        total['rows'] += entry['rows'] or 0
+        total['max_wall_seconds'] = max(total['max_wall_seconds'], entry['wall_seconds'])
+        total['memory_delta_bytes'] = entry['memory_delta_bytes'] if entry['memory_delta_bytes'] is not None else 0
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps(entry))
+
+# Context manager timing one stage; set span['rows'] inside the block when the row count is known late
+@contextmanager
+def timed(stage, rows=None):
+    span = {'rows': rows}
+    rss_before = _rss_bytes()
+    cpu_started = time.thread_time()
+    started = time.perf_counter()
+    try:
+        yield span
+    finally:
+        wall = time.perf_counter() - started
+        cpu = time.thread_time() - cpu_started
+        rss_after = _rss_bytes()
+        _record({
+            'stage': stage,
+            'started': time.time() - wall,
+            'wall_seconds': wall,
+            'cpu_seconds': cpu,
+            'rows': span['rows'],
+            'memory_delta_bytes': rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+        })
+
+# Decorator timing every call of a function; rows come from the first frame-like argument or the result
+def instrument(stage=None):
+    def decorate(func):
+        name = stage or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(name) as span:
+                result = func(*args, **kwargs)
+                span['rows'] = _rows_of(args[0]) if args and _rows_of(args[0]) is not None else _rows_of(result)
+            return result
+        return wrapper
+    return decorate
+
+# Function to list the stage records, optionally only those of one run
+def stage_records(run=None):
+    with _lock:
+        records = list(_records)
+    if run is not None:
+        records = [record for record in records if record['run'] == run]
+    return records
+
+# Function to get the id of the rerun running in the calling context (0 before any new_run)
+def current_run():
+    return _run.get()
+
+# Function to get the cumulative per-stage totals since start-up
+def stage_totals():
+    with _lock:
+        return {stage: dict(total) for stage, total in _totals.items()}
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+# Function to export the cumulative totals in the Prometheus text exposition format
+def prometheus_text(prefix=METRIC_PREFIX):
+    totals = stage_totals()
+    metrics = [
+        ('calls_total', 'counter', 'Number of times the stage ran', 'calls'),
+        ('wall_seconds_total', 'counter', 'Wall-clock seconds spent in the stage', 'wall_seconds'),
+        ('cpu_seconds_total', 'counter', 'CPU seconds spent in the stage by the calling thread', 'cpu_seconds'),
+        ('rows_total', 'counter', 'Rows processed by the stage', 'rows'),
+        ('max_wall_seconds', 'gauge', 'Slowest single run of the stage', 'max_wall_seconds'),
+        ('last_memory_delta_bytes', 'gauge', 'Resident memory change during the latest run of the stage', 'memory_delta_bytes'),
+    ]
+    lines = []
+    for suffix, kind, help_text, field in metrics:
+        name = f'{prefix}_{suffix}'
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for stage, total in sorted(totals.items()):
+            lines.append(f'{name}{{stage="{_escape(stage)}"}} {total[field]}')
+    return '\n'.join(lines) + '\n'
+
+# Function to drop every record and total
+def reset():
+    with _lock:
+        _records.clear()
+        _totals.clear()
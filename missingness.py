@@ -0,0 +1,78 @@
+# missingness.py
+import numpy as np
+import pandas as pd
+
+from data_loader import add_datetime
+from features import FREQ
+
+# Time bins in the missing-fraction chart, whatever the number of rows
+MAX_BINS = 400
+# Label used in the gap table for timestamps with no row at all
+ABSENT_ROWS = '(no row)'
+
+def _time_values(df, time_column):
+    if time_column in df.columns:
+        return pd.to_datetime(df[time_column]).to_numpy()
+    return add_datetime(df[['Date', 'Hour']].copy(deep=False))['DateTime'].to_numpy()
+
+def _runs(mask):
+    # Run-length encoding of True runs: [start, end] row positions, both inclusive
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1
+
+# Function to summarize missing data per column in one vectorized pass over the rows:
+# counts, gap intervals (run-length encoded) and the missing fraction in fixed time bins
+def summarize_missingness(df, columns=None, time_column='DateTime', bins=MAX_BINS, freq=FREQ):
+    columns = [col for col in (columns or df.columns) if col != time_column]
+    times = _time_values(df, time_column)
+    order = np.argsort(times, kind='stable')
+    times = times[order]
+    valid = ~np.isnat(times)
+    step = pd.Timedelta(freq).to_timedelta64()
+
+    counts, gaps, fractions = {}, [], {}
+    if valid.any():
+        valid_times = times[valid]
+        first, last = valid_times[0], valid_times[-1]
+        n_bins = max(1, min(bins, int(valid.sum())))
+        width = (last - first) / n_bins if last > first else step
+        bin_ids = np.minimum(((valid_times - first) / width).astype(np.int64), n_bins - 1)
+        rows_per_bin = np.bincount(bin_ids, minlength=n_bins)
+        bin_starts = pd.to_datetime(first + width * np.arange(n_bins))
+    for col in columns:
+        mask = df[col].isna().to_numpy()[order]
+        counts[col] = int(mask.sum())
+        if not valid.any():
+            continue
+        mask_valid = mask[valid]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            fractions[col] = np.bincount(bin_ids, weights=mask_valid, minlength=n_bins) / rows_per_bin
+        starts, ends = _runs(mask_valid)
+        if len(starts):
+            gaps.append(pd.DataFrame({'column': col, 'start': valid_times[starts], 'end': valid_times[ends],
+                                      'rows': ends - starts + 1}))
+    if valid.any():
+        # Timestamps missing from the file altogether show up as jumps of more than one step
+        jumps = np.diff(valid_times)
+        holes = np.flatnonzero(jumps > step)
+        if len(holes):
+            gaps.append(pd.DataFrame({'column': ABSENT_ROWS, 'start': valid_times[holes] + step,
+                                      'end': valid_times[holes + 1] - step,
+                                      'rows': (jumps[holes] // step - 1).astype(np.int64)}))
+    gap_table = pd.concat(gaps, ignore_index=True) if gaps else pd.DataFrame(columns=['column', 'start', 'end', 'rows'])
+    gap_table['duration'] = pd.to_timedelta(gap_table['end'] - gap_table['start']) + step
+    gap_table = gap_table.sort_values(['duration', 'start'], ascending=[False, True], ignore_index=True)
+    fraction_table = pd.DataFrame(fractions, index=bin_starts) if fractions else pd.DataFrame()
+    return {
+        'rows': len(df),
+        'missing': counts,
+        'fractions': fraction_table.rename_axis('bin_start'),
+        'gaps': gap_table,
+    }
+
+# Function to keep the longest gaps, optionally for a single column
+def longest_gaps(summary, n=50, column=None):
+    gaps = summary['gaps']
+    if column is not None:
+        gaps = gaps[gaps['column'] == column]
+    return gaps.head(n)
@@ -0,0 +1,120 @@
+# outlier_engine.py
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Tukey fence multiplier used by the IQR rules
+IQR_K = 1.5
+# Modified z-score threshold used by the MAD rule
+MAD_K = 3.5
+# Scales the MAD to the standard deviation of a normal distribution
+MAD_SCALE = 1.4826
+# Default number of rounds: a single pass, as before the engine existed
+MAX_ITER = 1
+# Rounds stop once no bound moves by more than this fraction of the previous fence width
+BOUNDS_TOL = 0.01
+# A round that would replace more than this share of any column's values is not applied
+MAX_REPLACE_FRACTION = 0.05
+METHODS = ('iqr', 'mad', 'hourly_iqr')
+
+# Function to compute (lower, upper, replacement) arrays for every column in one pass
+def column_bounds(X, method='iqr'):
+    if method == 'iqr':
+        q1, median, q3 = np.nanquantile(X, [0.25, 0.5, 0.75], axis=0)
+        iqr = q3 - q1
+        return q1 - IQR_K * iqr, q3 + IQR_K * iqr, median
+    if method == 'mad':
+        median = np.nanmedian(X, axis=0)
+        mad = MAD_SCALE * np.nanmedian(np.abs(X - median), axis=0)
+        return median - MAD_K * mad, median + MAD_K * mad, median
+    raise ValueError(f"Unknown outlier method '{method}', expected one of {METHODS}")
+
+# Function to compute per-row bounds from an IQR within each hour-of-day (optionally over a rolling window of days)
+def hourly_bounds(X, hours, window=None):
+    lower = np.empty_like(X)
+    upper = np.empty_like(X)
+    median = np.empty_like(X)
+    codes, _ = pd.factorize(hours)
+    for code in np.unique(codes):
+        rows = np.flatnonzero(codes == code)
+        group = X[rows]
+        if window is None:
+            lo, hi, med = column_bounds(group, 'iqr')
+            lower[rows], upper[rows], median[rows] = lo, hi, med
+        else:
+            rolling = pd.DataFrame(group).rolling(window, min_periods=1, center=True)
+            q1 = rolling.quantile(0.25).to_numpy()
+            q3 = rolling.quantile(0.75).to_numpy()
+            iqr = q3 - q1
+            lower[rows] = q1 - IQR_K * iqr
+            upper[rows] = q3 + IQR_K * iqr
+            median[rows] = rolling.median().to_numpy()
+    return lower, upper, median
+
+# Function to tell whether new fences moved by less than `tol` of the previous fence width
+def bounds_settled(previous, current, tol=BOUNDS_TOL):
+    (prev_lower, prev_upper), (lower, upper) = previous, current
+    width = np.maximum(np.abs(np.asarray(prev_upper, dtype=np.float64) - prev_lower), np.finfo(np.float64).tiny)
+    moved = np.maximum(np.abs(np.asarray(lower) - prev_lower), np.abs(np.asarray(upper) - prev_upper)) / width
+    return bool(np.all(np.nan_to_num(moved) <= tol))
+
+# Function to impute outliers in place with a robust rule. Further rounds (max_iter > 1) stop once the bounds settle;
+# a round that would replace more than max_fraction of a column is skipped with a warning, as the rule then eats the data
+def impute_outliers(df, columns=None, method='iqr', max_iter=MAX_ITER, tol=BOUNDS_TOL, max_fraction=MAX_REPLACE_FRACTION,
+                    hour_column='Hour', window=None):
+    if method not in METHODS:
+        raise ValueError(f"Unknown outlier method '{method}', expected one of {METHODS}")
+    if columns is None:
+        columns = df.select_dtypes(include=[np.number]).columns
+    columns = list(columns)
+    if method == 'hourly_iqr':
+        # The hour-of-day key selects the groups, so it is never imputed itself
+        hours = df[hour_column].to_numpy()
+        columns = [col for col in columns if col != hour_column]
+    # One contiguous float array for all columns; every iteration updates it in place
+    X = np.ascontiguousarray(df[columns].to_numpy(dtype=np.float64))
+    history = []
+    # Per-iteration column bounds, reusable on new rows (the hourly rule's bounds are per row)
+    rounds = []
+    converged = False
+    capped = []
+    previous = None
+    present = np.maximum((~np.isnan(X)).sum(axis=0), 1)
+    for _ in range(max_iter):
+        if method == 'hourly_iqr':
+            lower, upper, median = hourly_bounds(X, hours, window)
+        else:
+            lower, upper, median = column_bounds(X, method)
+        if previous is not None and bounds_settled(previous, (lower, upper), tol):
+            converged = True
+            break
+        mask = (X < lower) | (X > upper)
+        replaced = mask.sum(axis=0)
+        if replaced.sum() == 0:
+            converged = True
+            break
+        capped = [col for j, col in enumerate(columns) if replaced[j] > max_fraction * present[j]]
+        if capped:
+            warnings.warn(f"Outlier round {len(history) + 1} would replace more than {max_fraction:.0%} of {', '.join(capped)}; "
+                          f"stopping after {len(history)} round(s)", RuntimeWarning, stacklevel=2)
+            break
+        np.copyto(X, np.broadcast_to(median, X.shape), where=mask)
+        history.append(dict(zip(columns, replaced.tolist())))
+        if method != 'hourly_iqr':
+            rounds.append({col: (float(lower[j]), float(upper[j]), float(median[j])) for j, col in enumerate(columns)})
+        previous = (lower, upper)
+    for j, col in enumerate(columns):
+        # Integer columns become float, as the median replacement may not be integral
+        dtype = df[col].dtype if df[col].dtype.kind == 'f' else np.float64
+        df[col] = X[:, j].astype(dtype, copy=False)
+    report = {
+        'method': method,
+        'iterations': len(history),
+        'converged': converged,
+        'capped': capped,
+        'replaced_per_iteration': history,
+        'replaced': {col: int(sum(h[col] for h in history)) for col in columns},
+        'rounds': rounds,
+    }
+    return df, report
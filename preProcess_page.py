@@ -1,17 +1,44 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import plotly.express as px
 from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
 from sklearn.feature_selection import RFE
 from sklearn.linear_model import LinearRegression
 import io  # Import io for StringIO
+import os
 
 # Import custom CSS for styling
 from styles import overall_css
+from data_loader import load_dataset, cache_stats
+from streaming_pipeline import apply_outlier_rounds, ensure_cleaned
+from outlier_engine import BOUNDS_TOL, MAX_REPLACE_FRACTION, impute_outliers
+from sections import cached_compute, filtered_view, lazy_section, render_plotly, time_filter_sidebar
+from correlation import correlation_matrices, tracked_correlation
+from preprocessing_pipeline import PreprocessingPipeline, load_or_fit_pipeline
+from feature_selection import candidate_features, cached_rank_features
+from features import cached_features
+from instrumentation import instrument
+from missingness import longest_gaps, summarize_missingness
+from imputation import impute_gaps
+from columnar_store import ensure_store, read_manifest, read_store
+from export import FORMATS, ensure_export
+from time_index import TimeFilter, is_unfiltered, time_index
+from dimensionality import KEY_COLUMNS, ensure_scores, fit_pca, fit_pca_store, load_or_fit_pca, top_anomalies
+from forecasting import HORIZON, TARGETS, design_matrix, forecast_scenarios, load_or_fit_forecaster, walk_forward_backtest
+
+DATA_PATH = 'electric load.csv'
+CLEANED_PATH = 'df_cleaned.csv'
+PIPELINE_PATH = 'preprocessing_pipeline.joblib'
+PCA_PATH = 'pca_model.joblib'
+FORECASTER_PATH = 'forecaster_sysload.joblib'
+# Temperature shifts (degrees Celsius) applied to the last day for the load scenarios
+SCENARIO_OFFSETS = [-4, -2, 0, 2, 4]
+# Rows drawn for per-point charts; statistics always cover the whole file
+PLOT_SAMPLE_ROWS = 5000
+# Lag columns left out of the cleaned-data download by default
+EXPORT_DROP_COLUMNS = ['sysload(D-1)', 'sysload(W-1)']
+OUTLIER_COLUMNS = ['Hour', 'DryBulb', 'DewPnt', 'WetBulb', 'Humidity', 'ElecPrice', 'SYSLoad']
 
 # Function to check missing values
 def check_missing_values(df):
@@ -25,23 +52,60 @@ def check_missing_values(df):
     missing_values_df.reset_index(drop=True, inplace=True)
     return missing_values_df
 
+# Function to build the missing value report from streamed per-column counts
+def report_missing_values(missing_counts, n_rows):
+    missing_values_count = pd.Series(missing_counts, dtype='int64')
+    missing_values_percentage = 100 * missing_values_count / n_rows if n_rows else missing_values_count * 0.0
+    missing_values_df = pd.DataFrame({
+        'Column': missing_values_count.index,
+        'Missing Values': missing_values_count.values,
+        'Percentage Missing': missing_values_percentage.values
+    })
+    return missing_values_df
+
+# Function to draw a reproducible row sample for per-point charts
+def sample_rows(df, n=PLOT_SAMPLE_ROWS):
+    if len(df) <= n:
+        return df
+    return df.sample(n=n, random_state=0).sort_index()
+
 # Function to drop missing values
 def drop_missing_values(df):
     df = df.dropna()
     return df
 
+# Function to build the missing values heatmap: missing fraction per column over fixed time bins
+@instrument()
+def build_missing_values_heatmap(summary):
+    fractions = summary['fractions']
+    fig = px.imshow(
+        fractions.T,
+        aspect='auto',
+        zmin=0,
+        zmax=1,
+        color_continuous_scale='Viridis',
+        labels=dict(x='Time', y='Columns', color='Missing fraction'),
+        title='Heatmap of Missing Values'
+    )
+    fig.update_layout(height=400, margin=dict(l=40, r=40, t=60, b=40))
+    return fig
+
 # Function to plot missing values heatmap
 def plot_missing_values_heatmap(df):
-    missing_values = df.isnull()
-    plt.figure(figsize=(12, 8))
-    sns.heatmap(missing_values, cbar=False, cmap='viridis', yticklabels=False)
-    plt.title('Heatmap of Missing Values')
-    plt.xlabel('Columns')
-    plt.ylabel('Rows')
-    st.pyplot(plt)
-
-# Function to visualize outliers using Plotly
-def visualize_outliers(df, column_name):
+    st.plotly_chart(build_missing_values_heatmap(summarize_missingness(df)))
+
+# Function to render the missingness summary: the fixed-size heatmap and the longest gaps
+def render_missingness(summary):
+    if summary['fractions'].empty:
+        st.write("No rows with a valid timestamp.")
+        return
+    st.plotly_chart(build_missing_values_heatmap(summary))
+    st.write("Longest gaps (consecutive missing values, or timestamps with no row at all):")
+    st.dataframe(longest_gaps(summary))
+
+# Function to build an outlier box plot using Plotly
+@instrument()
+def build_outlier_box(df, column_name):
     fig = px.box(
         df,
         y=column_name,
@@ -64,20 +128,24 @@ def visualize_outliers(df, column_name):
         marker=dict(size=12, line=dict(width=2, color='DarkSlateGrey')),
         selector=dict(type='box')
     )
-    st.plotly_chart(fig)
+    return fig
 
-# Function to impute outliers with median
+# Function to visualize outliers using Plotly
+def visualize_outliers(df, column_name):
+    st.plotly_chart(build_outlier_box(df, column_name))
+
+# Functions to draw the per-point chart samples before and after outlier imputation
+def outlier_sample_before(df):
+    return sample_rows(drop_missing_values(df))
+
+# The sample is copied so the rounds replace columns of an independent frame, not of a view of the dataset
+def outlier_sample_after(df, report):
+    return apply_outlier_rounds(outlier_sample_before(df).copy(), report['outlier_rounds'])
+
+# Function to impute outliers with median (one IQR round of the outlier engine)
 def impute_outliers_with_median(df):
-    # Ensure numeric columns are used for calculation
-    numeric_columns = df.select_dtypes(include=[np.number]).columns
-    Q1 = df[numeric_columns].quantile(0.25)
-    Q3 = df[numeric_columns].quantile(0.75)
-    IQR = Q3 - Q1
-    lower_bound = Q1 - 1.5 * IQR
-    upper_bound = Q3 + 1.5 * IQR
-    df_cleaned = df.copy()
-    for col in numeric_columns:
-        df_cleaned[col] = np.where((df_cleaned[col] < lower_bound[col]) | (df_cleaned[col] > upper_bound[col]), df_cleaned[col].median(), df_cleaned[col])
+    # Shallow copy: the engine replaces whole columns, leaving the caller's frame untouched
+    df_cleaned, _ = impute_outliers(df.copy(deep=False), method='iqr', max_iter=1)
     return df_cleaned
 
 # Function to standardize data using StandardScaler
@@ -87,17 +155,28 @@ def standardize_data(df, numeric_columns):
     return df
 
 # Function to perform PCA and display explained variance ratio
-def perform_pca(df, features):
-    X = df[features]
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
-    pca = PCA()
-    X_pca = pca.fit_transform(X_scaled)
-    explained_variance_ratio = pca.explained_variance_ratio_
-    return explained_variance_ratio
+def perform_pca(df, features, solver='auto'):
+    # Full SVD on small frames, randomized SVD on large ones, IncrementalPCA on request
+    return fit_pca(df, features, solver=solver, standardize=True).explained_variance_ratio_
+
+# Function to fit PCA over the cleaned store in chunks, stream the scores back and list the worst-reconstructed rows
+def pca_outputs(report, version):
+    store_dir = ensure_store(CLEANED_PATH)
+    model = load_or_fit_pca(PCA_PATH, version, lambda: fit_pca_store(store_dir, report['scaler']['columns']))
+    scores = read_store(ensure_scores(model, store_dir), columns=KEY_COLUMNS + ['reconstruction_error'])
+    return model.loadings(), top_anomalies(scores)
+
+def render_pca_outputs(result):
+    loadings, anomalies = result
+    st.write("Loadings (weight of each column in each component):")
+    st.dataframe(loadings)
+    st.write("Rows with the highest PCA reconstruction error (candidate anomalies):")
+    st.dataframe(anomalies)
 
 # Function for feature selection using RFE
 def select_features_rfe(df, features, target):
+    # Leave the target out of its own candidate features
+    features = pd.Index(candidate_features(df, target.name, features))
     X = df[features]
     model = LinearRegression()
     rfe = RFE(model, n_features_to_select=5)
@@ -105,6 +184,75 @@ def select_features_rfe(df, features, target):
     selected_features = features[rfe.support_]
     return selected_features
 
+# Function to get the fitted preprocessing pipeline (memory, then disk, then fit once)
+def fitted_pipeline(report, cleaned_df):
+    version = report['source_version']
+    return cached_compute('pre-pipeline', version, (), lambda: load_or_fit_pipeline(
+        PIPELINE_PATH, version, lambda: PreprocessingPipeline().fit_from_report(report, cleaned_df, version)))
+
+# Function to get the engineered features of the raw data; after an incremental append the previous version's
+# features are extended with the new rows instead of being rebuilt
+def raw_features(report):
+    previous_version = report.get('last_append', {}).get('previous_version')
+    return cached_features(load_dataset(DATA_PATH), report['source_version'], previous_version)
+
+# Function to backtest the day-ahead models and forecast load under temperature scenarios
+def run_forecasts(report):
+    version = report['source_version']
+    features = raw_features(report)
+    summaries = {target: walk_forward_backtest(features, target)[1] for target in TARGETS}
+    X, y = design_matrix(features, 'SYSLoad')
+    last_day = X.index[-HORIZON:]
+    # The scenario model is fitted without the final day, so that day is forecast out of sample and can be
+    # compared with what actually happened
+    forecaster = load_or_fit_forecaster(FORECASTER_PATH, features[features.index < last_day[0]], 'SYSLoad', 'gbm', version)
+    scenarios = forecast_scenarios(forecaster, X.loc[last_day], SCENARIO_OFFSETS)
+    scenarios['actual'] = y.loc[last_day]
+    return summaries, scenarios
+
+def render_forecasts(result):
+    summaries, scenarios = result
+    for target, summary in summaries.items():
+        st.write(f"Walk-forward backtest for {target} (mean over folds):")
+        st.dataframe(summary)
+    st.write("SYSLoad for the last day, held out of the model's training data, under temperature scenarios and as measured:")
+    st.line_chart(scenarios)
+
+# Function to compute the Pearson matrix: the whole file comes from the store's incrementally updated tracker,
+# a filtered view is computed from its rows
+def correlation_matrix(view, view_version, time_filter):
+    columns = list(view.select_dtypes(include=[np.number]).columns)
+    if is_unfiltered(time_filter):
+        return tracked_correlation(ensure_store(DATA_PATH), columns)[0]
+    return correlation_matrices(view, columns, version=view_version)[0]
+
+# Function to offer the cleaned data for download: format, columns and date range are chosen first,
+# then the export is streamed from the columnar store in chunks on demand
+def render_export(df):
+    store_dir = ensure_store(CLEANED_PATH)
+    columns = read_manifest(store_dir)['columns']
+    dates = pd.to_datetime(df['Date'])
+    with st.form('pre-export'):
+        fmt = st.selectbox("Format", list(FORMATS))
+        chosen = st.multiselect("Columns", columns, default=[col for col in columns if col not in EXPORT_DROP_COLUMNS])
+        date_range = st.date_input("Date range", value=(dates.min(), dates.max()),
+                                   min_value=dates.min(), max_value=dates.max())
+        submitted = st.form_submit_button("Prepare download")
+    if submitted:
+        start, end = date_range if len(date_range) == 2 else (date_range[0], date_range[0])
+        try:
+            path = ensure_export(store_dir, fmt, [col for col in columns if col in chosen] or None, start, end)
+        except ValueError as e:
+            st.warning(str(e))
+        else:
+            st.session_state['pre-export-file'] = (path, f"{os.path.splitext(CLEANED_PATH)[0]}.{fmt}", FORMATS[fmt])
+    prepared = st.session_state.get('pre-export-file')
+    if prepared and os.path.exists(prepared[0]):
+        path, file_name, mime = prepared
+        with open(path, 'rb') as f:
+            st.download_button(f"Download {file_name} ({os.path.getsize(path) / 1e6:.1f} MB)", data=f,
+                               file_name=file_name, mime=mime)
+
 def show():
     # Apply overall styles
     st.markdown(overall_css, unsafe_allow_html=True)
@@ -116,34 +264,53 @@ def show():
         This section deals with data preprocessing. Here you can clean and transform the data to prepare it for analysis and modeling.
     """)
 
-    # Load Data
-    df = pd.read_csv('electric load.csv')
-    df = df.head(500)
-
-    # Convert 'Date' column to datetime
-    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    # Clean the whole file in bounded-memory chunks (reruns only when the file changes)
+    report = ensure_cleaned(DATA_PATH, CLEANED_PATH)
+
+    # Load Data (parsed once per file version; 'Date' arrives as datetime)
+    df = load_dataset(DATA_PATH)
+    version = report['source_version']
+    stats = cache_stats()
+    st.sidebar.metric("Data cache hits", stats['hits'])
+    st.sidebar.metric("Data cache misses", stats['misses'])
+    st.sidebar.metric("Shared data memory (MB)", f"{stats['bytes'] / 2 ** 20:,.1f} / {stats['budget_bytes'] / 2 ** 20:,.0f}")
+    st.sidebar.metric("Cleaning throughput (rows/sec)", f"{report['rows_per_sec']:,.0f}")
+    if report.get('last_append'):
+        st.sidebar.metric("Rows appended by the last incremental ingest", f"{report['last_append']['rows_appended']:,}")
+    st.sidebar.metric("Data watermark", report.get('watermark') or '-')
     
+    # Inspection, missing-data and outlier sections follow the sidebar filters; the cleaning pipeline,
+    # models and exports always cover the whole file
+    time_filter = time_filter_sidebar(*time_index(version, df).bounds, key='pre-filter')
+    view, view_version = filtered_view(df, version, time_filter)
+    # Gap statistics only make sense on an unbroken time range, so they honour the date range alone
+    range_view, range_version = filtered_view(df, version, TimeFilter(time_filter.start, time_filter.end))
+    st.sidebar.metric("Rows after filters", f"{len(view):,}")
+    if view.empty:
+        st.warning("No rows match the sidebar filters.")
+        return
+
     # Data Inspection
     st.markdown("<h2 id='1-data-inspection'>1. Data Inspection</h2>", unsafe_allow_html=True)
     
     st.markdown("<h3 id='11-head-of-the-dataset'>1.1 Head of the Dataset</h3>", unsafe_allow_html=True)
     st.write("First 10 rows of the dataset:")
-    st.dataframe(df.head(10))
+    st.dataframe(view.head(10))
 
     st.markdown("<h3 id='12-tail-of-the-dataset'>1.2 Tail of the Dataset</h3>", unsafe_allow_html=True)
     st.write("Last 10 rows of the dataset:")
-    st.dataframe(df.tail(10))
+    st.dataframe(view.tail(10))
 
     st.markdown("<h3 id='13-data-information'>1.3 Data Information</h3>", unsafe_allow_html=True)
     buffer = io.StringIO()
-    df.info(buf=buffer)
+    view.info(buf=buffer)
     st.text(buffer.getvalue())
 
     st.markdown("<h3 id='14-summary-statistics'>1.4 Summary Statistics</h3>", unsafe_allow_html=True)
-    st.dataframe(df.describe())
+    lazy_section("summary statistics", 'pre-describe', view_version, lambda: view.describe(), st.dataframe)
 
     st.markdown("<h3 id='15-data-shape'>1.5 Data Shape</h3>", unsafe_allow_html=True)
-    st.write(df.shape)
+    st.write(view.shape)
 
     st.markdown("<h3 id='16-data-description'>1.6 Data Description</h3>", unsafe_allow_html=True)
     st.write("""
@@ -159,8 +326,7 @@ def show():
 
     st.markdown("<h3 id='17-data-correlation'>1.7 Data Correlation</h3>", unsafe_allow_html=True)
     st.write("Let's examine the correlation between different variables in the dataset.")
-    numeric_df = df.select_dtypes(include=[np.number])
-    st.dataframe(numeric_df.corr())
+    lazy_section("correlation matrix", 'pre-correlation', view_version, lambda: correlation_matrix(view, view_version, time_filter), st.dataframe)
 
     # Data Cleaning
     st.markdown("<h2 id='2-data-cleaning'>2. Data Cleaning</h2>", unsafe_allow_html=True)
@@ -168,91 +334,98 @@ def show():
     st.markdown("<h3 id='21-handling-missing-data'>2.1 Handling Missing Data</h3>", unsafe_allow_html=True)
     
     st.markdown("<h4 id='211-missing-value-report'>2.1.1 Missing Value Report</h4>", unsafe_allow_html=True)
-    missing_values_report = check_missing_values(df)
+    missing_values_report = report_missing_values(report['missing'], report['rows_in'])
     st.dataframe(missing_values_report)
 
     st.markdown("<h4 id='212-missing-values-heatmap'>2.1.2 Missing Values Heatmap</h4>", unsafe_allow_html=True)
-    plot_missing_values_heatmap(df)
+    st.write(f"Share of missing values per column over time, all {len(range_view):,} rows in the date range:")
+    lazy_section("missing values heatmap", 'pre-missing-heatmap', range_version, lambda: summarize_missingness(range_view), render_missingness)
 
     st.markdown("<h4 id='213-drop-missing-values-and-display-report'>2.1.3 Drop Missing Values and Display Report</h4>", unsafe_allow_html=True)
-    df = drop_missing_values(df)
     st.write("DataFrame after dropping rows with missing values:")
-    missing_values_report = check_missing_values(df)
+    missing_values_report = report_missing_values({col: 0 for col in report['missing']}, report['rows_after_dropna'])
     st.dataframe(missing_values_report)
 
+    st.markdown("<h4 id='214-gap-aware-imputation'>2.1.4 Gap-Aware Imputation</h4>", unsafe_allow_html=True)
+    st.write("Alternative to dropping rows: the series is put on a regular half-hourly grid and each gap is filled by "
+             "time interpolation (short gaps), weather cross-regression, or the same slot in neighbouring weeks (long gaps). "
+             "Values filled by each strategy:")
+    lazy_section("gap-aware imputation", 'pre-imputation', range_version, lambda: impute_gaps(range_view)[1], st.dataframe)
+
     st.markdown("<h3 id='22-duplicate-handling'>2.2 Duplicate Handling</h3>", unsafe_allow_html=True)
     
-    # Count duplicate rows
-    duplicate_count = df.duplicated().sum()
+    # Duplicates were detected across all chunks by row hash
+    duplicate_count = report['duplicates']
     st.write(f"Number of duplicate rows: {duplicate_count}")
-
-    # Remove duplicates if any
     if duplicate_count > 0:
-        df = df.drop_duplicates()
         st.write("Duplicates removed.")
     else:
         st.write("No duplicates found.")
 
     # Display count of duplicates and data shape after cleaning
-    duplicate_count_after = df.duplicated().sum()
-    st.write(f"Number of duplicate rows after cleaning: {duplicate_count_after}")
-    st.write(f"Data shape after cleaning: {df.shape}")
+    st.write("Number of duplicate rows after cleaning: 0")
+    st.write(f"Data shape after cleaning: {(report['rows_after_dedup'], df.shape[1])}")
 
     # Outliers Handling
     st.markdown("<h2 id='23-outliers-handling'>2.3 Outliers Handling</h2>", unsafe_allow_html=True)
 
     st.markdown("<h3 id='231-data-before-outlier-handling'>2.3.1 Data Before Outlier Handling</h3>", unsafe_allow_html=True)
     st.write("Visualizing outliers using box plots:")
-    visualize_outliers(df, 'Hour')
-    visualize_outliers(df, 'DryBulb')
-    visualize_outliers(df, 'DewPnt')
-    visualize_outliers(df, 'WetBulb')
-    visualize_outliers(df, 'Humidity')
-    visualize_outliers(df, 'ElecPrice')
-    visualize_outliers(df, 'SYSLoad')
+    lazy_section("box plots before outlier handling", 'pre-outliers-before', view_version,
+                 lambda: [build_outlier_box(outlier_sample_before(view), col) for col in OUTLIER_COLUMNS], render_plotly)
 
     st.markdown("<h3 id='232-impute-outliers-with-median'>2.3.2 Impute Outliers with Median</h3>", unsafe_allow_html=True)
-    df = impute_outliers_with_median(df)
-    df = impute_outliers_with_median(df)
-    df = impute_outliers_with_median(df)
+    convergence = report['outlier_convergence']
+    st.write(f"Outlier rounds applied: {convergence['rounds']} of at most {report['outlier_passes']}; "
+             f"rounds stop early once the IQR bounds move by less than {BOUNDS_TOL:.0%} of their width "
+             f"(bounds settled: {convergence['converged']})")
+    if convergence.get('capped'):
+        st.warning(f"Stopped before a round that would have replaced more than {MAX_REPLACE_FRACTION:.0%} of "
+                   f"{', '.join(convergence['capped'])}.")
+    if convergence['replaced_per_round']:
+        st.dataframe(pd.DataFrame(convergence['replaced_per_round'], index=[f"Round {i + 1}" for i in range(len(convergence['replaced_per_round']))]))
     st.write("Data after imputing outliers with median values:")
+    if report['outlier_rounds']:
+        st.dataframe(pd.DataFrame(report['outlier_rounds'][-1], index=['Lower Bound', 'Upper Bound', 'Median']).T)
 
     st.markdown("<h3 id='233-data-after-outlier-handling'>2.3.3 Data After Outlier Handling</h3>", unsafe_allow_html=True)
     st.write("Visualizing outliers after handling:")
-    visualize_outliers(df, 'Hour')
-    visualize_outliers(df, 'DryBulb')
-    visualize_outliers(df, 'DewPnt')
-    visualize_outliers(df, 'WetBulb')
-    visualize_outliers(df, 'Humidity')
-    visualize_outliers(df, 'ElecPrice')
-    visualize_outliers(df, 'SYSLoad')
+    lazy_section("box plots after outlier handling", 'pre-outliers-after', view_version,
+                 lambda: [build_outlier_box(outlier_sample_after(view, report), col) for col in OUTLIER_COLUMNS], render_plotly)
 
     # Standardize Data
     st.markdown("<h2 id='3-data-standardization'>3. Data Standardization</h2>", unsafe_allow_html=True)
-    numeric_columns = df.select_dtypes(include=[np.number]).columns
-    df = standardize_data(df, numeric_columns)
+    # The pipeline already standardized every numeric column with incremental mean/variance
+    df = load_dataset(CLEANED_PATH)
     st.write("Data after standardization:")
     st.dataframe(df.head(10))
 
     # Dimensionality Reduction
     st.markdown("<h2 id='4-dimensionality-reduction-using-pca'>4. Dimensionality Reduction using PCA</h2>", unsafe_allow_html=True)
-    explained_variance_ratio = perform_pca(df, numeric_columns)
     st.write("Explained variance ratio of the principal components:")
-    st.bar_chart(explained_variance_ratio)
+    lazy_section("PCA", 'pre-pca', version, lambda: fitted_pipeline(report, df).explained_variance_ratio_, st.bar_chart)
+    lazy_section("PCA loadings and anomaly scores", 'pre-pca-scores', version, lambda: pca_outputs(report, version), render_pca_outputs)
 
     # Feature Selection
     st.markdown("<h2 id='5-feature-selection'>5. Feature Selection</h2>", unsafe_allow_html=True)
-    selected_features = select_features_rfe(df, numeric_columns, df['ElecPrice'])
     st.write("Selected features using RFE:")
-    st.write(selected_features)
-    columns_to_drop = ['sysload(D-1)', 'sysload(W-1)']
-    df.drop(columns=columns_to_drop, inplace=True)
-    # Save the cleaned dataframe
-    df_cleaned = df.copy()
-    # Provide download link
-    csv = df_cleaned.to_csv(index=False).encode('utf-8')
-    st.download_button("Download data as CSV", data=csv, file_name='df_cleaned.csv', mime='text/csv')
-    df.head()
+    lazy_section("feature selection", 'pre-rfe', version, lambda: fitted_pipeline(report, df).selected_features_, st.write)
+    st.write("Feature ranking across RFECV, permutation importance and mutual information (time-series folds, all cores):")
+    lazy_section("feature ranking", 'pre-feature-ranking', version,
+                 lambda: cached_rank_features(df, 'ElecPrice', version)['ranking'], st.dataframe)
+    # Provide download link; the file is only written when requested and is reused while the data is unchanged
+    render_export(df)
+
+    # Feature Engineering
+    st.markdown("<h2 id='6-feature-engineering'>6. Feature Engineering</h2>", unsafe_allow_html=True)
+    st.write("Lag, rolling, calendar and temperature features built on a regular half-hourly grid from the raw data:")
+    lazy_section("engineered features", 'pre-features', version,
+                 lambda: raw_features(report).tail(10), st.dataframe)
+
+    # Forecasting
+    st.markdown("<h2 id='7-forecasting'>7. Day-Ahead Forecasting</h2>", unsafe_allow_html=True)
+    st.write("Seasonal-naive, linear and gradient-boosting models compared on rolling weekly folds:")
+    lazy_section("forecasting", 'pre-forecasting', version, lambda: run_forecasts(report), render_forecasts)
 
 
 
@@ -0,0 +1,110 @@
+# preprocessing_pipeline.py
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.feature_selection import RFE
+from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import StandardScaler
+
+from dimensionality import fit_pca
+from feature_selection import candidate_features
+from outlier_engine import MAX_ITER, impute_outliers
+from streaming_pipeline import apply_outlier_rounds
+
+# Bumped whenever the persisted layout changes, so stale files are refitted
+PIPELINE_FORMAT = 3
+
+# Fitted cleaning -> scaling -> PCA -> feature selection stages, reusable through transform only
+class PreprocessingPipeline:
+    def __init__(self, target='ElecPrice', n_features_to_select=5, outlier_method='iqr', outlier_max_iter=MAX_ITER):
+        if outlier_method not in ('iqr', 'mad'):
+            # Only column-wide rules produce bounds that can be replayed on new rows
+            raise ValueError(f"Outlier method '{outlier_method}' cannot be replayed by transform, use 'iqr' or 'mad'")
+        self.target = target
+        self.n_features_to_select = n_features_to_select
+        self.outlier_method = outlier_method
+        self.outlier_max_iter = outlier_max_iter
+        self.data_version_ = None
+        self.columns_ = None
+        self.outlier_rounds_ = []
+        self.scaler_ = None
+        self.pca_ = None
+        self.selected_features_ = None
+
+    # Function to fit every stage in memory from raw rows
+    def fit(self, df, data_version=None):
+        df = df.dropna().drop_duplicates()
+        self.columns_ = list(df.select_dtypes(include=[np.number]).columns)
+        df, report = impute_outliers(df.copy(deep=False), self.columns_, self.outlier_method, self.outlier_max_iter)
+        self.outlier_rounds_ = report['rounds']
+        self.scaler_ = StandardScaler().fit(df[self.columns_].to_numpy(dtype=np.float64))
+        scaled = pd.DataFrame(self.scaler_.transform(df[self.columns_].to_numpy(dtype=np.float64)), columns=self.columns_)
+        self._fit_projection(scaled)
+        self.data_version_ = data_version
+        return self
+
+    # Function to adopt the cleaning and scaling fitted by the chunked pipeline and fit the rest on its output
+    def fit_from_report(self, report, cleaned_df, data_version=None):
+        self.columns_ = list(report['scaler']['columns'])
+        self.outlier_rounds_ = [{col: tuple(bounds) for col, bounds in r.items()} for r in report['outlier_rounds']]
+        self.scaler_ = StandardScaler()
+        self.scaler_.mean_ = np.asarray(report['scaler']['mean'])
+        self.scaler_.scale_ = np.asarray(report['scaler']['scale'])
+        self.scaler_.var_ = self.scaler_.scale_ ** 2
+        self.scaler_.n_features_in_ = len(self.columns_)
+        self.scaler_.n_samples_seen_ = report['rows_after_dedup']
+        # The chunked pipeline's output is already standardized, so PCA and RFE use it as is
+        self._fit_projection(cleaned_df[self.columns_].astype(np.float64))
+        self.data_version_ = data_version
+        return self
+
+    def _fit_projection(self, scaled):
+        # Full SVD for small frames, randomized SVD once the row count makes full SVD too costly
+        self.pca_ = fit_pca(scaled, self.columns_)
+        # The target is never offered to RFE as one of its own predictors
+        features = candidate_features(scaled, self.target, self.columns_)
+        rfe = RFE(LinearRegression(), n_features_to_select=self.n_features_to_select)
+        rfe.fit(scaled[features].to_numpy(), scaled[self.target].to_numpy())
+        self.selected_features_ = pd.Index(features)[rfe.support_]
+
+    @property
+    def explained_variance_ratio_(self):
+        return self.pca_.explained_variance_ratio_
+
+    # Function to clean and standardize new rows with the fitted parameters
+    def transform(self, df):
+        df = apply_outlier_rounds(df.copy(deep=False), self.outlier_rounds_)
+        df[self.columns_] = self.scaler_.transform(df[self.columns_].to_numpy(dtype=np.float64)).astype(np.float32)
+        return df
+
+    # Function to project new rows onto the fitted principal components
+    def project(self, df):
+        return self.pca_.transform(self.transform(df))
+
+    def save(self, path):
+        tmp_path = path + '.tmp'
+        joblib.dump({'format': PIPELINE_FORMAT, 'data_version': self.data_version_, 'pipeline': self}, tmp_path)
+        os.replace(tmp_path, path)
+        return path
+
+    @staticmethod
+    def load(path, data_version=None):
+        if not os.path.exists(path):
+            return None
+        payload = joblib.load(path)
+        if payload.get('format') != PIPELINE_FORMAT:
+            return None
+        if data_version is not None and payload.get('data_version') != data_version:
+            return None
+        return payload['pipeline']
+
+# Function to warm-start a pipeline from disk, fitting and persisting it only when the data changed
+def load_or_fit_pipeline(path, data_version, fit):
+    pipeline = PreprocessingPipeline.load(path, data_version)
+    if pipeline is None:
+        pipeline = fit()
+        pipeline.data_version_ = data_version
+        pipeline.save(path)
+    return pipeline
@@ -0,0 +1,115 @@
+# sections.py
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+
+from instrumentation import current_run, prometheus_text, stage_records, timed
+
+# Number of computed section results kept in memory (least recently used evicted first)
+MAX_ENTRIES = 128
+
+_memo = OrderedDict()
+_stats = {'hits': 0, 'misses': 0}
+_lock = threading.Lock()
+
+# Function to memoize a section's computation by (section, dataset version, parameters)
+def cached_compute(key, version, params, compute):
+    memo_key = (key, version, params)
+    with _lock:
+        if memo_key in _memo:
+            _memo.move_to_end(memo_key)
+            _stats['hits'] += 1
+            return _memo[memo_key]
+        _stats['misses'] += 1
+    result = compute()
+    with _lock:
+        _memo[memo_key] = result
+        while len(_memo) > MAX_ENTRIES:
+            _memo.popitem(last=False)
+    return result
+
+# Function to render the on/off switch of a section and report whether it is open
+def section_toggle(title, key, default=False):
+    return st.toggle(f"Show {title}", value=default, key=f"section-{key}")
+
+# Function to compute and render a section only while it is switched on
+def lazy_section(title, key, version, compute, render, params=(), default=False):
+    if not section_toggle(title, key, default):
+        return None
+    result = cached_compute(key, version, params, lambda: _timed_compute(key, compute))
+    with timed(f'{key}:render'):
+        render(result)
+    return result
+
+def _timed_compute(key, compute):
+    with timed(f'{key}:compute'):
+        return compute()
+
+# Function to render a list of Plotly figures
+def render_plotly(figures):
+    for fig in figures:
+        st.plotly_chart(fig)
+
+# Function to render the optional diagnostics panel: this rerun's stages and a Prometheus export
+def diagnostics_panel():
+    if not st.sidebar.toggle("Show diagnostics", key="diagnostics"):
+        return
+    st.sidebar.markdown("### Stage timings (this rerun)")
+    records = stage_records(current_run())
+    if records:
+        columns = ['stage', 'wall_seconds', 'cpu_seconds', 'rows', 'memory_delta_bytes']
+        st.sidebar.dataframe([{col: record[col] for col in columns} for record in records])
+    else:
+        st.sidebar.write("No stages ran in this rerun.")
+    st.sidebar.download_button("Download stage metrics", prometheus_text(), file_name='stage_metrics.prom', mime='text/plain')
+
+# Function to render the sidebar time filters shared by every page and return them as a TimeFilter;
+# time_of_day=False hides the hour filter for data whose timestamps carry no real time of day
+# (key: widget key prefix, one per page, so each page keeps its own filter selection)
+def time_filter_sidebar(first, last, time_of_day=True, key='filter'):
+    # Imported on first use so the app start (which loads this module for the diagnostics panel) stays free of pandas
+    import pandas as pd
+    from time_index import DAY_NAMES, MONTH_NAMES, SEASON_NAMES, TimeFilter, season_months
+
+    st.sidebar.markdown("### Filter data")
+    if first is None or first >= last:
+        return TimeFilter()
+    date_range = st.sidebar.date_input("Date range", value=(first.date(), last.date()),
+                                       min_value=first.date(), max_value=last.date(), key=f"{key}-dates")
+    seasons = st.sidebar.multiselect("Seasons", SEASON_NAMES, key=f"{key}-seasons")
+    months = st.sidebar.multiselect("Months", MONTH_NAMES, key=f"{key}-months")
+    days = st.sidebar.multiselect("Days of week", DAY_NAMES, key=f"{key}-days")
+    hours = st.sidebar.slider("Hours of day", 0, 23, (0, 23), key=f"{key}-hours") if time_of_day else (0, 23)
+
+    start = end = None
+    if len(date_range) == 2 and (date_range[0] > first.date() or date_range[1] < last.date()):
+        start, end = pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1]) + pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')
+    selected_months = set(range(1, 13))
+    if seasons:
+        selected_months &= set(season_months(seasons))
+    if months:
+        selected_months &= {MONTH_NAMES.index(month) + 1 for month in months}
+    return TimeFilter(
+        start=start,
+        end=end,
+        hours=tuple(range(hours[0], hours[1] + 1)) if hours != (0, 23) else None,
+        days=tuple(DAY_NAMES.index(day) for day in days) or None,
+        months=tuple(sorted(selected_months)) if len(selected_months) < 12 else None,
+    )
+
+# Function to apply a time filter, memoized per (dataset version, filter) within the shared dataset memory budget;
+# returns the rows and the version to key caches on
+def filtered_view(df, version, time_filter, time_column='DateTime'):
+    from data_loader import cached_derived
+    from time_index import filter_frame, is_unfiltered
+
+    if is_unfiltered(time_filter):
+        return df, version
+    view = cached_derived(('filter', version, time_filter, time_column), lambda: filter_frame(version, df, time_filter, time_column))
+    return view, (version, time_filter)
+
+# Function to report memo hits, misses and size
+def section_stats():
+    with _lock:
+        return {'hits': _stats['hits'], 'misses': _stats['misses'], 'entries': len(_memo)}
@@ -0,0 +1,524 @@
+# streaming_pipeline.py
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sklearn.preprocessing import StandardScaler
+
+from columnar_store import (append_to_store, compact_dtypes, default_store_path, ensure_store, file_version, iter_store_chunks,
+                            path_lock, read_manifest, scratch_dir)
+from correlation import update_tracker
+from data_loader import add_datetime
+from instrumentation import timed
+from outlier_engine import BOUNDS_TOL, MAX_REPLACE_FRACTION, bounds_settled
+
+# Rows held in memory at once by every pass
+CHUNKSIZE = 250_000
+# Histogram resolution used to estimate quantiles in bounded memory
+HIST_BINS = 8192
+# Upper limit on outlier rounds; rounds stop early once the bounds settle (see outlier_engine.BOUNDS_TOL)
+OUTLIER_PASSES = 3
+# Bytes at the end of the source fingerprinted to confirm that later runs only appended to it
+TAIL_BYTES = 4096
+# Drift checks wait for this many appended rows in calendar months the fit has seen (30 days of half-hourly readings)
+DRIFT_MIN_ROWS = 1440
+# Appended rows are compared with the fitted rows of the same calendar month, so ordinary seasonality is not drift.
+# A mean further than this many of that month's standard deviations from its fitted mean needs a refit
+DRIFT_MEAN_SHIFT = 0.5
+# A spread differing from the same month's fitted one by more than this factor needs a refit
+DRIFT_SCALE_RATIO = 1.5
+# A share of rows outside the first-round outlier bounds this much above the same month's fitted share needs a refit
+DRIFT_OUTLIER_SHARE = 0.05
+# A refit is due once the appended rows reach this share of the rows the parameters were fitted on
+REFIT_FRACTION = 0.25
+
+# Function to list the numeric columns of a chunk
+def numeric_columns_of(df):
+    return list(df.select_dtypes(include=[np.number]).columns)
+
+# Function to estimate a quantile from histogram counts over [low, high]
+def histogram_quantile(counts, low, high, q):
+    total = counts.sum()
+    if total == 0:
+        return np.nan
+    if high <= low:
+        return float(low)
+    edges = np.linspace(low, high, len(counts) + 1)
+    cumulative = np.cumsum(counts)
+    target = q * total
+    idx = int(np.searchsorted(cumulative, target, side='left'))
+    idx = min(idx, len(counts) - 1)
+    before = cumulative[idx - 1] if idx > 0 else 0
+    within = (target - before) / counts[idx] if counts[idx] else 0.0
+    return float(edges[idx] + within * (edges[idx + 1] - edges[idx]))
+
+# Function to estimate the share of histogram counts over [low, high] that fall below x (linear within a bin)
+def histogram_cdf(counts, low, high, x):
+    total = counts.sum()
+    if total == 0 or high <= low:
+        return 0.0
+    position = np.clip((x - low) / (high - low) * len(counts), 0, len(counts))
+    idx = min(int(position), len(counts) - 1)
+    below = counts[:idx].sum() + (position - idx) * counts[idx]
+    return float(below / total)
+
+def _apply_round(df, bounds, replaced=None):
+    for col, (lower, upper, median) in bounds.items():
+        values = df[col].to_numpy()
+        mask = (values < lower) | (values > upper)
+        if replaced is not None:
+            replaced[col] = replaced.get(col, 0) + int(mask.sum())
+        df[col] = np.where(mask, median, values).astype(values.dtype)
+    return df
+
+# Function to apply stored outlier rounds (lower, upper, median per column) to a frame
+def apply_outlier_rounds(df, rounds):
+    for bounds in rounds:
+        df = _apply_round(df, bounds)
+    return df
+
+# Function to apply all rounds while counting what the most recent one replaces
+def _apply_counting(df, rounds, replaced):
+    df = apply_outlier_rounds(df, rounds[:-1])
+    if rounds:
+        df = _apply_round(df, rounds[-1], replaced)
+    return df
+
+def _max_timestamp(df, current=None):
+    # Latest Date + Hour in a chunk, folded into the running high-water mark
+    if not {'Date', 'Hour'} <= set(df.columns) or df.empty:
+        return current
+    latest = add_datetime(df[['Date', 'Hour']].copy(deep=False))['DateTime'].max()
+    if pd.isna(latest):
+        return current
+    return latest if current is None else max(current, latest)
+
+class _Timer:
+    def __init__(self):
+        self.passes = []
+
+    def record(self, name, rows, started):
+        seconds = time.perf_counter() - started
+        self.passes.append({'pass': name, 'rows': int(rows), 'seconds': seconds,
+                            'rows_per_sec': rows / seconds if seconds > 0 else float('inf')})
+
+# Pass 1: streaming missing-value counts, dropna and hash-based duplicate removal into a staging file
+def _stage(store_dir, staging_path, chunksize, timer):
+    started = time.perf_counter()
+    missing = None
+    rows_in = rows_kept = duplicates = 0
+    seen = np.empty(0, dtype=np.uint64)
+    minimum, maximum = {}, {}
+    watermark = None
+    writer = None
+    for chunk in iter_store_chunks(store_dir, chunksize=chunksize):
+        rows_in += len(chunk)
+        counts = chunk.isnull().sum()
+        missing = counts if missing is None else missing + counts
+        chunk = chunk.dropna()
+        hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+        first = ~pd.Series(hashes).duplicated().to_numpy()
+        unseen = first & ~np.isin(hashes, seen, assume_unique=False)
+        duplicates += int(len(chunk) - unseen.sum())
+        chunk = chunk[unseen]
+        seen = np.union1d(seen, hashes[unseen])
+        rows_kept += len(chunk)
+        watermark = _max_timestamp(chunk, watermark)
+        for col in numeric_columns_of(chunk):
+            if len(chunk):
+                minimum[col] = min(minimum.get(col, np.inf), float(chunk[col].min()))
+                maximum[col] = max(maximum.get(col, -np.inf), float(chunk[col].max()))
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(staging_path, table.schema)
+        writer.write_table(table)
+    if writer is not None:
+        writer.close()
+    timer.record('stage', rows_in, started)
+    return {'rows_in': rows_in, 'rows_after_dropna': rows_kept + duplicates, 'duplicates': duplicates,
+            'rows_after_dedup': rows_kept, 'missing': {k: int(v) for k, v in (missing if missing is not None else {}).items()},
+            'watermark': watermark.isoformat() if watermark is not None else None}, minimum, maximum, seen
+
+def _iter_staging(staging_path, chunksize):
+    parquet = pq.ParquetFile(staging_path)
+    for batch in parquet.iter_batches(batch_size=chunksize):
+        yield batch.to_pandas()
+
+# Passes 2..N: histogram-based IQR bounds and medians, one round per pass
+def _outlier_round(staging_path, rounds, ranges, chunksize, bins, timer, name):
+    started = time.perf_counter()
+    counts = {col: np.zeros(bins, dtype=np.int64) for col in ranges}
+    replaced = {}
+    rows = 0
+    for chunk in _iter_staging(staging_path, chunksize):
+        rows += len(chunk)
+        chunk = _apply_counting(chunk, rounds, replaced)
+        for col, (low, high) in ranges.items():
+            hist, _ = np.histogram(chunk[col].to_numpy(), bins=bins, range=(low, high) if high > low else (low, low + 1))
+            counts[col] += hist
+    bounds = {}
+    # Share of each column the new round will replace, estimated from the same histogram
+    share = {}
+    for col, (low, high) in ranges.items():
+        q1 = histogram_quantile(counts[col], low, high, 0.25)
+        q3 = histogram_quantile(counts[col], low, high, 0.75)
+        median = histogram_quantile(counts[col], low, high, 0.5)
+        iqr = q3 - q1
+        bounds[col] = (q1 - 1.5 * iqr, q3 + 1.5 * iqr, median)
+        share[col] = histogram_cdf(counts[col], low, high, bounds[col][0]) + 1 - histogram_cdf(counts[col], low, high, bounds[col][1])
+    timer.record(name, rows, started)
+    return bounds, replaced, share
+
+def _fences(previous, current, columns):
+    # (lower, upper) arrays of two rounds, in column order, for outlier_engine.bounds_settled
+    return tuple(np.array([[bounds[col][k] for col in columns] for k in (0, 1)]) for bounds in (previous, current))
+
+def _outside_first_round(df, rounds):
+    # Rows of each column outside the first-round bounds, before any imputation
+    if not rounds:
+        return {}
+    return {col: (df[col].to_numpy() < lower) | (df[col].to_numpy() > upper) for col, (lower, upper, _) in rounds[0].items()}
+
+# Function to fold rows into per-calendar-month statistics: {column: {month: [rows, sum, sum of squares, outside]}},
+# with sums over the outlier-imputed, unscaled values
+def add_month_stats(stats, df, columns, outside):
+    months = pd.to_datetime(df['Date']).dt.month.fillna(0).to_numpy(dtype=np.int64)
+    counts = np.bincount(months, minlength=13)
+    for col in columns:
+        values = df[col].to_numpy(dtype=np.float64)
+        sums = np.bincount(months, weights=values, minlength=13)
+        squares = np.bincount(months, weights=values ** 2, minlength=13)
+        flagged = np.bincount(months, weights=outside[col], minlength=13) if col in outside else np.zeros(13)
+        col_stats = stats.setdefault(col, {})
+        for month in np.flatnonzero(counts[1:]) + 1:
+            entry = col_stats.setdefault(str(month), [0, 0.0, 0.0, 0])
+            entry[0] += int(counts[month])
+            entry[1] += float(sums[month])
+            entry[2] += float(squares[month])
+            entry[3] += int(flagged[month])
+    return stats
+
+# Pass N+1: incremental mean/variance with StandardScaler.partial_fit, plus the per-month drift baseline
+def _fit_scaler(staging_path, rounds, columns, chunksize, timer):
+    started = time.perf_counter()
+    scaler = StandardScaler()
+    replaced = {}
+    baseline = {}
+    rows = 0
+    for chunk in _iter_staging(staging_path, chunksize):
+        rows += len(chunk)
+        outside = _outside_first_round(chunk, rounds)
+        chunk = _apply_counting(chunk, rounds, replaced)
+        scaler.partial_fit(chunk[columns].to_numpy(dtype=np.float64))
+        add_month_stats(baseline, chunk, columns, outside)
+    timer.record('fit_scaler', rows, started)
+    return scaler, replaced, baseline
+
+# Final pass: impute, standardize and append each chunk to the output file
+def _write_output(staging_path, dst_path, tmp_path, rounds, scaler, columns, chunksize, timer):
+    started = time.perf_counter()
+    rows = 0
+    writer = None
+    parquet_output = dst_path.endswith('.parquet')
+    for chunk in _iter_staging(staging_path, chunksize):
+        rows += len(chunk)
+        chunk = apply_outlier_rounds(chunk, rounds)
+        if columns:
+            chunk[columns] = scaler.transform(chunk[columns].to_numpy(dtype=np.float64)).astype(np.float32)
+        if parquet_output:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema)
+            writer.write_table(table)
+        else:
+            chunk.to_csv(tmp_path, mode='w' if writer is None else 'a', header=writer is None, index=False)
+            writer = True
+    if parquet_output and writer is not None:
+        writer.close()
+    if writer is not None:
+        os.replace(tmp_path, dst_path)
+    timer.record('write', rows, started)
+
+# Function to clean a whole dataset in bounded memory and write the result to disk
+# (store_dir: where the source's columnar store lives, by default next to the source)
+def run_chunked_pipeline(src_path, dst_path, chunksize=CHUNKSIZE, outlier_passes=OUTLIER_PASSES, converge=True, bins=HIST_BINS,
+                         store_dir=None):
+    with path_lock(dst_path):
+        return _run_chunked_pipeline(src_path, dst_path, chunksize, outlier_passes, converge, bins, store_dir)
+
+def _run_chunked_pipeline(src_path, dst_path, chunksize, outlier_passes, converge, bins, store_dir):
+    started = time.perf_counter()
+    timer = _Timer()
+    store_dir = ensure_store(src_path, store_dir)
+    source = source_state(src_path)
+    # Staging and the output being written live in a scratch directory of this run only
+    work_dir = scratch_dir(dst_path, '.work-')
+    staging_path = os.path.join(work_dir, 'staging.parquet')
+    try:
+        report, minimum, maximum, seen = _stage(store_dir, staging_path, chunksize, timer)
+        _save_key_index(dst_path, seen)
+        columns = list(minimum)
+        rounds = []
+        replaced_per_round = []
+        converged = False
+        capped = []
+        ranges = {col: (minimum[col], maximum[col]) for col in columns}
+        if report['rows_after_dedup']:
+            for i in range(outlier_passes):
+                # Each pass also counts exactly what the previous round replaced
+                bounds, replaced, share = _outlier_round(staging_path, rounds, ranges, chunksize, bins, timer, f'outliers_{i + 1}')
+                if rounds:
+                    replaced_per_round.append(replaced)
+                    if converge and bounds_settled(*_fences(rounds[-1], bounds, columns), BOUNDS_TOL):
+                        converged = True
+                        break
+                capped = [col for col in columns if share[col] > MAX_REPLACE_FRACTION]
+                if capped:
+                    warnings.warn(f"Outlier round {len(rounds) + 1} would replace more than {MAX_REPLACE_FRACTION:.0%} of "
+                                  f"{', '.join(capped)}; stopping after {len(rounds)} round(s)", RuntimeWarning, stacklevel=2)
+                    break
+                rounds.append(bounds)
+                # Imputed values stay inside the bounds, so the next histogram range shrinks accordingly
+                ranges = {col: (max(ranges[col][0], bounds[col][0]), min(ranges[col][1], bounds[col][1])) for col in columns}
+            scaler, replaced, baseline = _fit_scaler(staging_path, rounds, columns, chunksize, timer)
+            # The last round applied is only counted here when no further outlier pass ran after it
+            if len(replaced_per_round) < len(rounds):
+                replaced_per_round.append(replaced)
+            _write_output(staging_path, dst_path, os.path.join(work_dir, 'output.tmp'), rounds, scaler, columns, chunksize, timer)
+            report['scaler'] = {'columns': columns, 'mean': scaler.mean_.tolist(), 'scale': scaler.scale_.tolist()}
+            report['drift_baseline'] = baseline
+        report['outlier_convergence'] = {'rounds': len(rounds), 'converged': converged, 'capped': capped,
+                                         'replaced_per_round': replaced_per_round}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    seconds = time.perf_counter() - started
+    report.update(source)
+    report.update({
+        'source': os.path.abspath(src_path),
+        'output': os.path.abspath(dst_path),
+        'store': os.path.abspath(store_dir),
+        'chunksize': chunksize,
+        'outlier_passes': outlier_passes,
+        'converge': converge,
+        'bins': bins,
+        'outlier_rounds': [{col: list(map(float, b)) for col, b in bounds.items()} for bounds in rounds],
+        'passes': timer.passes,
+        'seconds': seconds,
+        'rows_per_sec': report['rows_in'] / seconds if seconds > 0 else float('inf'),
+        'incremental': _new_increment(),
+    })
+    _write_report(dst_path, report)
+    return report
+
+def _write_report(dst_path, report):
+    tmp_path = f'{report_path(dst_path)}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, report_path(dst_path))
+
+# Function to get the JSON report path that belongs to a cleaned output file
+def report_path(dst_path):
+    return dst_path + '.report.json'
+
+# Function to get the persisted row-hash index that belongs to a cleaned output file
+def key_index_path(dst_path):
+    return dst_path + '.keys.npy'
+
+def _save_key_index(dst_path, keys):
+    tmp_path = f'{key_index_path(dst_path)}.{os.getpid()}.{threading.get_ident()}.tmp.npy'
+    np.save(tmp_path, np.asarray(keys, dtype=np.uint64))
+    os.replace(tmp_path, key_index_path(dst_path))
+
+# Function to describe the source file: version, size and a fingerprint of its last bytes
+def source_state(src_path):
+    size = os.path.getsize(src_path)
+    with open(src_path, 'rb') as f:
+        f.seek(max(0, size - TAIL_BYTES))
+        tail = f.read()
+    return {'source_version': file_version(src_path), 'source_bytes': size,
+            'source_tail': hashlib.sha1(tail).hexdigest()}
+
+def _new_increment():
+    return {'appends': 0, 'rows': 0, 'months': {}, 'drift': []}
+
+# Function to tell whether the source only grew since the report was written, so its new rows can be appended
+# (a fit that kept no rows has no parameters to reuse)
+def can_append(src_path, dst_path, report):
+    if dst_path.endswith('.parquet') or 'source_bytes' not in report or not os.path.exists(key_index_path(dst_path)):
+        return False
+    if 'scaler' not in report:
+        return False
+    offset = report['source_bytes']
+    if os.path.getsize(src_path) < offset or offset == 0:
+        return False
+    with open(src_path, 'rb') as f:
+        f.seek(max(0, offset - TAIL_BYTES))
+        tail = f.read(offset - max(0, offset - TAIL_BYTES))
+    return hashlib.sha1(tail).hexdigest() == report['source_tail'] and tail.endswith(b'\n')
+
+def _read_appended(src_path, offset):
+    columns = pd.read_csv(src_path, nrows=0).columns
+    with open(src_path, 'rb') as f:
+        f.seek(offset)
+        new_rows = pd.read_csv(f, header=None, names=columns)
+    return compact_dtypes(new_rows)
+
+def _append_if_current(store_dir, df, csv_path, version):
+    # A store rebuilt since the last run already holds the new rows; only a store still at `version` is extended.
+    # The check and the append happen under the store's lock, so a concurrent rebuild cannot slip in between
+    with path_lock(store_dir):
+        manifest = read_manifest(store_dir)
+        if manifest is not None and manifest['source_version'] == version:
+            manifest = append_to_store(store_dir, df, csv_path)
+            # Correlation views follow the append without rescanning the store
+            update_tracker(store_dir, df, version, manifest['source_version'])
+
+def _moments(entry):
+    rows, total, squares = entry[0], entry[1], entry[2]
+    mean = total / rows
+    return mean, np.sqrt(max(squares / rows - mean ** 2, 0.0))
+
+# Function to compare one column's appended rows with the fitted rows of the same calendar months;
+# returns the row-weighted mean shift (in fitted standard deviations), spread ratio and excess outlier share
+def _month_drift(appended, fitted):
+    rows = shift = ratio = excess = 0.0
+    for month, entry in appended.items():
+        reference = fitted.get(month)
+        if not entry[0] or not reference or reference[0] < 2:
+            continue
+        mean, std = _moments(entry)
+        reference_mean, reference_std = _moments(reference)
+        if reference_std == 0:
+            continue
+        rows += entry[0]
+        shift += entry[0] * (mean - reference_mean) / reference_std
+        ratio += entry[0] * std / reference_std
+        excess += entry[3] - entry[0] * reference[3] / reference[0]
+    if rows == 0:
+        return 0, 0.0, 1.0, 0.0
+    return int(rows), shift / rows, ratio / rows, excess / rows
+
+# Function to check the rows appended since the last full fit for drift away from the fitted data
+def detect_drift(report):
+    increment = report.get('incremental') or _new_increment()
+    reasons = []
+    rows = increment['rows']
+    if rows >= REFIT_FRACTION * max(report['rows_after_dedup'], 1):
+        reasons.append(f"{rows} appended rows exceed {REFIT_FRACTION:.0%} of the {report['rows_after_dedup']} fitted rows")
+    baseline = report.get('drift_baseline', {})
+    for col in report.get('scaler', {}).get('columns', []):
+        compared, shift, ratio, excess = _month_drift(increment.get('months', {}).get(col, {}), baseline.get(col, {}))
+        if compared < DRIFT_MIN_ROWS:
+            continue
+        if abs(shift) > DRIFT_MEAN_SHIFT:
+            reasons.append(f"{col}: mean moved {shift:+.2f} standard deviations from the same months' fitted mean")
+        if ratio > DRIFT_SCALE_RATIO or ratio < 1 / DRIFT_SCALE_RATIO:
+            reasons.append(f"{col}: spread is {ratio:.2f}x the same months' fitted one")
+        if excess > DRIFT_OUTLIER_SHARE:
+            reasons.append(f"{col}: {excess:.1%} more new rows than usual fall outside the outlier bounds")
+    return reasons
+
+# Function to clean only the rows appended to the source since the last run, with the stored parameters
+def ingest_incremental(src_path, dst_path, report):
+    started = time.perf_counter()
+    previous_version = report['source_version']
+    new_rows = _read_appended(src_path, report['source_bytes'])
+    source = source_state(src_path)
+    _append_if_current(report.get('store') or default_store_path(src_path), new_rows, src_path, report['source_version'])
+
+    rows_in = len(new_rows)
+    missing = new_rows.isnull().sum()
+    kept = new_rows.dropna()
+    seen = np.load(key_index_path(dst_path))
+    hashes = pd.util.hash_pandas_object(kept, index=False).to_numpy()
+    unseen = ~pd.Series(hashes).duplicated().to_numpy() & ~np.isin(hashes, seen)
+    duplicates = int(len(kept) - unseen.sum())
+    kept = kept[unseen]
+    _save_key_index(dst_path, np.union1d(seen, hashes[unseen]))
+
+    rounds = [{col: tuple(bounds) for col, bounds in round_.items()} for round_ in report['outlier_rounds']]
+    scaler = report['scaler']
+    increment = report.setdefault('incremental', _new_increment())
+    outside = _outside_first_round(kept, rounds)
+    cleaned = apply_outlier_rounds(kept.copy(deep=False), rounds)
+    add_month_stats(increment.setdefault('months', {}), cleaned, scaler['columns'], outside)
+    if scaler['columns']:
+        scaled = (cleaned[scaler['columns']].to_numpy(dtype=np.float64) - np.array(scaler['mean'])) / np.array(scaler['scale'])
+        cleaned[scaler['columns']] = scaled.astype(np.float32)
+    # The cleaned CSV and its columnar store grow by the new rows only
+    cleaned_version = file_version(dst_path)
+    cleaned.to_csv(dst_path, mode='a', header=False, index=False)
+    _append_if_current(default_store_path(dst_path), cleaned, dst_path, cleaned_version)
+
+    increment['appends'] += 1
+    increment['rows'] += len(cleaned)
+    watermark = _max_timestamp(kept, pd.Timestamp(report['watermark']) if report.get('watermark') else None)
+    late = 0
+    if report.get('watermark') and len(kept):
+        stamps = add_datetime(kept[['Date', 'Hour']].copy(deep=False))['DateTime']
+        late = int((stamps <= pd.Timestamp(report['watermark'])).sum())
+    seconds = time.perf_counter() - started
+    report.update(source)
+    report.update({
+        'rows_in': report['rows_in'] + rows_in,
+        'rows_after_dropna': report['rows_after_dropna'] + len(kept) + duplicates,
+        'duplicates': report['duplicates'] + duplicates,
+        'rows_after_dedup': report['rows_after_dedup'] + len(cleaned),
+        'missing': {col: report['missing'].get(col, 0) + int(missing.get(col, 0)) for col in report['missing']},
+        'watermark': watermark.isoformat() if watermark is not None else None,
+        # previous_version: the source version the new rows were appended to, so derived results can be extended
+        'last_append': {'previous_version': previous_version, 'rows_in': rows_in, 'rows_appended': len(cleaned),
+                        'duplicates': duplicates,
+                        'late_rows': late, 'seconds': seconds,
+                        'rows_per_sec': rows_in / seconds if seconds > 0 else float('inf')},
+    })
+    increment['drift'] = detect_drift(report)
+    _write_report(dst_path, report)
+    return report
+
+# Function to rerun the pipeline only when the source has changed since the last report;
+# rows appended to the source are cleaned on their own unless drift calls for a full refit
+def ensure_cleaned(src_path, dst_path, incremental=True, refit_on_drift=True, **kwargs):
+    report = _matching_report(src_path, dst_path, kwargs)
+    if report is not None and _report_current(report, src_path, refit_on_drift):
+        return report
+    with path_lock(dst_path):
+        # Another caller may have cleaned or extended the output while this one waited for the lock
+        report = _matching_report(src_path, dst_path, kwargs)
+        if report is not None:
+            if incremental and report.get('source_version') != file_version(src_path) and can_append(src_path, dst_path, report):
+                with timed('incremental_ingest') as span:
+                    report = ingest_incremental(src_path, dst_path, report)
+                    span['rows'] = report['last_append']['rows_in']
+            if _report_current(report, src_path, refit_on_drift):
+                return report
+        with timed('clean_pipeline') as span:
+            report = run_chunked_pipeline(src_path, dst_path, **kwargs)
+            span['rows'] = report['rows_in']
+    return report
+
+# Function to read the report of an existing output cleaned with the same settings (None otherwise)
+def _matching_report(src_path, dst_path, kwargs):
+    path = report_path(dst_path)
+    if not (os.path.exists(path) and os.path.exists(dst_path)):
+        return None
+    with open(path) as f:
+        report = json.load(f)
+    settings = {'outlier_passes': kwargs.get('outlier_passes', OUTLIER_PASSES), 'converge': kwargs.get('converge', True),
+                'bins': kwargs.get('bins', HIST_BINS)}
+    store_dir = os.path.abspath(kwargs.get('store_dir') or default_store_path(src_path))
+    if all(report.get(k) == v for k, v in settings.items()) and report.get('store', store_dir) == store_dir:
+        return report
+    return None
+
+def _report_current(report, src_path, refit_on_drift):
+    drifted = refit_on_drift and report.get('incremental', {}).get('drift')
+    return report.get('source_version') == file_version(src_path) and not drifted
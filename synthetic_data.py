@@ -0,0 +1,82 @@
+# synthetic_data.py
+# Realistic half-hourly weather/load/price data at any size, for benchmarks and load tests.
+import numpy as np
+import pandas as pd
+
+from features import SLOTS_PER_DAY
+
+START = '2006-01-01'
+# Share of rows given a missing value, duplicated, or pushed far outside the usual range
+NAN_FRACTION = 0.001
+DUPLICATE_FRACTION = 0.001
+OUTLIER_FRACTION = 0.0005
+MEASUREMENT_COLUMNS = ['DryBulb', 'DewPnt', 'WetBulb', 'Humidity', 'ElecPrice', 'SYSLoad']
+# One region's half-hourly history (~114 years) must stay inside the nanosecond Timestamp range,
+# so larger datasets are split into several regions that share the same calendar
+ROWS_PER_REGION = 2_000_000
+
+# Function to generate n_rows of half-hourly data shaped like the electric load file
+def generate_dataset(n_rows, seed=0, start=START, nan_fraction=NAN_FRACTION, duplicate_fraction=DUPLICATE_FRACTION,
+                     outlier_fraction=OUTLIER_FRACTION, lag_columns=True):
+    rng = np.random.default_rng(seed)
+    n_unique = max(1, n_rows - int(n_rows * duplicate_fraction))
+    n_regions = -(-n_unique // ROWS_PER_REGION)
+    step = np.arange(n_unique) % ROWS_PER_REGION
+    region = np.arange(n_unique) // ROWS_PER_REGION
+    slot = step % SLOTS_PER_DAY
+    day = step // SLOTS_PER_DAY
+    dates = pd.Timestamp(start) + pd.to_timedelta(day, unit='D')
+    day_phase = 2 * np.pi * slot / SLOTS_PER_DAY
+    # Southern-hemisphere year: warmest around mid-January
+    year_phase = 2 * np.pi * (dates.dayofyear.to_numpy() - 15) / 365.25
+    weekend = dates.dayofweek.to_numpy() >= 5
+
+    dry = 18 + region + 6 * np.cos(year_phase) - 4 * np.cos(day_phase - np.pi / 6) + rng.normal(0, 1.5, n_unique)
+    dew = dry - 6 - 2 * np.sin(day_phase) + rng.normal(0, 1.0, n_unique)
+    wet = dew + 0.45 * (dry - dew)
+    humidity = np.clip(100 - 5 * (dry - dew) + rng.normal(0, 4, n_unique), 5, 100)
+    # Load rises for both heating and cooling, peaks in the evening and drops at weekends
+    load = (7500 + 60 * (dry - 18) ** 2 - 900 * np.cos(day_phase - np.pi / 3) - 700 * weekend
+            + rng.normal(0, 150, n_unique))
+    price = 25 + 0.004 * (load - 7500) + rng.gamma(2.0, 4.0, n_unique)
+
+    df = pd.DataFrame({
+        'Date': dates.normalize(),
+        'Hour': ((slot + 1) * 0.5).astype(np.float32),
+        'DryBulb': dry.astype(np.float32),
+        'DewPnt': dew.astype(np.float32),
+        'WetBulb': wet.astype(np.float32),
+        'Humidity': humidity.astype(np.float32),
+        'ElecPrice': price.astype(np.float32),
+        'SYSLoad': load.astype(np.float32),
+    })
+    if n_regions > 1:
+        df['Region'] = pd.Categorical.from_codes(region, [f'R{i + 1}' for i in range(n_regions)])
+    if lag_columns:
+        load_by_region = df.groupby(region, sort=False)['SYSLoad'] if n_regions > 1 else df['SYSLoad']
+        df['sysload(D-1)'] = load_by_region.shift(SLOTS_PER_DAY)
+        df['sysload(W-1)'] = load_by_region.shift(7 * SLOTS_PER_DAY)
+
+    # Price spikes and sensor glitches
+    n_outliers = int(n_unique * outlier_fraction)
+    if n_outliers:
+        rows = rng.choice(n_unique, n_outliers, replace=False)
+        df.loc[rows[: n_outliers // 2], 'ElecPrice'] = rng.uniform(300, 12000, n_outliers // 2).astype(np.float32)
+        df.loc[rows[n_outliers // 2:], 'DryBulb'] = rng.choice(np.array([-40.0, 70.0], dtype=np.float32), n_outliers - n_outliers // 2)
+    for col in MEASUREMENT_COLUMNS:
+        n_missing = int(n_unique * nan_fraction)
+        if n_missing:
+            df.loc[rng.choice(n_unique, n_missing, replace=False), col] = np.nan
+
+    # Re-sent rows, appended at the end like a late duplicate delivery
+    n_duplicates = n_rows - n_unique
+    if n_duplicates:
+        df = pd.concat([df, df.iloc[rng.choice(n_unique, n_duplicates, replace=False)]], ignore_index=True)
+    return df
+
+# Function to write a generated dataset as a CSV the app and the batch runner can read
+def write_csv(df, path):
+    out = df.copy(deep=False)
+    out['Date'] = out['Date'].dt.strftime('%Y-%m-%d')
+    out.to_csv(path, index=False)
+    return path
@@ -0,0 +1,112 @@
+# time_index.py
+# Sorted DateTime index with binary-search ranges, hour/day-of-week bitmaps and month partitions.
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from correlation import SEASONS
+from data_loader import add_datetime, cached_derived
+
+DAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+SEASON_NAMES = ['Summer', 'Autumn', 'Winter', 'Spring']
+
+# A filter over the time index; None in any field means "no restriction"
+# start/end: inclusive DateTime bounds, hours: hours of day (0-23), days: days of week (0 = Monday), months: 1-12
+TimeFilter = namedtuple('TimeFilter', ['start', 'end', 'hours', 'days', 'months'], defaults=(None,) * 5)
+
+# Function to get the months of the given seasons
+def season_months(seasons):
+    return sorted(month for month, season in SEASONS.items() if season in seasons)
+
+# Function to tell whether a filter restricts anything at all
+def is_unfiltered(time_filter):
+    return time_filter is None or all(value is None for value in time_filter)
+
+class TimeIndex:
+    def __init__(self, times):
+        times = np.asarray(times, dtype='datetime64[ns]')
+        valid = np.flatnonzero(~np.isnat(times))
+        # Row positions in the source frame, in DateTime order; rows without a DateTime are left out
+        self.order = valid[np.argsort(times[valid], kind='stable')]
+        self.times = times[self.order]
+        index = pd.DatetimeIndex(self.times)
+        # One packed bitmap per hour of day and per day of week, over the sorted rows
+        self.hour_bitmaps = np.stack([np.packbits(index.hour == hour) for hour in range(24)]) if len(index) else None
+        self.day_bitmaps = np.stack([np.packbits(index.dayofweek == day) for day in range(7)]) if len(index) else None
+        # Month partitions: sorted positions of the rows falling in each calendar month
+        months = index.month.to_numpy()
+        self.month_positions = {month: np.flatnonzero(months == month) for month in range(1, 13)}
+
+    @classmethod
+    def from_frame(cls, df, time_column='DateTime'):
+        if time_column in df.columns:
+            return cls(pd.to_datetime(df[time_column]).to_numpy())
+        return cls(add_datetime(df[['Date', 'Hour']].copy(deep=False))['DateTime'].to_numpy())
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def nbytes(self):
+        arrays = [self.order, self.times, *self.month_positions.values()]
+        arrays += [bitmaps for bitmaps in (self.hour_bitmaps, self.day_bitmaps) if bitmaps is not None]
+        return int(sum(array.nbytes for array in arrays))
+
+    @property
+    def bounds(self):
+        if len(self.times) == 0:
+            return None, None
+        return pd.Timestamp(self.times[0]), pd.Timestamp(self.times[-1])
+
+    # Function to find the [lo, hi) sorted positions of an inclusive DateTime range by binary search
+    def range_slice(self, start=None, end=None):
+        lo = 0 if start is None else int(np.searchsorted(self.times, np.datetime64(pd.Timestamp(start), 'ns'), side='left'))
+        hi = len(self.times) if end is None else int(np.searchsorted(self.times, np.datetime64(pd.Timestamp(end), 'ns'), side='right'))
+        return lo, max(lo, hi)
+
+    def _bitmap_mask(self, bitmaps, selected, lo, hi):
+        # OR the selected bitmaps over the bytes covering [lo, hi), then unpack only that window
+        first, last = lo // 8, (hi + 7) // 8
+        bits = np.bitwise_or.reduce(bitmaps[list(selected), first:last], axis=0)
+        return np.unpackbits(bits)[lo - first * 8:hi - first * 8].astype(bool)
+
+    # Function to get the sorted positions matching a filter
+    def positions(self, time_filter):
+        lo, hi = self.range_slice(time_filter.start, time_filter.end)
+        if lo == hi:
+            return np.zeros(0, dtype=np.int64)
+        mask = None
+        if time_filter.hours is not None and len(set(time_filter.hours)) < 24:
+            mask = self._bitmap_mask(self.hour_bitmaps, sorted(set(time_filter.hours)), lo, hi)
+        if time_filter.days is not None and len(set(time_filter.days)) < 7:
+            days = self._bitmap_mask(self.day_bitmaps, sorted(set(time_filter.days)), lo, hi)
+            mask = days if mask is None else mask & days
+        if time_filter.months is not None and len(set(time_filter.months)) < 12:
+            # Only the month partitions are scanned, each clipped to the range by binary search
+            parts = [self.month_positions[month] for month in sorted(set(time_filter.months))]
+            if not parts:
+                return np.zeros(0, dtype=np.int64)
+            candidates = np.sort(np.concatenate([part[np.searchsorted(part, lo):np.searchsorted(part, hi)] for part in parts]))
+            return candidates if mask is None else candidates[mask[candidates - lo]]
+        if mask is None:
+            return np.arange(lo, hi)
+        return lo + np.flatnonzero(mask)
+
+    # Function to select the matching rows of the frame the index was built from, in DateTime order
+    def select(self, df, time_filter):
+        if is_unfiltered(time_filter):
+            return df
+        return df.iloc[self.order[self.positions(time_filter)]]
+
+# Function to fetch the time index of a dataset version from the shared memory-budgeted cache, building it on first use
+def time_index(version, df, time_column='DateTime'):
+    return cached_derived(('time_index', version, time_column), lambda: TimeIndex.from_frame(df, time_column),
+                          nbytes=lambda index: index.nbytes)
+
+# Function to filter a dataset version, returning the frame itself when nothing is filtered
+def filter_frame(version, df, time_filter, time_column='DateTime'):
+    if is_unfiltered(time_filter):
+        return df
+    return time_index(version, df, time_column).select(df, time_filter)